@@ -0,0 +1,50 @@
+"""
+
+    frosch - Better runtime errors
+
+    Patrick Haller
+    patrickhaller40@googlemail.com
+
+    License MIT
+
+    Formatting benchmark, run with `python benchmarks/format_line.py`.
+
+    Compares the token normalizer with yapf (pretty mode) on statements of
+    growing size.
+
+"""
+
+import io
+import os
+import sys
+import timeit
+import tokenize
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frosch.parser import _format_with_yapf, normalize_tokens  # pylint: disable=C0413
+
+
+def make_statement(entries: int) -> str:
+    """A multiline dict literal with the given number of entries"""
+    body = "".join(f"    'key_{i}' : [ {i}, {i} * 2 ],\n" for i in range(entries))
+    return "x = {\n" + body + "}\n"
+
+
+def main():
+    """Print timings of both formatting paths"""
+    print(f"{'entries':>8} {'normalize [ms]':>15} {'yapf [ms]':>10}")
+    for entries in (1, 10, 100, 500):
+        statement = make_statement(entries)
+        tokens = list(tokenize.generate_tokens(io.StringIO(statement).readline))
+        line = normalize_tokens(tokens)
+
+        runs = 20
+        fast = timeit.timeit(lambda: normalize_tokens(tokens), number=runs) / runs
+        runs = 3
+        pretty = timeit.timeit(lambda: _format_with_yapf(line), number=runs) / runs
+        print(f"{entries:>8} {fast * 1000:>15.3f} {pretty * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+
+    frosch - Better runtime errors
+
+    Patrick Haller
+    patrickhaller40@googlemail.com
+
+    License MIT
+
+    Import time benchmark, run with `python benchmarks/import_time.py`.
+
+    Runs `import frosch; frosch.hook()` in a fresh interpreter with
+    `-X importtime` and prints the most expensive modules, so it can be
+    checked that the rendering dependencies stay out of the import path.
+
+"""
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only needed once an exception is rendered
+HEAVY_MODULES = ("pygments", "yapf", "stack_data", "asttokens", "cheap_repr", "colorama")
+
+STATEMENT = "import frosch; frosch.hook()"
+
+
+def measure(statement: str = STATEMENT):
+    """Run statement in a new interpreter and return (self_us, cumulative_us, module) rows"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:") :].split("|")
+        rows.append((int(self_us), int(cumulative_us), module.rstrip()))
+    return rows
+
+
+def main(top: int = 15):
+    """Print the import time breakdown of frosch"""
+    rows = measure()
+    total = sum(self_us for self_us, _, _ in rows)
+    frosch_total = next(
+        (cumulative for _, cumulative, module in rows if module.strip() == "frosch"), 0
+    )
+
+    print(f"{STATEMENT!r}")
+    print(f"  all imports: {total / 1000:8.2f} ms")
+    print(f"  frosch:      {frosch_total / 1000:8.2f} ms (cumulative)")
+    print()
+    print(f"  {'self [ms]':>10} {'cumul [ms]':>10}  module")
+    for self_us, cumulative_us, module in sorted(rows, key=lambda row: -row[1])[:top]:
+        print(f"  {self_us / 1000:10.2f} {cumulative_us / 1000:10.2f}  {module}")
+
+    loaded = [
+        module.strip()
+        for _, _, module in rows
+        if module.strip().split(".")[0] in HEAVY_MODULES
+    ]
+    print()
+    if loaded:
+        print(f"  heavy modules imported eagerly: {', '.join(sorted(set(loaded)))}")
+        return 1
+    print("  no rendering dependencies imported")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+
+    frosch - Better runtime errors
+
+    Patrick Haller
+    patrickhaller40@googlemail.com
+
+    License MIT
+
+    Memory benchmark, run with `python benchmarks/memory.py`.
+
+    Every crash has a large local. The benchmark measures what stays allocated
+    while reports of the crashes are held, and after all references are dropped.
+    Only parsed exceptions keep the locals, snapshots and cleared exceptions
+    stay close to the baseline.
+
+"""
+
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=C0413
+from frosch.config_manager import ConfigManager
+from frosch.frosch import format_exception
+from frosch.parser import ParsedException
+from frosch.snapshot import ExceptionSnapshot, release_frames
+
+CRASHES = 10
+LOCAL_SIZE = 8 * 1024 * 1024
+
+
+def crash(size: int):
+    """Fail with a large local in the crashing frame"""
+    payload = [0] * (size // 8)
+    return payload + None
+
+
+def make_exception() -> BaseException:
+    """Exception of crash, with its traceback"""
+    try:
+        crash(LOCAL_SIZE)
+    except TypeError as error:
+        return error
+    raise AssertionError("crash did not fail")
+
+
+def retained(held) -> int:
+    """Traced memory in bytes which is kept by held"""
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0] - held
+
+
+def main():
+    """Print retained memory of every way to keep a report"""
+    configs = ConfigManager.default().from_kwargs(color=False)
+    hook_loader = configs.initialize_datatype_hook_loader()
+    options = configs.parse_options()
+
+    def parsed(exception):
+        return ParsedException(
+            exception.__traceback__, type(exception), exception, **options
+        )
+
+    def snapshot(exception):
+        return ExceptionSnapshot.capture(exception, hook_loader, **options)
+
+    def released(exception):
+        release_frames(exception)
+        return exception
+
+    def snapshot_released(exception):
+        snapshot_ = ExceptionSnapshot.capture(
+            exception, hook_loader, release=True, **options
+        )
+        return snapshot_, exception
+
+    scenarios = [
+        ("report, drop exception", lambda exception: format_exception(exception, configs)),
+        ("hold exception", lambda exception: exception),
+        ("hold ParsedException", parsed),
+        ("hold ExceptionSnapshot", snapshot),
+        ("hold released exception", released),
+        ("hold both, released", snapshot_released),
+    ]
+
+    tracemalloc.start()
+    # Caches of sources, hooks and the render session are part of the baseline
+    format_exception(make_exception(), configs)
+
+    print(f"{CRASHES} crashes with {LOCAL_SIZE // 1024} KiB locals each")
+    print(f"{'scenario':<26} {'held [KiB]':>11} {'after drop [KiB]':>17}")
+    for name, keep in scenarios:
+        gc.collect()
+        baseline = tracemalloc.get_traced_memory()[0]
+        reports = [keep(make_exception()) for _ in range(CRASHES)]
+        held = retained(baseline)
+        del reports
+        after = retained(baseline)
+        print(f"{name:<26} {held / 1024:>11.0f} {after / 1024:>17.0f}")
+
+    tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    main()
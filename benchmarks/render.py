@@ -0,0 +1,64 @@
+"""
+
+    frosch - Better runtime errors
+
+    Patrick Haller
+    patrickhaller40@googlemail.com
+
+    License MIT
+
+    Render benchmark, run with `python benchmarks/render.py`.
+
+    Compares rendering a report with colors to the colorless path, which is used
+    when the output is not a terminal.
+
+"""
+
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frosch.config_manager import ConfigManager  # pylint: disable=C0413
+from frosch.frosch import format_exception  # pylint: disable=C0413
+
+
+def make_exception(names: int, directory: str) -> BaseException:
+    """Exception of a statement which uses the given number of variables, the
+    statement is written to a file so its source can be found"""
+    namespace = {f"var_{i}": [i, "abc", i / 2] for i in range(names)}
+    filename = os.path.join(directory, f"statement_{names}.py")
+    with open(filename, "w", encoding="utf-8") as file_:
+        file_.write(" + ".join(namespace) + " + None\n")
+
+    with open(filename, encoding="utf-8") as file_:
+        code = compile(file_.read(), filename, "exec")
+    try:
+        exec(code, namespace)  # pylint: disable=W0122
+    except TypeError as error:
+        return error
+    raise AssertionError("statement did not fail")
+
+
+def main():
+    """Print timings of both render paths"""
+    directory = tempfile.mkdtemp()
+    print(f"{'names':>6} {'color [ms]':>11} {'colorless [ms]':>15}")
+    for names in (1, 10, 30):
+        exception = make_exception(names, directory)
+        timings = []
+        for color in (True, False):
+            configs = ConfigManager.default().from_kwargs(color=color)
+            format_exception(exception, configs)
+            timings.append(
+                timeit.timeit(lambda: format_exception(exception, configs), number=20)
+            )
+        print(
+            f"{names:>6} {timings[0] / 20 * 1000:>11.2f} {timings[1] / 20 * 1000:>15.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
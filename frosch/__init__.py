@@ -9,7 +9,32 @@
 
 """
 
-from . import style
+import importlib
+import sys
+
 from .frosch import hook, print_exception
 
-__all__ = ["hook", "print_exception", "style"]
+__all__ = ["hook", "print_exception", "aprint_exception", "style"]
+
+# Attributes only imported on access, they depend on costly imports
+_LAZY_ATTRIBUTES = {
+    "style": (".style", None),
+    "aprint_exception": (".aio", "aprint_exception"),
+}
+
+if sys.version_info < (3, 7):  # pragma: no cover
+    # No module level __getattr__ before 3.7, pay the imports upfront
+    from . import style
+    from .aio import aprint_exception
+else:
+
+    def __getattr__(name: str):
+        """Import attributes with costly dependencies only when they are accessed"""
+        if name not in _LAZY_ATTRIBUTES:
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+        module_name, attribute = _LAZY_ATTRIBUTES[name]
+        module = importlib.import_module(module_name, __name__)
+        if attribute is None:
+            return module
+        return getattr(module, attribute)
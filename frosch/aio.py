@@ -0,0 +1,100 @@
+"""
+
+    frosch - Better runtime errors
+
+    Patrick Haller
+    patrickhaller40@googlemail.com
+
+    License MIT
+
+    asyncio support, the report is rendered and written in an executor so
+    the event loop is not blocked
+
+"""
+
+import asyncio
+import sys
+from typing import Any, Dict, Optional
+
+from .config_manager import ConfigManager
+from .frosch import _active_configs, format_exception
+
+# Keep references of scheduled reports, tasks are only weakly referenced by the loop
+_pending_reports = set()
+
+# Loop of the calling coroutine, get_event_loop returns it before python 3.7
+_get_running_loop = getattr(asyncio, "get_running_loop", asyncio.get_event_loop)
+
+
+def _write(stream, report: str):
+    """Write a whole report with a single write, reports of executor threads
+    must not interleave"""
+    from .writer import write_report  # pylint: disable=C0415
+
+    write_report(stream, report)
+
+
+def _render(exception: BaseException, stream, configs: Optional[ConfigManager]) -> str:
+    """Report of exception, colors are decided by stream, not by the string the
+    report is rendered into"""
+    configs = configs or _active_configs()
+    color = configs.session().use_color(stream)
+    return format_exception(exception, configs, color=color)
+
+
+def _print(exception: BaseException, stream, configs: Optional[ConfigManager]):
+    """Render and write exception, runs in executor"""
+    _write(stream, _render(exception, stream, configs))
+
+
+async def aprint_exception(
+    exception: BaseException, stream=None, configs: Optional[ConfigManager] = None
+):
+    """Pretty print the exception and traceback to stdout (or stream) without
+    blocking the event loop"""
+    loop = _get_running_loop()
+    stream = stream or sys.stdout
+    await loop.run_in_executor(None, _print, exception, stream, configs)
+
+
+def _report(loop: asyncio.AbstractEventLoop, context: Dict[str, Any]):
+    """Write message and report of context at once on stderr, so reports of
+    concurrently failing tasks don't interleave. If the report can't be rendered,
+    the default handler of the loop reports it instead"""
+    message = context.get("message")
+    header = f"{message}\n" if message else ""
+    try:
+        report = _render(context["exception"], sys.stderr, None)
+    except Exception:  # pylint: disable=W0703
+        loop.default_exception_handler(context)
+        return
+    _write(sys.stderr, f"{header}{report}")
+
+
+async def _areport(loop: asyncio.AbstractEventLoop, context: Dict[str, Any]):
+    """Render and write the report of context in an executor"""
+    await loop.run_in_executor(None, _report, loop, context)
+
+
+def loop_exception_handler(loop: asyncio.AbstractEventLoop, context: Dict[str, Any]):
+    """Exception handler for loop.set_exception_handler, which reports exceptions
+    of tasks and callbacks with frosch on stderr"""
+    exception = context.get("exception")
+    if exception is None or exception.__traceback__ is None:
+        loop.default_exception_handler(context)
+        return
+
+    # Loop is shutting down, nothing else to block
+    if not loop.is_running():
+        _report(loop, context)
+        return
+
+    task = loop.create_task(_areport(loop, context))
+    _pending_reports.add(task)
+    task.add_done_callback(_pending_reports.discard)
+
+
+def install(loop: Optional[asyncio.AbstractEventLoop] = None):
+    """Set loop_exception_handler as exception handler of loop (or the current loop)"""
+    loop = loop or asyncio.get_event_loop()
+    loop.set_exception_handler(loop_exception_handler)
@@ -0,0 +1,207 @@
+"""
+
+    frosch - Better runtime errors
+
+    Patrick Haller
+    patrickhaller40@googlemail.com
+
+    License MIT
+
+    Rendering of exceptions in a background thread. The caller only captures
+    a deferred snapshot of the exception, the values of the names used by the
+    statements. Formatting, datatype hooks, highlighting and writing happen in
+    the reporter thread.
+
+"""
+
+import atexit
+import queue
+import sys
+import threading
+import traceback
+from typing import Optional
+
+from .config_manager import ConfigManager
+from .snapshot import DeferredSnapshot, attached_snapshot, reraised_traceback
+from .structured import deferred_record, dumps, snapshot_record, write_json
+from .writer import write_report
+
+# Overflow policies, if the queue of the reporter is full
+DROP = "drop"
+BLOCK = "block"
+PLAIN = "plain"
+
+_STOP = object()
+
+
+class BackgroundReporter:
+    """Renders and writes exception snapshots in a daemon thread"""
+
+    def __init__(
+        self,
+        stream=None,
+        configs: Optional[ConfigManager] = None,
+        maxsize: int = 1024,
+        overflow: str = DROP,
+    ):
+        if overflow not in (DROP, BLOCK, PLAIN):
+            raise ValueError(f"Unknown overflow policy: {overflow!r}")
+
+        self.configs = configs or ConfigManager.default()
+        self.overflow = overflow
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._stream = stream
+        self._hook_loader = self.configs.initialize_datatype_hook_loader()
+        self._deduplicator = self.configs.initialize_deduplicator()
+        self._queue = queue.Queue(maxsize)
+        self._thread = threading.Thread(
+            target=self._run, name="frosch-reporter", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def stream(self):
+        """Stream to write to, stdout at the time of writing by default"""
+        return self._stream or sys.stdout
+
+    def submit(self, exception: BaseException):
+        """Capture exception and queue it for rendering"""
+        if self._deduplicator is not None:
+            render, summaries = self._deduplicator.check(exception)
+            for summary in summaries:
+                self._queue_summary(summary)
+            if not render:
+                return
+
+        if self.overflow == DROP and self._queue.full():
+            self._count_dropped()
+            return
+        if self.overflow == PLAIN and self._queue.full():
+            self._write_plain(exception)
+            return
+
+        # Exceptions of worker processes are already captured, only the frames
+        # which re-raised them are left
+        try:
+            snapshot = attached_snapshot(exception)
+            if snapshot is not None:
+                snapshot = (snapshot, reraised_traceback(exception))
+            else:
+                snapshot = DeferredSnapshot.capture(
+                    exception, self._hook_loader, **self.configs.parse_options()
+                )
+        except Exception:  # pylint: disable=W0703
+            # Reporting never raises into the caller, e.g. for an exception which
+            # was never raised and has no stacktrace
+            snapshot = traceback.TracebackException(
+                type(exception), exception, exception.__traceback__
+            )
+
+        try:
+            self._queue.put(snapshot, block=self.overflow == BLOCK)
+        except queue.Full:
+            # Queue filled up while capturing
+            if self.overflow == PLAIN:
+                self._write_plain(exception)
+            else:
+                self._count_dropped()
+
+    def _count_dropped(self):
+        """Submitting threads can drop at the same time"""
+        with self._dropped_lock:
+            self.dropped += 1
+
+    def _queue_summary(self, summary: str):
+        """Summary lines are cheap, they are never blocking and dropped if full"""
+        try:
+            self._queue.put_nowait(summary)
+        except queue.Full:
+            self._count_dropped()
+
+    def _write_plain(self, exception: BaseException):
+        """Write the traceback without any enrichment"""
+        write_report(
+            self.stream,
+            "".join(
+                traceback.format_exception(
+                    type(exception), exception, exception.__traceback__
+                )
+            ),
+        )
+
+    def _write_fallback(self, snapshot):
+        """Write the plain traceback of a snapshot which could not be rendered"""
+        try:
+            write_report(self.stream, snapshot.format_traceback())
+        except Exception:  # pylint: disable=W0703
+            pass
+
+    def _run(self):
+        """Render queued snapshots until stopped"""
+        console_writer = None
+        while True:
+            snapshot = self._queue.get()
+            try:
+                if snapshot is _STOP:
+                    return
+                if isinstance(snapshot, str):
+                    if self.configs.format == "json":
+                        snapshot = dumps({"summary": snapshot})
+                    write_report(self.stream, f"{snapshot}\n")
+                    continue
+                if isinstance(snapshot, traceback.TracebackException):
+                    write_report(self.stream, "".join(snapshot.format()))
+                    continue
+                reraised = None
+                if isinstance(snapshot, tuple):
+                    snapshot, reraised = snapshot
+                if self.configs.format == "json":
+                    if isinstance(snapshot, DeferredSnapshot):
+                        record = deferred_record(snapshot, self._hook_loader)
+                    else:
+                        record = snapshot_record(snapshot, reraised=reraised)
+                    write_json(record, self.stream)
+                    continue
+                if isinstance(snapshot, DeferredSnapshot):
+                    snapshot = snapshot.resolve(self._hook_loader)
+                if console_writer is None or console_writer.stream is not self.stream:
+                    console_writer = self.configs.session().writer(self.stream)
+                console_writer.write_snapshot(snapshot, reraised)
+            except Exception:  # pylint: disable=W0703
+                # Never let a broken report kill the reporter, the traceback is left
+                self._write_fallback(snapshot)
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Block until all queued snapshots are written"""
+        if self._thread.is_alive():
+            self._queue.join()
+
+    def close(self):
+        """Write all queued snapshots and stop the reporter thread"""
+        if not self._thread.is_alive():
+            return
+        # Repetitions which were not summarized yet
+        if self._deduplicator is not None:
+            for summary in self._deduplicator.drain():
+                self._queue.put(summary)
+        self._queue.put(_STOP)
+        self._thread.join()
+        atexit.unregister(self.close)
+
+
+_default_reporter: Optional[BackgroundReporter] = None
+_default_reporter_lock = threading.Lock()
+
+
+def default_reporter(configs: Optional[ConfigManager] = None) -> BackgroundReporter:
+    """Reporter used by print_exception(..., background=True), started on first use
+    with the given configuration"""
+    global _default_reporter  # pylint: disable=W0603
+    with _default_reporter_lock:
+        if _default_reporter is None:
+            _default_reporter = BackgroundReporter(configs=configs)
+        return _default_reporter
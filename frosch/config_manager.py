@@ -10,18 +10,51 @@
 
 """
 import importlib
-import string
-from typing import Optional, Union
-
-from pygments.style import Style
+import importlib.util
+import os
+from typing import TYPE_CHECKING, Optional, Union
 
+from .deadline import FRAMES_BUDGET_MS
+from .session import RenderSession, _init_lock
 from .type_hooks import HookLoader
 
+if TYPE_CHECKING:  # pragma: no cover
+    from pygments.style import Style
+
+    from .dedup import StormDeduplicator
 
 class ThemeNotExistsError(Exception):
     """Thrown when trying to import a theme from pygments which does not exist"""
 
 
+def _theme_not_exists(theme_string: str) -> ThemeNotExistsError:
+    """Error for a theme name without a pygments style"""
+    return ThemeNotExistsError(
+        f"Theme: '{theme_string}' does not exists.\nPlease check \
+https://github.com/HallerPatrick/frosch#configuration for more infos."
+    )
+
+
+def _theme_exists(theme_string: str) -> bool:
+    """True if pygments has a style module of the name, looked up on disk without
+    importing pygments. If the styles are not on disk, e.g. in a zip, any name is
+    taken and checked when the theme is imported"""
+    spec = importlib.util.find_spec("pygments")
+    if spec is None or not spec.submodule_search_locations:
+        return True
+
+    for location in spec.submodule_search_locations:
+        styles = os.path.join(location, "styles")
+        if not os.path.isdir(styles):
+            return True
+        if any(
+            os.path.isfile(os.path.join(styles, f"{theme_string}{suffix}"))
+            for suffix in (".py", ".pyc")
+        ):
+            return True
+    return False
+
+
 class ConfigManager:
     """Used to parse and store configs from various ways of setting"""
 
@@ -29,7 +62,40 @@ class ConfigManager:
         self.message = None
         self.title = None
         self._theme = None
+        self._theme_name = None
         self.dt_hooks = None
+        self._hook_loader = None
+        self._session = None
+        # Output format, "text" for the debug tree or "json" for JSON lines
+        self.format = "text"
+        # Colored output, None decides by the stream and environment
+        self.color = None
+        # Use 24 bit colors instead of the 256 color palette
+        self.truecolor = False
+        # Write reports directly to the file descriptor of the stream
+        self.raw_write = False
+        # Format the crashing statement with yapf instead of the token normalizer
+        self.pretty = False
+        # Tokenize only around the crashing line, None decides by file size
+        self.windowed = None
+        # Time budget of the excepthook in milliseconds, None for no limit
+        self.budget_ms = None
+        # Frames (counted from the crashing one) which get a debug tree
+        self.frames = 1
+        # Milliseconds the frames above the crashing one may take, None for no limit
+        self.frames_budget_ms = FRAMES_BUDGET_MS
+        # Only render the first exception of a crash site within this many seconds
+        self.dedup_window = None
+        self.dedup_size = 256
+        self._deduplicator = None
+        # Limits for reprs in the debug tree, a dict of ReprLimits arguments
+        self.repr_limits = None
+
+    def __getstate__(self):
+        # Shared objects are created again on first use, e.g. in a worker process
+        state = self.__dict__.copy()
+        state.update(_hook_loader=None, _session=None, _deduplicator=None)
+        return state
 
     def set_notifier(self, title: str, message: str):
         """Setter for notifcation message"""
@@ -49,7 +115,8 @@ class ConfigManager:
     def from_kwargs(self, **kwargs):
         """Set all given kwargs as attributes, if attr exists"""
         for key, value in kwargs.items():
-            if hasattr(self, key):
+            # Don't use hasattr on the instance, it would resolve the theme property
+            if key in vars(self) or hasattr(type(self), key):
                 self.__setattr__(key, value)
         return self
 
@@ -62,19 +129,30 @@ class ConfigManager:
 
     @property
     def theme(self):
-        """Returns theme object of pygments"""
+        """Returns theme object of pygments, themes given by name are imported on first access"""
+        if self._theme is None and self._theme_name is not None:
+            self._theme = ConfigManager._get_theme_from_string(self._theme_name)
         return self._theme
 
     @theme.setter
-    def theme(self, theme: Union[str, Style]):  # pylint: disable=E1136
-        """Sets theme object of pygments for given string or already defined custom style"""
+    def theme(self, theme: Union[str, "Style"]):  # pylint: disable=E1136
+        """Sets theme object of pygments for given string or already defined custom style.
+        Theme names are only resolved when the theme is needed, which keeps pygments
+        out of the import path until the first exception is rendered. Only their
+        module is looked up, so unknown names fail right away"""
+        if isinstance(theme, str) and not _theme_exists(theme):
+            raise _theme_not_exists(theme)
+
+        self._session = None
         if isinstance(theme, str):
-            self._theme = ConfigManager._get_theme_from_string(theme)
+            self._theme_name = theme
+            self._theme = None
         else:
+            self._theme_name = None
             self._theme = theme
 
     @staticmethod
-    def _get_theme_from_string(theme_string: str) -> Style:
+    def _get_theme_from_string(theme_string: str) -> "Style":
         """Import the according theme from pygments"""
 
         pygment_styles_module_str = f"pygments.styles.{theme_string}"
@@ -85,10 +163,7 @@ class ConfigManager:
             pygment_style_class = getattr(pygment_styles_module, style_class)
             return pygment_style_class
         except ImportError as import_error:
-            raise ThemeNotExistsError(
-                f"Theme: '{theme_string}' does not exists.\nPlease check \
-https://github.com/HallerPatrick/frosch#configuration for more infos."
-            ) from import_error
+            raise _theme_not_exists(theme_string) from import_error
         except AttributeError as attr_error:  # pragma: no cover
             raise ThemeNotExistsError(
                 f"Could not find style '{style_class}' in module '{pygment_styles_module_str}'"
@@ -108,7 +183,8 @@ https://github.com/HallerPatrick/frosch#configuration for more infos."
 
         if "_" in theme_string:
             theme_string = theme_string.replace("_", " ")
-        theme_string = string.capwords(theme_string)
+        # Same as string.capwords, without pulling in re at import time
+        theme_string = " ".join(word.capitalize() for word in theme_string.split())
         return theme_string.replace(" ", "_")
 
     @staticmethod
@@ -136,11 +212,58 @@ https://github.com/HallerPatrick/frosch#configuration for more infos."
         return None
 
     def initialize_datatype_hook_loader(self) -> HookLoader:
-        """Initialize the loader, eventually with custom user created hooks"""
-        if self.dt_hooks:
-            assert dict == type(self.dt_hooks)
-            hook_loader = HookLoader.with_hooks(self.dt_hooks)
-        else:
-            hook_loader = HookLoader()
+        """Initialize the loader, eventually with custom user created hooks. The
+        loader is kept, so hooks are resolved once per configuration"""
+        from .reprs import ReprLimits  # pylint: disable=C0415
+
+        if self._hook_loader is not None:
+            return self._hook_loader
+
+        with _init_lock:
+            if self._hook_loader is not None:
+                return self._hook_loader
+
+            if self.dt_hooks:
+                assert dict == type(self.dt_hooks)
+                hook_loader = HookLoader.with_hooks(self.dt_hooks)
+            else:
+                hook_loader = HookLoader()
 
+            hook_loader.repr_limits = ReprLimits.from_config(self.repr_limits)
+            self._hook_loader = hook_loader
         return hook_loader
+
+    def parse_options(self) -> dict:
+        """Keyword arguments for ParsedException"""
+        return {
+            "pretty": self.pretty,
+            "windowed": self.windowed,
+            "frames": self.frames,
+            "frames_budget_ms": self.frames_budget_ms,
+        }
+
+    def session(self) -> RenderSession:
+        """Render session shared by all reports made with this configuration"""
+        session = self._session
+        if session is None:
+            with _init_lock:
+                if self._session is None:
+                    self._session = RenderSession(self)
+                session = self._session
+        return session
+
+    def initialize_deduplicator(self) -> Optional["StormDeduplicator"]:
+        """Deduplicator shared by all reports made with this configuration,
+        None if deduplication is disabled"""
+        if self.dedup_window is None:
+            return None
+
+        if self._deduplicator is None:
+            from .dedup import StormDeduplicator  # pylint: disable=C0415
+
+            with _init_lock:
+                if self._deduplicator is None:
+                    self._deduplicator = StormDeduplicator(
+                        self.dedup_window, self.dedup_size
+                    )
+        return self._deduplicator
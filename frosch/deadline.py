@@ -0,0 +1,80 @@
+"""
+
+    frosch - Better runtime errors
+
+    Patrick Haller
+    patrickhaller40@googlemail.com
+
+    License MIT
+
+    A time budget shared by all stages of rendering an exception. Stages check
+    the deadline before they run and are skipped once the budget is used up.
+    The check is cooperative, a stage which already runs is not interrupted.
+
+"""
+
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+EXTRACTION = "extraction"
+FORMATTING = "formatting"
+VARIABLES = "variables"
+HOOKS = "hooks"
+COLOR = "color"
+
+# Milliseconds all frames above the crashing one may take to be inspected
+FRAMES_BUDGET_MS = 25
+
+
+class Deadline:
+    """Deadline of a report, without a budget it never expires"""
+
+    def __init__(self, budget_ms: Optional[float] = None):
+        self.budget_ms = budget_ms
+        self.skipped: List[str] = []
+        if budget_ms is None:
+            self._end = None
+        else:
+            self._end = time.perf_counter() + budget_ms / 1000
+
+    def expired(self) -> bool:
+        """True if the budget is used up"""
+        return self._end is not None and time.perf_counter() >= self._end
+
+    def remaining(self, default: Optional[float] = None) -> Optional[float]:
+        """Seconds left, default if there is no budget"""
+        if self._end is None:
+            return default
+        return max(self._end - time.perf_counter(), 0.0)
+
+    def check(self, stage: str) -> bool:
+        """True if stage can still run, else the stage is recorded as skipped"""
+        if self.expired():
+            self.skip(stage)
+            return False
+        return True
+
+    def skip(self, stage: str):
+        """Record stage as skipped"""
+        if stage not in self.skipped:
+            self.skipped.append(stage)
+
+    def summary(self) -> Optional[str]:
+        """Note about skipped stages, None if nothing was skipped"""
+        if not self.skipped:
+            return None
+        return (
+            f"frosch: budget of {self.budget_ms:g}ms exhausted, "
+            f"skipped {', '.join(self.skipped)}"
+        )
+
+
+def call_with_timeout(func: Callable, timeout: float, *args) -> Any:
+    """Run func in a daemon thread and return its result, or None if it took
+    longer than timeout seconds. func should not raise."""
+    result = []
+    worker = threading.Thread(target=lambda: result.append(func(*args)), daemon=True)
+    worker.start()
+    worker.join(timeout)
+    return result[0] if result else None
@@ -0,0 +1,162 @@
+"""
+
+    frosch - Better runtime errors
+
+    Patrick Haller
+    patrickhaller40@googlemail.com
+
+    License MIT
+
+    Deduplication of exception storms. Exceptions are keyed by a cheap signature
+    of their crash site, only the first occurrence within a time window is
+    rendered, repetitions are summarized in single lines.
+
+"""
+
+from collections import OrderedDict
+import re
+import threading
+import time
+from typing import Callable, List, Tuple
+
+# Numbers and addresses in messages, e.g. ids or indices, don't make a new signature
+_VARIABLE_PARTS = re.compile(r"0x[0-9a-fA-F]+|\d+")
+
+# Only the start of a message is part of the signature
+MAX_MESSAGE_LENGTH = 200
+
+
+def crash_signature(exception: BaseException) -> Tuple:
+    """Exception type, file, line of the crash and the message template"""
+    traceback_ = exception.__traceback__
+    filename, lineno = None, None
+    if traceback_ is not None:
+        while traceback_.tb_next is not None:
+            traceback_ = traceback_.tb_next
+        filename = traceback_.tb_frame.f_code.co_filename
+        lineno = traceback_.tb_lineno
+
+    try:
+        message = str(exception)[:MAX_MESSAGE_LENGTH]
+    except Exception:  # pylint: disable=W0703
+        message = ""
+
+    error_type = type(exception)
+    return (
+        error_type.__module__,
+        error_type.__qualname__,
+        filename,
+        lineno,
+        _VARIABLE_PARTS.sub("#", message),
+    )
+
+
+class _Occurrences:
+    """Occurrences of one signature within the current window"""
+
+    def __init__(self, window_start: float, since: float):
+        self.window_start = window_start
+        self.last_seen = window_start
+        self.since = since
+        self.suppressed = 0
+        # Number of suppressed repetitions in the last summary
+        self.reported = 0
+
+
+class StormDeduplicator:
+    """Fixed size table of recent crash sites with LRU eviction"""
+
+    def __init__(
+        self,
+        window: float = 60.0,
+        max_entries: int = 256,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.window = window
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, _Occurrences]" = OrderedDict()
+
+    def check(self, exception: BaseException) -> Tuple[bool, List[str]]:
+        """Returns if the exception should be fully rendered and summary lines of
+        suppressed repetitions"""
+        signature = crash_signature(exception)
+        with self._lock:
+            return self._check(signature, self._clock())
+
+    def _check(self, signature: Tuple, now: float) -> Tuple[bool, List[str]]:
+        """check of a signature, the caller holds the lock"""
+        summaries = self._expire(now)
+
+        occurrences = self._entries.get(signature)
+        if occurrences is None:
+            summaries += self._add(signature, _Occurrences(now, time.time()))
+            return True, summaries
+
+        self._entries.move_to_end(signature)
+        occurrences.last_seen = now
+
+        # Window is over, render again and report what was left out
+        if now - occurrences.window_start >= self.window:
+            summaries += self._final_summary(signature, occurrences)
+            self._entries[signature] = _Occurrences(now, time.time())
+            return True, summaries
+
+        occurrences.suppressed += 1
+
+        # Summarize with exponentially growing gaps, 1, 2, 4, 8, ...
+        if occurrences.suppressed & (occurrences.suppressed - 1) == 0:
+            occurrences.reported = occurrences.suppressed
+            summaries.append(self._summary(signature, occurrences))
+        return False, summaries
+
+    def drain(self) -> List[str]:
+        """Forget all crash sites, returns the summaries of repetitions which were
+        not reported yet"""
+        with self._lock:
+            summaries = []
+            for signature, occurrences in self._entries.items():
+                summaries += self._final_summary(signature, occurrences)
+            self._entries.clear()
+            return summaries
+
+    def _expire(self, now: float) -> List[str]:
+        """Forget crash sites not seen for a whole window, the least recently seen
+        come first"""
+        summaries = []
+        while self._entries:
+            signature, occurrences = next(iter(self._entries.items()))
+            if now - occurrences.last_seen < self.window:
+                break
+            del self._entries[signature]
+            summaries += self._final_summary(signature, occurrences)
+        return summaries
+
+    def _add(self, signature: Tuple, occurrences: _Occurrences) -> List[str]:
+        """Add a new signature, evict the least recently seen if the table is full"""
+        self._entries[signature] = occurrences
+        summaries = []
+        while len(self._entries) > self.max_entries:
+            evicted = self._entries.popitem(last=False)
+            summaries += self._final_summary(*evicted)
+        return summaries
+
+    def _final_summary(self, signature: Tuple, occurrences: _Occurrences) -> List[str]:
+        """Summary of the repetitions after the last one, if there are any"""
+        if occurrences.suppressed > occurrences.reported:
+            return [self._summary(signature, occurrences)]
+        return []
+
+    @staticmethod
+    def _summary(signature: Tuple, occurrences: _Occurrences) -> str:
+        """Compact line about suppressed repetitions"""
+        _, qualname, filename, lineno, _ = signature
+        since = time.strftime("%H:%M:%S", time.localtime(occurrences.since))
+        return (
+            f"×{occurrences.suppressed} more {qualname} since {since} "
+            f"at {filename}:{lineno}"
+        )
+
+    def __len__(self):
+        return len(self._entries)
@@ -7,52 +7,147 @@
 
     License MIT
 
+    Statistics are reduced chunk by chunk, so neither full size masks nor copies
+    of the array are allocated and memory maps are not paged in completely.
+
 """
 import numpy as np
 
+# Bytes of a single chunk, the peak memory of a reduction is a small multiple of it
+CHUNK_BYTES = 1 << 22
+
+# Arrays with more elements get a median of an evenly strided sample
+MEDIAN_EXACT_LIMIT = 1 << 18
+MEDIAN_SAMPLE_SIZE = 1 << 16
+
+_DTYPE_NAMES = {
+    np.dtype("float16"): "f16",
+    np.dtype("float32"): "f32",
+    np.dtype("float64"): "f64",
+    np.dtype("int8"): "i8",
+    np.dtype("int16"): "i16",
+    np.dtype("int32"): "i32",
+    np.dtype("int64"): "i64",
+    np.dtype("uint8"): "ui8",
+    np.dtype("uint16"): "ui16",
+    np.dtype("uint32"): "ui32",
+    np.dtype("uint64"): "ui64",
+    np.dtype("bool"): "bool",
+    np.dtype("object"): "obj",
+}
+
+
+def _dtype_name(dtype: np.dtype) -> str:
+    """Short name of dtype"""
+    if dtype.kind in "US":
+        return "str"
+    return _DTYPE_NAMES.get(dtype, "unknown")
+
+
+def iter_chunks(np_array: np.ndarray, chunk_bytes: int = CHUNK_BYTES):
+    """Yield 1d chunks of np_array of at most chunk_bytes, in memory order and
+    without copying the array. Masked values of masked arrays are left out"""
+    chunk_elements = max(1, chunk_bytes // max(np_array.itemsize, 1))
+    mask = np.ma.getmask(np_array)
+    operands = [np.ma.getdata(np_array)]
+    if mask is not np.ma.nomask:
+        operands.append(mask)
+
+    iterator = np.nditer(
+        operands,
+        flags=["external_loop", "buffered", "zerosize_ok", "refs_ok"],
+        op_flags=[["readonly"]] * len(operands),
+        order="K",
+        buffersize=chunk_elements,
+    )
+    for chunks in iterator:
+        if mask is np.ma.nomask:
+            yield chunks
+        else:
+            yield chunks[0][~chunks[1]]
+
+
+class ChunkStats:
+    """NaN and Inf counts, min and max of the finite values of an array"""
+
+    def __init__(self):
+        self.nans = 0
+        self.infs = 0
+        self.min = None
+        self.max = None
+
+    def update(self, chunk: np.ndarray):
+        """Add the values of chunk"""
+        if chunk.dtype.kind in "fc":
+            self.nans += int(np.isnan(chunk).sum())
+            self.infs += int(np.isinf(chunk).sum())
+            if chunk.dtype.kind == "c":
+                return
+            chunk = chunk[np.isfinite(chunk)]
+
+        if chunk.size == 0:
+            return
+        chunk_min, chunk_max = chunk.min(), chunk.max()
+        self.min = chunk_min if self.min is None else min(self.min, chunk_min)
+        self.max = chunk_max if self.max is None else max(self.max, chunk_max)
+
+    @classmethod
+    def of(cls, np_array: np.ndarray, chunk_bytes: int = CHUNK_BYTES) -> "ChunkStats":
+        """Stats of np_array reduced chunk by chunk"""
+        stats = cls()
+        for chunk in iter_chunks(np_array, chunk_bytes):
+            stats.update(chunk)
+        return stats
+
+
+def median(np_array: np.ndarray):
+    """Median of the finite values, approximated by a sample for large arrays.
+    Returns the median and whether it is exact, None if there are no values"""
+    exact = np_array.size <= MEDIAN_EXACT_LIMIT
+    if exact:
+        # At most MEDIAN_EXACT_LIMIT elements are copied
+        values = np.ravel(np_array)
+    else:
+        indices = np.linspace(0, np_array.size - 1, MEDIAN_SAMPLE_SIZE).astype(np.intp)
+        values = np_array.flat[indices]
+
+    if isinstance(values, np.ma.MaskedArray):
+        values = values.compressed()
+    if values.dtype.kind == "f":
+        values = values[np.isfinite(values)]
+    if values.size == 0:
+        return None, exact
+    return np.median(values), exact
+
 
 def display_np_array(np_array) -> str:
     """Display function for np.array"""
 
-    result = ""
-    result = f"{result} {np_array.shape}"
-
-    dtype = {
-        np.dtype("float32"): "f32",
-        np.dtype("float64"): "f64",
-        np.dtype("int8"): "i8",
-        np.dtype("int16"): "i16",
-        np.dtype("int32"): "i32",
-        np.dtype("int64"): "i64",
-        np.dtype("uint8"): "ui8",
-        np.dtype("uint16"): "ui16",
-        np.dtype("uint32"): "ui32",
-        np.dtype("uint64"): "ui64",
-        np.dtype("bool"): "ui64",
-        np.dtype("str"): "str",
-        np.dtype("object"): "obj",
-    }.get(np_array.dtype, "unknown")
-
-    result = f"{result}[{dtype}]"
-
-    nan = np.isnan(np_array).sum()
-    inf = np.isinf(np_array).sum()
-    if nan > 0:
+    result = f" {np_array.shape}[{_dtype_name(np_array.dtype)}]"
+    kind = np_array.dtype.kind
+
+    if kind == "b":
+        return f"{result} True:{np.count_nonzero(np_array)}"
+
+    if kind not in "iufc":
+        return result
+
+    stats = ChunkStats.of(np_array)
+
+    if stats.nans > 0:
         # It would mark the content as warning, e.g. coloring to red
         warning_marker = lambda x: f"!!{x}!!"
-        nan = warning_marker(f"NaNs:{nan}")
+        nan = warning_marker(f"NaNs:{stats.nans}")
     else:
-        nan = f"NaNs:{nan}"
+        nan = f"NaNs:{stats.nans}"
 
-    result = f"{result} {nan} Infs:{inf}"
+    result = f"{result} {nan} Infs:{stats.infs}"
 
-    if np_array.dtype not in (np.dtype("str"), np.dtype("object")):
-        tmp = np_array.ravel()
-        tmp = tmp[np.isfinite(tmp)]
-        min_ = tmp.min()
-        max_ = tmp.max()
-        med_ = np.median(tmp)
-        result = f"{result} min:{min_} max:{max_} median:{med_}"
+    if stats.min is not None:
+        result = f"{result} min:{stats.min} max:{stats.max}"
+        median_, exact = median(np_array)
+        if median_ is not None:
+            result = f"{result} median{'' if exact else '~'}:{median_}"
 
     return result
 
@@ -0,0 +1,52 @@
+"""
+
+    frosch - Better runtime errors
+
+    Patrick Haller
+    patrickhaller40@googlemail.com
+
+    License MIT
+
+"""
+
+from typing import Optional
+
+import pandas as pd
+
+from .tables import MAX_COLUMNS, describe_table
+
+def _null_count(series: pd.Series) -> Optional[int]:
+    """Null count of series from the metadata of an arrow backed array, None for
+    other columns, whose nulls can only be found by reading the values"""
+    arrow_array = getattr(series.array, "_pa_array", None)
+    if arrow_array is not None:
+        return arrow_array.null_count
+    return None
+
+
+def display_data_frame(frame: pd.DataFrame) -> str:
+    """Shape, shallow memory and dtypes of a DataFrame"""
+    columns = (
+        (str(name), str(frame.dtypes.iloc[i]), _null_count(frame.iloc[:, i]))
+        for i, name in enumerate(frame.columns[:MAX_COLUMNS])
+    )
+    memory = int(frame.memory_usage(index=True, deep=False).sum())
+    return describe_table(frame.shape, columns, len(frame.columns), memory)
+
+
+def display_series(series: pd.Series) -> str:
+    """Length, dtype and shallow memory of a Series"""
+    columns = [(str(series.name), str(series.dtype), _null_count(series))]
+    return describe_table(series.shape, columns, 1, series.memory_usage(deep=False))
+
+
+def display_index(index: pd.Index) -> str:
+    """Kind, length and dtype of an Index"""
+    return f" {type(index).__name__} {index.shape}[{index.dtype}]"
+
+
+hooks = {
+    pd.DataFrame: display_data_frame,
+    pd.Series: display_series,
+    pd.Index: display_index,
+}
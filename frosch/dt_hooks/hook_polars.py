@@ -0,0 +1,33 @@
+"""
+
+    frosch - Better runtime errors
+
+    Patrick Haller
+    patrickhaller40@googlemail.com
+
+    License MIT
+
+"""
+
+import polars as pl
+
+from .tables import MAX_COLUMNS, describe_table
+
+
+def display_data_frame(frame: pl.DataFrame) -> str:
+    """Shape, memory and dtypes of a DataFrame, null counts are column metadata"""
+    columns = (
+        (series.name, str(series.dtype), series.null_count())
+        for series in frame.get_columns()[:MAX_COLUMNS]
+    )
+    return describe_table(frame.shape, columns, frame.width, frame.estimated_size())
+
+
+def display_lazy_frame(frame: pl.LazyFrame) -> str:
+    """Schema of a LazyFrame, the query is never collected"""
+    schema = frame.collect_schema()
+    columns = ((name, str(dtype), None) for name, dtype in schema.items())
+    return f" LazyFrame{describe_table(None, columns, len(schema))}"
+
+
+hooks = {pl.DataFrame: display_data_frame, pl.LazyFrame: display_lazy_frame}
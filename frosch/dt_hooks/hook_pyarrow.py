@@ -0,0 +1,27 @@
+"""
+
+    frosch - Better runtime errors
+
+    Patrick Haller
+    patrickhaller40@googlemail.com
+
+    License MIT
+
+"""
+
+import pyarrow as pa
+
+from .tables import MAX_COLUMNS, describe_table
+
+
+def display_table(table) -> str:
+    """Shape, buffer size and schema of a Table or RecordBatch, null counts are
+    column metadata"""
+    columns = (
+        (table.schema[i].name, str(table.schema[i].type), table.column(i).null_count)
+        for i in range(min(table.num_columns, MAX_COLUMNS))
+    )
+    return describe_table(table.shape, columns, table.num_columns, table.nbytes)
+
+
+hooks = {pa.Table: display_table, pa.RecordBatch: display_table}
@@ -7,14 +7,174 @@
 
     License MIT
 
+    Tensors are reduced chunk by chunk on views, they are never cloned or
+    converted to numpy. Modules are summarized from parameter metadata only.
+
 """
 
 import torch
 
+from ..reprs import human_bytes
+
+# Elements of a single chunk of a NaN/Inf/min/max reduction
+CHUNK_ELEMENTS = 1 << 20
+
+_DTYPE_NAMES = {
+    torch.float16: "f16",
+    torch.bfloat16: "bf16",
+    torch.float32: "f32",
+    torch.float64: "f64",
+    torch.int8: "i8",
+    torch.int16: "i16",
+    torch.int32: "i32",
+    torch.int64: "i64",
+    torch.uint8: "ui8",
+    torch.bool: "bool",
+}
+
+
+# Dtypes which NaN/Inf/min/max are implemented for on the CPU, e.g. not for uint16
+_REDUCIBLE_DTYPES = {
+    torch.float16,
+    torch.bfloat16,
+    torch.float32,
+    torch.float64,
+    torch.int8,
+    torch.int16,
+    torch.int32,
+    torch.int64,
+    torch.uint8,
+}
+
+
+def _dtype_name(dtype: torch.dtype) -> str:
+    """Short name of dtype"""
+    return _DTYPE_NAMES.get(dtype, str(dtype).replace("torch.", ""))
+
+
+def iter_chunks(tensor: torch.Tensor, chunk_elements: int = CHUNK_ELEMENTS):
+    """Yield views of tensor with at most chunk_elements elements each"""
+    tensor = tensor.detach()
+    if tensor.dim() == 0 or tensor.is_contiguous():
+        flat = tensor.view(-1)
+        for start in range(0, flat.numel(), chunk_elements):
+            yield flat[start : start + chunk_elements]
+        return
+
+    # Strided tensors are sliced along their first dimension to avoid a copy,
+    # rows larger than a chunk are split up along the next dimensions
+    if tensor.dim() == 1:
+        row_elements = 1
+    else:
+        row_elements = tensor.numel() // tensor.shape[0] if tensor.shape[0] else 1
+    if row_elements > chunk_elements:
+        for row in tensor:
+            yield from iter_chunks(row, chunk_elements)
+        return
+
+    rows = max(1, chunk_elements // max(row_elements, 1))
+    for start in range(0, tensor.shape[0], rows):
+        yield tensor[start : start + rows]
+
+
+class ChunkStats:
+    """NaN and Inf counts, min and max of the finite values of a tensor"""
+
+    def __init__(self):
+        self.nans = 0
+        self.infs = 0
+        self.min = None
+        self.max = None
+
+    def update(self, chunk: torch.Tensor):
+        """Add the values of chunk"""
+        if chunk.is_floating_point():
+            self.nans += int(torch.isnan(chunk).sum())
+            self.infs += int(torch.isinf(chunk).sum())
+            chunk = chunk[torch.isfinite(chunk)]
+
+        if chunk.numel() == 0:
+            return
+        chunk_min, chunk_max = chunk.min().item(), chunk.max().item()
+        self.min = chunk_min if self.min is None else min(self.min, chunk_min)
+        self.max = chunk_max if self.max is None else max(self.max, chunk_max)
+
+    @classmethod
+    def of(cls, tensor: torch.Tensor, chunk_elements: int = CHUNK_ELEMENTS):
+        """Stats of tensor reduced chunk by chunk"""
+        stats = cls()
+        for chunk in iter_chunks(tensor, chunk_elements):
+            stats.update(chunk)
+        return stats
+
+
+def _has_readable_values(tensor: torch.Tensor) -> bool:
+    """Only dense CPU tensors of dtypes with reductions are reduced, others would
+    need a device sync or have no data at all"""
+    return (
+        tensor.device.type == "cpu"
+        and tensor.layout == torch.strided
+        and tensor.dtype in _REDUCIBLE_DTYPES
+    )
+
 
 def display_torch_tensor(tensor: torch.Tensor) -> str:
     """In most cases more usefull to get the dimensions of a tensor, than its values"""
-    return str(tensor.size())
+    result = (
+        f" {tuple(tensor.shape)}[{_dtype_name(tensor.dtype)}] {tensor.device}"
+        f" requires_grad:{tensor.requires_grad}"
+    )
+
+    if tensor.layout == torch.strided:
+        contiguity = "contiguous" if tensor.is_contiguous() else "strided"
+        result = f"{result} stride:{tensor.stride()} {contiguity}"
+
+    if tensor.dtype == torch.bool and tensor.device.type == "cpu":
+        return f"{result} True:{int(torch.count_nonzero(tensor))}"
+
+    if not _has_readable_values(tensor):
+        return result
+
+    with torch.no_grad():
+        stats = ChunkStats.of(tensor)
+
+    if stats.nans > 0:
+        # It would mark the content as warning, e.g. coloring to red
+        result = f"{result} !!NaNs:{stats.nans}!!"
+    else:
+        result = f"{result} NaNs:0"
+    result = f"{result} Infs:{stats.infs}"
+
+    if stats.min is not None:
+        result = f"{result} min:{stats.min} max:{stats.max}"
+    return result
+
+
+def display_parameter(parameter: torch.nn.Parameter) -> str:
+    """Parameters are tensors with a marker"""
+    return f"Parameter{display_torch_tensor(parameter)}"
+
+
+def display_module(module: torch.nn.Module) -> str:
+    """Parameter count and memory of a module, from metadata only"""
+    count, trainable, size = 0, 0, 0
+    for parameter in module.parameters():
+        count += parameter.numel()
+        size += parameter.numel() * parameter.element_size()
+        if parameter.requires_grad:
+            trainable += parameter.numel()
+
+    buffers = sum(buffer.numel() * buffer.element_size() for buffer in module.buffers())
+
+    mode = "train" if module.training else "eval"
+    return (
+        f" {type(module).__name__} params:{count} trainable:{trainable}"
+        f" memory:{human_bytes(size + buffers)} {mode}"
+    )
 
 
-hooks = {torch.Tensor: display_torch_tensor}
+hooks = {
+    torch.Tensor: display_torch_tensor,
+    torch.nn.Parameter: display_parameter,
+    torch.nn.Module: display_module,
+}
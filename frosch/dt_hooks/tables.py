@@ -0,0 +1,44 @@
+"""
+
+    frosch - Better runtime errors
+
+    Patrick Haller
+    patrickhaller40@googlemail.com
+
+    License MIT
+
+    Shared summary format of the dataframe and table hooks. Only metadata is
+    passed in, rows are never read.
+
+"""
+
+from itertools import islice
+from typing import Iterable, Optional, Tuple
+
+from ..reprs import human_bytes
+
+# Columns which are listed with their dtype, the rest is only counted
+MAX_COLUMNS = 8
+
+Column = Tuple[str, str, Optional[int]]
+
+
+def describe_table(
+    shape: Optional[tuple],
+    columns: Iterable[Column],
+    column_count: int,
+    memory: Optional[int] = None,
+) -> str:
+    """Shape, memory and the first columns as name:dtype, with their null count
+    if it is known and not zero"""
+    result = "" if shape is None else f" {shape}"
+    if memory is not None:
+        result = f"{result} memory:{human_bytes(memory)}"
+
+    listed = []
+    for name, dtype, nulls in islice(columns, MAX_COLUMNS):
+        listed.append(f"{name}:{dtype}" + (f"(nulls:{nulls})" if nulls else ""))
+    if column_count > MAX_COLUMNS:
+        listed.append(f"…({column_count - MAX_COLUMNS} more)")
+
+    return f"{result} [{', '.join(listed)}]"
@@ -0,0 +1,74 @@
+"""
+
+    frosch - Better runtime errors
+
+    Patrick Haller
+    patrickhaller40@googlemail.com
+
+    License MIT
+
+    Lean introspection of tracebacks. The traceback chain is walked once,
+    source lines are only looked up when they are asked for.
+
+"""
+
+import linecache
+from types import FrameType, TracebackType
+from typing import List, Optional
+
+
+class FrameRef:
+    """A frame of a traceback with the line it was executing"""
+
+    def __init__(self, frame: FrameType, lineno: int):
+        self.frame = frame
+        self.lineno = lineno
+        self._line = None
+
+    def __repr__(self):
+        return f"FrameRef({self.filename!r}, {self.lineno}, {self.name!r})"
+
+    @property
+    def filename(self) -> str:
+        """File of the code of the frame"""
+        return self.frame.f_code.co_filename
+
+    @property
+    def name(self) -> str:
+        """Name of the code of the frame"""
+        return self.frame.f_code.co_name
+
+    @property
+    def line(self) -> str:
+        """Stripped source line, looked up on first access"""
+        if self._line is None:
+            self._line = linecache.getline(
+                self.filename, self.lineno, self.frame.f_globals
+            ).strip()
+        return self._line
+
+    @property
+    def locals(self) -> dict:
+        """Local variables of the frame"""
+        return self.frame.f_locals
+
+    @property
+    def globals(self) -> dict:
+        """Global variables of the frame"""
+        return self.frame.f_globals
+
+
+def walk_traceback(traceback_: Optional[TracebackType]) -> List[FrameRef]:
+    """All frames of a traceback, outermost first like traceback.extract_tb"""
+    stack = []
+    while traceback_ is not None:
+        stack.append(FrameRef(traceback_.tb_frame, traceback_.tb_lineno))
+        traceback_ = traceback_.tb_next
+    return stack
+
+
+def innermost_frame(traceback_: TracebackType) -> FrameType:
+    """Frame in which the exception was raised"""
+    while traceback_.tb_next is not None:
+        traceback_ = traceback_.tb_next
+    return traceback_.tb_frame
@@ -7,22 +7,32 @@
 
     License MIT
 
+    Only the hook itself lives at import time. Everything needed for rendering
+    (pygments, yapf, stack_data, asttokens, colorama) is imported when the
+    first exception is actually handled.
+
+    Besides sys.excepthook, the hooks of threads and of unraisable exceptions
+    (e.g. in __del__) are replaced. They only report, the process goes on.
+
 """
 
 import sys
-import traceback
+import threading
 
 from types import TracebackType
 from typing import Optional, Type
 
 from .config_manager import ConfigManager
-from .notifier import notify_os
-from .parser import MissingStacktraceError, ParsedException
-from .writer import ConsoleWriter
 
 
 DEBUG = False
 
+# Configuration of print_exception and friends as long as hook() was not called
+_DEFAULT_CONFIGS: Optional[ConfigManager] = None
+
+# Guards the configuration of hook() and the default configuration
+_configs_lock = threading.Lock()
+
 ETType = Optional[Type[BaseException]]
 EType = Optional[BaseException]
 
@@ -34,29 +44,154 @@ def hook(**kwargs):
     else:
         config_manager = ConfigManager.default()
 
-    pytrace_excepthook.configs = config_manager
+    with _configs_lock:
+        pytrace_excepthook.configs = config_manager
     _hook()
 
 
 def _hook():
-    """Overwrite sys.excepthook"""
+    """Overwrite sys.excepthook, threading.excepthook and sys.unraisablehook"""
     # Don't want global vars
     sys.excepthook = pytrace_excepthook
 
+    # Both hooks only exist since python 3.8
+    if hasattr(threading, "excepthook"):
+        threading.excepthook = pytrace_threading_excepthook
+    if hasattr(sys, "unraisablehook"):
+        sys.unraisablehook = pytrace_unraisablehook
+
+
+def print_exception(
+    exception: BaseException,
+    background: bool = False,
+    format: Optional[str] = None,  # pylint: disable=W0622
+):
+    """Pretty print the exception and traceback to stdout. In background mode only a
+    snapshot of the exception is taken, rendering happens in a reporter thread.
+    format is "text" or "json", by default the format of hook() is used"""
+    if background:
+        from .background import default_reporter  # pylint: disable=C0415
+
+        default_reporter(_active_configs()).submit(exception)
+        return
+
+    write_exception(exception, sys.stdout, format=format)
+
+
+def _active_configs() -> ConfigManager:
+    """Configuration of hook(), default configuration if not hooked. The default
+    configuration is kept, so its render session is reused as well"""
+    configs = getattr(pytrace_excepthook, "configs", None)
+    if configs is not None:
+        return configs
+
+    global _DEFAULT_CONFIGS  # pylint: disable=W0603
+    with _configs_lock:
+        if _DEFAULT_CONFIGS is None:
+            _DEFAULT_CONFIGS = ConfigManager.default()
+        return _DEFAULT_CONFIGS
+
+
+def write_exception(
+    exception: BaseException,
+    stream,
+    configs: Optional[ConfigManager] = None,
+    format: Optional[str] = None,  # pylint: disable=W0622
+    color: Optional[bool] = None,
+):
+    """Pretty print the exception and its traceback to stream. Does not depend on
+    sys.exc_info, so it can also run outside of the except block, e.g. in another thread.
+    Exceptions of worker processes with a snapshot are written from the snapshot.
+    Whether the report is colored is decided by stream, unless color is given"""
+    # pylint: disable=C0415
+    from .parser import ParsedException
+    from .snapshot import attached_snapshot, reraised_traceback
+
+    config_manager = configs or _active_configs()
+    as_json = (format or config_manager.format) == "json"
+
+    deduplicator = config_manager.initialize_deduplicator()
+    if deduplicator is not None:
+        render, summaries = deduplicator.check(exception)
+        for summary in summaries:
+            _write_summary(summary, stream, as_json)
+        if not render:
+            return
+
+    def writer():
+        console_writer = config_manager.session().writer(stream)
+        if color is not None:
+            console_writer.color = color
+        return console_writer
 
-def print_exception(exception: Exception):
-    """Pretty print the exception and traceback to stdout"""
-    config_manager = ConfigManager.default()
+    snapshot = attached_snapshot(exception)
+    if snapshot is not None:
+        reraised = reraised_traceback(exception)
+        if as_json:
+            from .structured import snapshot_record, write_json
 
-    hook_loader = config_manager.initialize_datatype_hook_loader()
+            record = snapshot_record(snapshot, reraised=reraised)
+            write_json(record, stream, config_manager.raw_write)
+        else:
+            writer().write_snapshot(snapshot, reraised)
+        return
 
-    # Do we even need exception as param?
-    error_type, error_message, _ = sys.exc_info()
     parsed_exception = ParsedException(
-        exception.__traceback__, error_type, error_message
+        exception.__traceback__,
+        type(exception),
+        exception,
+        **config_manager.parse_options(),
+    )
+    if as_json:
+        from .structured import exception_record, write_json
+
+        hook_loader = config_manager.initialize_datatype_hook_loader()
+        write_json(
+            exception_record(parsed_exception, hook_loader),
+            stream,
+            config_manager.raw_write,
+        )
+        return
+
+    writer().write_exception(parsed_exception)
+
+
+def _write_summary(summary: str, stream, as_json: bool):
+    """Write a summary of deduplicated exceptions, as JSON line in json format"""
+    # pylint: disable=C0415
+    from .writer import write_report
+
+    if as_json:
+        from .structured import dumps
+
+        summary = dumps({"summary": summary})
+    write_report(stream, f"{summary}\n")
+
+
+def format_exception(
+    exception: BaseException,
+    configs: Optional[ConfigManager] = None,
+    format: Optional[str] = None,  # pylint: disable=W0622
+    color: Optional[bool] = None,
+) -> str:
+    """Render the exception like print_exception, but return it as string. The
+    string is not colored, unless color is given or configured"""
+    import io  # pylint: disable=C0415
+
+    stream = io.StringIO()
+    write_exception(exception, stream, configs, format, color)
+    return stream.getvalue()
+
+
+def _write_plain_traceback(
+    error_type: ETType, error_message: EType, traceback_: TracebackType
+):
+    """Write the traceback like the default excepthook would"""
+    import traceback  # pylint: disable=C0415
+
+    sys.stderr.write(
+        "".join(traceback.format_exception(error_type, error_message, traceback_))
     )
-    console_writer = ConsoleWriter(config_manager.theme, sys.stdout, hook_loader)
-    console_writer.write_exception(parsed_exception)
 
 
 def pytrace_excepthook(
@@ -69,9 +204,11 @@ def pytrace_excepthook(
 
     try:
         _pytrace_excepthook(error_type, error_message, traceback_)
-    except Exception:  # pylint: disable=W0703
+    except Exception as error:  # pylint: disable=W0703
+        _write_plain_traceback(error_type, error_message, traceback_)
+        # Tell why the report is missing, e.g. a broken theme
         sys.stderr.write(
-            "".join(traceback.format_exception(error_type, error_message, traceback_))
+            f"\nfrosch could not render the report: {type(error).__name__}: {error}\n"
         )
         sys.exit(1)
 
@@ -80,23 +217,128 @@ def _pytrace_excepthook(
     error_type: ETType, error_message: EType, traceback_: TracebackType
 ):
     """New excepthook to overwrite sys.excepthook"""
+    # Imports are part of the budget
+    from .deadline import Deadline  # pylint: disable=C0415
+
     configs = pytrace_excepthook.configs
+    deadline = Deadline(configs.budget_ms)
+
+    # pylint: disable=C0415
+    from .notifier import notify_os
+    from .parser import MissingStacktraceError, ParsedException
+
     hook_loader = configs.initialize_datatype_hook_loader()
 
     try:
-        parsed_exception = ParsedException(traceback_, error_type, error_message)
-    except MissingStacktraceError:
-        sys.stderr.write(
-            "".join(traceback.format_exception(error_type, error_message, traceback_))
+        parsed_exception = ParsedException(
+            traceback_,
+            error_type,
+            error_message,
+            deadline=deadline,
+            **configs.parse_options(),
         )
+    except MissingStacktraceError:
+        _write_plain_traceback(error_type, error_message, traceback_)
         sys.exit(1)
 
     # Write down
-    console_writer = ConsoleWriter(configs.theme, sys.stderr, hook_loader)
-    console_writer.write_exception(parsed_exception)
+    if configs.format == "json":
+        from .structured import exception_record, write_json
+
+        record = exception_record(parsed_exception, hook_loader, deadline)
+        write_json(record, sys.stderr, configs.raw_write)
+    else:
+        console_writer = configs.session().writer(sys.stderr, deadline)
+        console_writer.write_exception(parsed_exception)
 
     if configs.has_notifier():
         notify_os(configs.title, configs.message)
 
     # We always dealing with runtime errors, so always return 1
     sys.exit(1)
+
+
+def _write_hook_report(
+    error_type: ETType, error_message: EType, traceback_: TracebackType, header: str
+):
+    """Write the report of an exception which does not end the process, with
+    header as first line (as "context" in json format). Header and report are
+    written at once, so reports of concurrent threads don't interleave"""
+    # pylint: disable=C0415
+    import io
+
+    from .deadline import Deadline
+    from .parser import ParsedException
+    from .writer import write_report
+
+    configs = _active_configs()
+    deadline = Deadline(configs.budget_ms)
+    parsed_exception = ParsedException(
+        traceback_,
+        error_type,
+        error_message,
+        deadline=deadline,
+        **configs.parse_options(),
+    )
+
+    if configs.format == "json":
+        from .structured import exception_record, write_json
+
+        hook_loader = configs.initialize_datatype_hook_loader()
+        record = exception_record(parsed_exception, hook_loader, deadline)
+        record["context"] = header
+        write_json(record, sys.stderr, configs.raw_write)
+        return
+
+    session = configs.session()
+    stream = io.StringIO()
+    console_writer = session.writer(stream, deadline)
+    console_writer.color = session.use_color(sys.stderr)
+    console_writer.write_exception(parsed_exception)
+    write_report(sys.stderr, f"{header}\n{stream.getvalue()}", configs.raw_write)
+
+
+def pytrace_threading_excepthook(args):
+    """New threading.excepthook, falls back to the default hook if reporting fails"""
+    # Like the default hook, threads ended by sys.exit are silent
+    if args.exc_type is SystemExit:
+        return
+
+    name = args.thread.name if args.thread is not None else threading.get_ident()
+    try:
+        _write_hook_report(
+            args.exc_type,
+            args.exc_value,
+            args.exc_traceback,
+            f"Exception in thread {name}:",
+        )
+    except Exception:  # pylint: disable=W0703
+        threading.__excepthook__(args)
+
+
+def _unraisable_header(unraisable) -> str:
+    """First line like the default unraisablehook's, Exception ignored in: <obj>"""
+    if unraisable.object is None:
+        return unraisable.err_msg or "Exception ignored"
+    try:
+        object_repr = repr(unraisable.object)
+    except Exception:  # pylint: disable=W0703
+        object_repr = "<object repr() failed>"
+    return f"{unraisable.err_msg or 'Exception ignored in'}: {object_repr}"
+
+
+def pytrace_unraisablehook(unraisable):
+    """New sys.unraisablehook, falls back to the default hook if reporting fails"""
+    if unraisable.exc_value is None or unraisable.exc_traceback is None:
+        sys.__unraisablehook__(unraisable)
+        return
+
+    try:
+        _write_hook_report(
+            unraisable.exc_type,
+            unraisable.exc_value,
+            unraisable.exc_traceback,
+            _unraisable_header(unraisable),
+        )
+    except Exception:  # pylint: disable=W0703
+        sys.__unraisablehook__(unraisable)
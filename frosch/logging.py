@@ -0,0 +1,152 @@
+"""
+
+    frosch - Better runtime errors
+
+    Patrick Haller
+    patrickhaller40@googlemail.com
+
+    License MIT
+
+    logging integration. FroschFormatter renders exceptions of log records,
+    e.g. of logging.exception, with the debug tree. FroschQueueHandler only
+    captures the values of the crashing statement on the logging thread, the
+    statement is formatted, hooks run and the report is rendered by the
+    formatter of the QueueListener.
+
+"""
+
+import copy
+import io
+import logging
+import sys
+from logging.handlers import QueueHandler
+from typing import Optional
+
+from .config_manager import ConfigManager
+
+# Attribute of log records which holds the captured snapshot
+SNAPSHOT_ATTRIBUTE = "frosch_snapshot"
+
+
+def _active_configs(configs: Optional[ConfigManager]) -> ConfigManager:
+    """Given configuration, else the one of hook()"""
+    if configs is not None:
+        return configs
+    from .frosch import _active_configs as active_configs  # pylint: disable=C0415
+
+    return active_configs()
+
+
+class FroschFormatter(logging.Formatter):
+    """Formatter which renders the exception of a record with frosch. The report
+    is stored in record.exc_text, so every further handler reuses it. Reports are
+    colored if stream, the stream of the handler (stderr by default), gets colors"""
+
+    def __init__(
+        self, *args, configs: Optional[ConfigManager] = None, stream=None, **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        self.configs = configs
+        self.stream = stream
+
+    def _use_color(self, configs: ConfigManager) -> bool:
+        """Whether reports for the stream of the handler are colored"""
+        return configs.session().use_color(self.stream or sys.stderr)
+
+    def format(self, record: logging.LogRecord) -> str:
+        snapshot = getattr(record, SNAPSHOT_ATTRIBUTE, None)
+        if snapshot is not None and not record.exc_text:
+            record.exc_text = self.formatSnapshot(snapshot)
+        return super().format(record)
+
+    def formatException(self, ei) -> str:
+        exception = ei[1]
+        if exception is None:
+            return super().formatException(ei)
+
+        from .frosch import format_exception  # pylint: disable=C0415
+
+        configs = _active_configs(self.configs)
+        return format_exception(
+            exception, configs, color=self._use_color(configs)
+        ).rstrip("\n")
+
+    def formatSnapshot(self, snapshot) -> str:  # pylint: disable=C0103
+        """Report of a snapshot captured by FroschQueueHandler, deferred snapshots
+        are resolved first"""
+        from .snapshot import DeferredSnapshot  # pylint: disable=C0415
+
+        configs = _active_configs(self.configs)
+        if isinstance(snapshot, DeferredSnapshot):
+            try:
+                snapshot = snapshot.resolve(configs.initialize_datatype_hook_loader())
+            except Exception:  # pylint: disable=W0703
+                # The traceback is left, if the statement can't be formatted
+                return snapshot.format_traceback().rstrip("\n")
+
+        stream = io.StringIO()
+        console_writer = configs.session().writer(stream)
+        console_writer.color = self._use_color(configs)
+        console_writer.write_snapshot(snapshot)
+        return stream.getvalue().rstrip("\n")
+
+
+class FroschQueueHandler(QueueHandler):
+    """QueueHandler which captures a deferred snapshot of a record's exception.
+    Unlike QueueHandler.prepare, the record is not formatted, that is left to
+    the handlers of the QueueListener, e.g. with a FroschFormatter. The snapshot
+    keeps references to the captured values, so the queue has to be one of the
+    same process"""
+
+    def __init__(self, queue, configs: Optional[ConfigManager] = None):
+        super().__init__(queue)
+        self.configs = configs
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        snapshot = getattr(record, SNAPSHOT_ATTRIBUTE, None)
+        if snapshot is None and record.exc_info and record.exc_info[1] is not None:
+            snapshot = capture_deferred_snapshot(record.exc_info[1], self.configs)
+
+        # Like QueueHandler, only the merged message is kept, args and the
+        # traceback may not be picklable or outlive the record
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if snapshot is not None:
+            record.exc_info = None
+            record.exc_text = None
+        setattr(record, SNAPSHOT_ATTRIBUTE, snapshot)
+        return record
+
+
+def capture_snapshot(exception: BaseException, configs: Optional[ConfigManager] = None):
+    """Snapshot of exception with rendered variables, None if it can't be parsed"""
+    from .snapshot import ExceptionSnapshot  # pylint: disable=C0415
+
+    configs = _active_configs(configs)
+    try:
+        return ExceptionSnapshot.capture(
+            exception,
+            configs.initialize_datatype_hook_loader(),
+            **configs.parse_options(),
+        )
+    except Exception:  # pylint: disable=W0703
+        return None
+
+
+def capture_deferred_snapshot(
+    exception: BaseException, configs: Optional[ConfigManager] = None
+):
+    """Deferred snapshot of exception, None if it can't be captured"""
+    from .snapshot import DeferredSnapshot  # pylint: disable=C0415
+
+    configs = _active_configs(configs)
+    try:
+        return DeferredSnapshot.capture(
+            exception,
+            configs.initialize_datatype_hook_loader(),
+            **configs.parse_options(),
+        )
+    except Exception:  # pylint: disable=W0703
+        return None
@@ -10,19 +10,62 @@
 
 """
 import ast
-from bdb import Bdb
 import builtins
+import io
+from itertools import chain
+import keyword
 import linecache
-import traceback
+import tokenize
 
 from collections import ChainMap
 from types import TracebackType
-from typing import Any, List
+from typing import Any, Iterable, List, Optional
 
 from asttokens.util import Token
-from cheap_repr import cheap_repr
 from stack_data import Source
-from yapf.yapflib.yapf_api import FormatCode
+
+from .deadline import (
+    EXTRACTION,
+    FORMATTING,
+    FRAMES_BUDGET_MS,
+    VARIABLES,
+    Deadline,
+    call_with_timeout,
+)
+from .frames import FrameRef, innermost_frame, walk_traceback
+from .reprs import ReprLimits, bounded_repr
+from .sources import (
+    WINDOW_MIN_LINES,
+    StatementIndex,
+    source_cache,
+    window_statement_tokens,
+)
+
+# Statements longer than this are never handed to yapf in pretty mode
+PRETTY_MAX_CHARS = 1000
+
+# Seconds yapf gets in pretty mode before the normalized line is used instead
+PRETTY_TIMEOUT = 0.2
+
+_SKIPPED_TOKENS = {
+    tokenize.COMMENT,
+    tokenize.NL,
+    tokenize.NEWLINE,
+    tokenize.INDENT,
+    tokenize.DEDENT,
+    tokenize.ENDMARKER,
+}
+
+# Since 3.12 f-strings are split up into several tokens
+_FSTRING_START = getattr(tokenize, "FSTRING_START", None)
+_FSTRING_END = getattr(tokenize, "FSTRING_END", None)
+
+_OPENING_BRACKETS = {"(", "[", "{"}
+_CLOSING_BRACKETS = {")", "]", "}"}
+_NO_SPACE_BEFORE = {")", "]", "}", ",", ":", ".", ";"}
+_NO_SPACE_AFTER = {"(", "[", "{", ".", "~"}
+_UNARY_OPERATORS = {"-", "+", "~", "*", "**", "@"}
+_ATOM_KEYWORDS = {"True", "False", "None"}
 
 
 class ParseError(Exception):
@@ -33,9 +76,29 @@ class MissingStacktraceError(Exception):
     """Thrown when traceback cannot be found"""
 
 
+def _same_value(value: Any, other: Any) -> bool:
+    """Equality of values, which may not compare to a bool, e.g. numpy arrays"""
+    if value is other:
+        return True
+    try:
+        return bool(value == other)
+    except Exception:  # pylint: disable=W0703
+        return False
+
+
+def exception_message(exception: Optional[BaseException]) -> str:
+    """str of exception, which may raise itself"""
+    try:
+        return str(exception)
+    except Exception:  # pylint: disable=W0703
+        return f"<unprintable {type(exception).__name__}>"
+
+
 class Variable:
     """Dataclass for a variable in error throwing line of program"""
 
+    __slots__ = ("name", "col_offset", "value")
+
     def __init__(self, id_: str, col_offset: int, value: Any = None):
         self.name = id_
         self.col_offset = col_offset
@@ -49,54 +112,144 @@ class Variable:
         """Mainly for testing purpose"""
         if not isinstance(other, Variable):
             return NotImplemented
-        return self.__hash__() == other.__hash__()
+        return (self.name, self.col_offset) == (
+            other.name,
+            other.col_offset,
+        ) and _same_value(self.value, other.value)
 
     def __hash__(self):
-        """We don't care for unique hashes"""
-        return hash((self.name, self.col_offset, self.value))
+        """Values are left out, they may be unhashable, e.g. lists"""
+        return hash((self.name, self.col_offset))
 
     @property
     def type(self):
         """Property for the type of a value"""
         return type(self.value)
 
-    def tree_str(self):
+    def tree_str(self, limits: Optional[ReprLimits] = None):
         """Python>3.8 variable declaration format with types"""
         if self.value is None:
             return f"{self.name} = None"
-        return (
-            f"{self.name}: {type(self.value).__qualname__} = {cheap_repr(self.value)}"
-        )
+        return tree_line(self.name, type(self.value), bounded_repr(self.value, limits))
+
+
+def type_name(type_: type) -> str:
+    """Qualified name of type_, builtins without module"""
+    if type_.__module__ == "builtins":
+        return type_.__qualname__
+    return f"{type_.__module__}.{type_.__qualname__}"
+
+
+def tree_line(name: str, type_: type, value_repr: str) -> str:
+    """Line of the debug tree from the type and repr of a value"""
+    if type_ is type(None):
+        return f"{name} = None"
+    return f"{name}: {type_.__qualname__} = {value_repr}"
+
+
+class FrameReport:
+    """Statement line and variables of a frame further up the stack"""
+
+    __slots__ = ("filename", "lineno", "name", "line", "variables")
+
+    def __init__(
+        self, filename: str, lineno: int, name: str, line: str, variables: List[Any]
+    ):
+        self.filename = filename
+        self.lineno = lineno
+        self.name = name
+        self.line = line
+        self.variables = variables
+
+    def __repr__(self):
+        return f"FrameReport({self.filename!r}, {self.lineno}, {self.name!r}, {self.line!r})"
 
 
 class ParsedException:
     """Handling all data relevant to parsing and formatting the received exception raising"""
 
-    def __init__(self, traceback_: TracebackType, error_type, error_message):
+    def __init__(
+        self,
+        traceback_: TracebackType,
+        error_type,
+        error_message,
+        pretty: bool = False,
+        windowed: Optional[bool] = None,
+        deadline: Optional[Deadline] = None,
+        frames: int = 1,
+        frames_budget_ms: Optional[float] = FRAMES_BUDGET_MS,
+    ):
         self.traceback = traceback_
         self.error_type = error_type
         self.error_message = error_message
+        self.pretty = pretty
+        self.windowed = windowed
+        self.deadline = deadline or Deadline()
+        self.frames = frames
+        self.frames_budget_ms = frames_budget_ms
+        self.skipped_frames = 0
+        self._outer_frames = None
 
-        # Get last stack where crash occuredtrace
-        stack = traceback.extract_tb(traceback_)
+        # Get last stack where crash occured, the chain is only walked here
+        self.stack = walk_traceback(traceback_)
 
         try:
-            self.last_stack = stack[-1]
+            self.last_stack = self.stack[-1]
         except IndexError as error:
             raise MissingStacktraceError("No stacktrace can be extracted") from error
 
-        self.line = self._get_source_line()
-        self.variables = self._get_variables()
+        # Without the statement only the traceback can be shown
+        self.line = None
+        self.variables = []
+        if self.deadline.check(EXTRACTION):
+            self.line = self._get_source_line()
+            if self.deadline.check(VARIABLES):
+                self.variables = self._get_variables()
+
+    @property
+    def outer_frames(self) -> List[FrameReport]:
+        """Reports of the frames calling the crashing one, innermost first.
+        Inspected on first access until `frames` frames are reached or the cost cap
+        is hit, the number of frames left out is stored in skipped_frames"""
+        if self._outer_frames is None:
+            self._outer_frames = list(self._inspect_outer_frames())
+        return self._outer_frames
+
+    def _inspect_outer_frames(self):
+        """Lazily inspect outer frames, stops when the frames budget is used up"""
+        if self.frames < 2 or self.line is None:
+            return
+
+        frames = self.stack[-self.frames : -1]
+        cost_cap = Deadline(self.frames_budget_ms)
+        for position, frame in enumerate(reversed(frames)):
+            if cost_cap.expired() or self.deadline.expired():
+                self.skipped_frames = len(frames) - position
+                return
+            yield self._inspect_frame(frame)
+
+    def _inspect_frame(self, frame: FrameRef) -> FrameReport:
+        """Statement and variables of frame, an empty report if the source is not usable"""
+        filename, lineno, name = frame.filename, frame.lineno, frame.name
+        try:
+            line = self._format_statement(self._extract_tokens(frame))
+            names = parse_error_line(line)
+        except Exception:  # pylint: disable=W0703
+            # Outer frames are extra information, they must never break the report
+            return FrameReport(filename, lineno, name, "", [])
+
+        variables = debug_variables(names, frame.locals, frame.globals)
+        return FrameReport(filename, lineno, name, line, variables)
 
     def _get_source_line(self):
         """Get source line which causes the program to crash it also gets formatted into one line
         """
         tokens = self._extract_tokens_from_stack()
+        return self._format_statement(tokens)
 
-        # Format into one line
-        line = extract_source_code(tokens)
-        line = format_line(line)
-        return line.strip()
+    def _format_statement(self, tokens: List[List[Token]]) -> str:
+        """Format tokens of a statement into one line"""
+        return format_statement(tokens, self.pretty, self.deadline)
 
     def _get_variables(self):
         """Get a list of variable objects holding all vars contained in the source line"""
@@ -104,14 +257,11 @@ class ParsedException:
 
     def _extract_tokens_from_stack(self):
         """Load file of stack and get the relevant tokens from statement"""
-        # Get the source of the last stack
-        source = Source(
-            self.last_stack.filename, linecache.getlines(self.last_stack.filename)
-        )
+        return self._extract_tokens(self.last_stack)
 
-        # Extract all relevant parts
-        tokens = extrace_statement_from_source(source, self.last_stack)
-        return tokens
+    def _extract_tokens(self, stack: FrameRef) -> List[List[Token]]:
+        """Load file of a stack entry and get the relevant tokens from statement"""
+        return extract_statement_tokens(stack, self.windowed)
 
     def _get_vars_from_tb(self) -> List[Variable]:
         """Extract all variables from a line and a given traceback"""
@@ -120,7 +270,7 @@ class ParsedException:
         names = parse_error_line(self.line)
 
         # Retrieve locals and globals from the dead
-        locals_, globals_ = retrieve_post_mortem_stack_infos(self.traceback)
+        locals_, globals_ = self.last_stack.locals, self.last_stack.globals
 
         # Get all variables and values
         variables = debug_variables(names, locals_, globals_)
@@ -128,19 +278,90 @@ class ParsedException:
         return variables
 
 
-def extrace_statement_from_source(source: Source, last_stack) -> List[List[Token]]:
+def _use_window(filename: str, windowed: Optional[bool] = None) -> bool:
+    """Only tokenize around the crashing line, by default done for large
+    files which are not cached yet"""
+    if windowed is not None:
+        return windowed
+    if source_cache.is_cached(filename):
+        return False
+    return len(linecache.getlines(filename)) >= WINDOW_MIN_LINES
+
+
+def extract_statement_tokens(
+    stack: FrameRef, windowed: Optional[bool] = None
+) -> List[List[Token]]:
+    """Load file of a stack entry and get the relevant tokens from statement"""
+    filename = stack.filename
+
+    if _use_window(filename, windowed):
+        tokens = window_statement_tokens(linecache.getlines(filename), stack.lineno)
+        if tokens is not None and is_statement(tokens):
+            return tokens
+
+    # Get the source of the stack entry
+    entry = source_cache.get_entry(filename)
+
+    # Extract all relevant parts
+    return extrace_statement_from_source(entry.source, stack, entry.index)
+
+
+def format_statement(
+    tokens: List[List[Token]], pretty: bool = False, deadline: Optional[Deadline] = None
+) -> str:
+    """Format tokens of a statement into one line"""
+    deadline = deadline or Deadline()
+    if not deadline.check(FORMATTING):
+        return extract_source_code(tokens)
+
+    line = normalize_tokens(chain.from_iterable(tokens))
+    if pretty:
+        timeout = deadline.remaining(PRETTY_TIMEOUT)
+        line = pretty_format_line(line, timeout=min(timeout, PRETTY_TIMEOUT))
+    return line.strip()
+
+
+def statement_names(tokens: List[List[Token]]) -> List[str]:
+    """Names a statement may use, found without parsing it. A superset of the
+    names of parse_error_line, keywords and attributes are left out"""
+    names = {}
+    previous = None
+    for token in chain.from_iterable(tokens):
+        if token.type in _SKIPPED_TOKENS:
+            continue
+        if (
+            token.type == tokenize.NAME
+            and not keyword.iskeyword(token.string)
+            and (previous is None or previous.string != ".")
+        ):
+            names[token.string] = None
+        previous = token
+    return list(names)
+
+
+def extrace_statement_from_source(
+    source: Source, last_stack, index: Optional[StatementIndex] = None
+) -> List[List[Token]]:
     """Get frame infos and get code pieces (from stack_data) by line
     of crash """
-    pieces = source.pieces
+    if index is None:
+        index = StatementIndex.from_source(source)
+
+    piece = index.lookup(last_stack.lineno)
+    if piece is None:
+        return []
+
     tokens = source.tokens_by_lineno
+    return [tokens[line] for line in piece]
 
-    statement_piece_tokens = []
-    for piece in pieces:
-        if last_stack.lineno in list(piece):
-            for line in list(piece):
-                statement_piece_tokens.append(tokens[line])
 
-    return statement_piece_tokens
+def is_statement(tokens: List[List[Token]]) -> bool:
+    """Check if the tokens form a complete (header of a) statement"""
+    try:
+        _parse_statement(normalize_tokens(chain.from_iterable(tokens)))
+    except ParseError:
+        return False
+    return True
 
 
 def extract_source_code(tokens: List[List[Token]]) -> str:
@@ -172,23 +393,7 @@ def debug_variables(
 def parse_error_line(line: str) -> List[Variable]:
     """Parse a line of python code and extract all (variable) names from it"""
     variables = []
-    try:
-        # If we handling multilines this will not be parsed
-        tree = ast.parse(line)
-
-    except IndentationError as _:
-        # Case of trying to parse a piece of a statement, like a for loop header
-        # Try again with a pass stament
-        tree = ast.parse(line + "pass")
-
-    except SyntaxError as error:
-        if error.args[0] == "unexpected EOF while parsing":
-            try:
-                tree = ast.parse(line + "pass")
-            except SyntaxError as syntax_error:
-                raise ParseError(f"Could not parse line: {line}") from syntax_error
-        else:
-            raise ParseError(f"Could not parse line: {line}") from error
+    tree = _parse_statement(line)
 
     for node in ast.walk(tree):
         # For now just try to do it with names
@@ -197,30 +402,231 @@ def parse_error_line(line: str) -> List[Variable]:
     return variables
 
 
-def format_line(line: str) -> str:
-    """Try format a source code line"""
+def _needs_space(
+    previous: Token,
+    token: Token,
+    brackets: List[str],
+    unary: bool,
+    in_lambda: bool = False,
+    after_lambda: bool = False,
+    annotated: bool = False,
+) -> bool:
+    """Decide if a space goes between two consecutive tokens of a statement.
+    in_lambda is set within the parameters of a lambda, after_lambda after its colon
+    and annotated within a parameter with an annotation"""
+    if after_lambda:
+        return True
+
+    # Relative imports, e.g. `from . import x` or `from ..mod import y`
+    if token.string == "import" or (
+        previous.string == "from" and token.string in (".", "...")
+    ):
+        return True
+    if previous.string == "..." and token.type == tokenize.NAME:
+        return keyword.iskeyword(token.string)
+
+    if unary or previous.string in _NO_SPACE_AFTER:
+        return False
+
+    # Second part of a slice, e.g. `t[1:2, ::3]`
+    if token.string == ":" and previous.string == ",":
+        return True
+    if token.string in _NO_SPACE_BEFORE:
+        return False
+
+    inner_bracket = brackets[-1] if brackets else None
+
+    # Keyword arguments and defaults of lambda parameters, but `a: int = 3`
+    if "=" in (token.string, previous.string) and (in_lambda or inner_bracket == "("):
+        return annotated
+
+    # Slices
+    if previous.string == ":" and inner_bracket == "[":
+        return False
+
+    # Calls and subscriptions, but not `if (...)` or `in [...]`
+    if token.string in ("(", "["):
+        if previous.type == tokenize.NAME:
+            return keyword.iskeyword(previous.string) and (
+                previous.string not in _ATOM_KEYWORDS
+            )
+        return previous.type != tokenize.STRING and previous.string not in (
+            _CLOSING_BRACKETS
+        )
+
+    return True
 
-    formatted_line = line
+
+def _is_unary(previous: Optional[Token], token: Token) -> bool:
+    """Operators like `-` or `*` are unary at the start of an expression"""
+    if token.string not in _UNARY_OPERATORS:
+        return False
+    if previous is None:
+        return True
+    if previous.type == tokenize.NAME:
+        return keyword.iskeyword(previous.string) and (
+            previous.string not in _ATOM_KEYWORDS
+        )
+    return previous.type == tokenize.OP and previous.string not in _CLOSING_BRACKETS
+
+
+def _join_fstring(tokens: List[Token]) -> str:
+    """Restore the source of a f-string, which are split into several tokens since 3.12"""
+    first, last = tokens[0], tokens[-1]
+    if first.start[0] == last.end[0] and first.line:
+        return first.line[first.start[1] : last.end[1]]
+    return "".join(token.string for token in tokens)
+
+
+def _merge_fstrings(tokens: Iterable[Token]) -> Iterable[Token]:
+    """Yield f-strings as a single string token"""
+    fstring: List[Token] = []
+    depth = 0
+    for token in tokens:
+        if _FSTRING_START is not None and token.type == _FSTRING_START:
+            depth += 1
+        if depth:
+            fstring.append(token)
+            if token.type == _FSTRING_END:
+                depth -= 1
+                if not depth:
+                    yield tokenize.TokenInfo(
+                        tokenize.STRING,
+                        _join_fstring(fstring),
+                        fstring[0].start,
+                        token.end,
+                        fstring[0].line,
+                    )
+                    fstring = []
+            continue
+        yield token
+
+
+def normalize_tokens(tokens: Iterable[Token]) -> str:
+    """Join the tokens of a (multiline) statement into one normalized line.
+
+    This is a lot cheaper than running a full formatter and produces pep8 like
+    spacing, e.g. `x = {'key': -3}` or `foo(a, b=2)[1:]`"""
+    parts = []
+    brackets: List[str] = []
+    # Bracket depths of the lambdas whose parameters are not closed by a colon yet
+    lambdas: List[int] = []
+    # For every open bracket, if the current parameter has an annotation
+    annotations: List[bool] = []
+    previous = None
+    unary = False
+    after_lambda = False
+
+    for token in _merge_fstrings(tokens):
+        if token.type in _SKIPPED_TOKENS or not token.string.strip():
+            continue
+
+        string = token.string.strip()
+        in_lambda = bool(lambdas) and lambdas[-1] == len(brackets)
+        annotated = bool(annotations) and annotations[-1]
+        if previous is not None and _needs_space(
+            previous, token, brackets, unary, in_lambda, after_lambda, annotated
+        ):
+            parts.append(" ")
+        parts.append(string)
+
+        after_lambda = in_lambda and string == ":"
+        if after_lambda:
+            lambdas.pop()
+        elif string == "lambda" and token.type == tokenize.NAME:
+            lambdas.append(len(brackets))
+
+        if brackets and brackets[-1] == "(" and not in_lambda:
+            if string == ":":
+                annotations[-1] = True
+            elif string == ",":
+                annotations[-1] = False
+
+        if string in _OPENING_BRACKETS:
+            brackets.append(string)
+            annotations.append(False)
+        elif string in _CLOSING_BRACKETS and brackets:
+            brackets.pop()
+            annotations.pop()
+
+        unary = _is_unary(previous, token)
+        previous = token
+
+    return "".join(parts)
+
+
+def _parse_statement(line: str) -> ast.AST:
+    """Parse a single statement, which may also be the header of a compound statement"""
     try:
         # If we handling multilines this will not be parsed
-        formatted_line, _ = FormatCode(line)
+        return ast.parse(line)
 
-    except IndentationError as _:
+    except SyntaxError as error:
         # Case of trying to parse a piece of a statement, like a for loop header
         # Try again with a pass stament
-        formatted_line, _ = FormatCode(line + "pass")
-        formatted_line = formatted_line.replace("pass", "")
-
-    except SyntaxError as error:
-        if error.args[0] == "unexpected EOF while parsing":
+        if isinstance(error, IndentationError) or (
+            error.args[0] == "unexpected EOF while parsing"
+        ):
             try:
-                formatted_line, _ = FormatCode(line + "pass")
-                formatted_line = formatted_line.replace("pass", "")
+                return ast.parse(line + "pass")
             except SyntaxError as syntax_error:
                 raise ParseError(f"Could not parse line: {line}") from syntax_error
-        else:
-            raise ParseError(f"Could not parse line: {line}") from error
+        raise ParseError(f"Could not parse line: {line}") from error
+
+
+def format_line(line: str, pretty: bool = False) -> str:
+    """Try format a source code line, with yapf if pretty formatting is asked for"""
+
+    try:
+        tokens = tokenize.generate_tokens(io.StringIO(line).readline)
+        formatted_line = normalize_tokens(tokens)
+    except (tokenize.TokenError, SyntaxError) as error:
+        raise ParseError(f"Could not parse line: {line}") from error
+
+    # Only valid statements are formatted
+    _parse_statement(formatted_line)
+
+    if pretty:
+        formatted_line = pretty_format_line(formatted_line)
+
+    return formatted_line.strip()
+
+
+def pretty_format_line(
+    line: str, max_chars: int = PRETTY_MAX_CHARS, timeout: float = PRETTY_TIMEOUT
+) -> str:
+    """Format line with yapf, if the line is not too long and yapf is fast enough.
+    Else the line is returned as it is"""
+    if len(line) > max_chars:
+        return line
+
+    formatted_line = call_with_timeout(_format_with_yapf, timeout, line)
+    if formatted_line is None:
+        return line
+    return formatted_line
+
+
+def _format_with_yapf(line: str) -> Optional[str]:
+    """Run yapf on line, returns None if yapf cannot handle it"""
+    # pylint: disable=C0415
+    from yapf.yapflib.yapf_api import FormatCode
+
+    try:
+        formatted_line, _ = FormatCode(line)
+        return formatted_line.strip()
+    except Exception:  # pylint: disable=W0703
+        pass
+
+    # Case of trying to parse a piece of a statement, like a for loop header
+    # Try again with a pass stament
+    try:
+        formatted_line, _ = FormatCode(line + "pass")
+    except Exception:  # pylint: disable=W0703
+        return None
 
+    formatted_line = formatted_line.strip()
+    if formatted_line.endswith("pass"):
+        formatted_line = formatted_line[: -len("pass")]
     return formatted_line.strip()
 
 
@@ -228,10 +634,7 @@ def retrieve_post_mortem_stack_infos(traceback_: TracebackType):
     """Retrieve post mortem all local and global
     variables of given traceback"""
 
-    base_debugger = Bdb()
-    stack, i = base_debugger.get_stack(None, traceback_)
+    frame = innermost_frame(traceback_)
 
     # Get global and local vals
-    locals_ = stack[i][0].f_locals
-    globals_ = stack[i][0].f_globals
-    return locals_, globals_
+    return frame.f_locals, frame.f_globals
@@ -0,0 +1,189 @@
+"""
+
+    frosch - Better runtime errors
+
+    Patrick Haller
+    patrickhaller40@googlemail.com
+
+    License MIT
+
+    Size and time bounded reprs of values in the debug tree. A multi gigabyte list
+    or slow __repr__s must not stall the error report, so every value is rendered
+    with per type limits of characters, elements and nesting depth, and within a
+    time budget. The budget is checked between values, a running __repr__ is
+    never interrupted.
+
+"""
+
+from itertools import islice
+from types import FunctionType
+from typing import Any, Dict, Optional, Union
+
+from cheap_repr import cheap_repr
+
+from .deadline import Deadline
+
+MARKER = "…"
+
+_BRACKETS = {
+    list: ("[", "]"),
+    tuple: ("(", ")"),
+    set: ("{", "}"),
+    frozenset: ("frozenset({", "})"),
+    dict: ("{", "}"),
+}
+
+
+class ReprLimits:
+    """Limits for the repr of a value, types maps a type to overrides of these
+    limits, which also apply to its subclasses"""
+
+    def __init__(
+        self,
+        max_chars: int = 200,
+        max_elements: int = 10,
+        max_depth: int = 2,
+        time_ms: Optional[float] = 50,
+        types: Optional[Dict[type, dict]] = None,
+    ):
+        self.max_chars = max_chars
+        self.max_elements = max_elements
+        self.max_depth = max_depth
+        self.time_ms = time_ms
+        self.types = types or {}
+        self._resolved = {}
+
+    @classmethod
+    def from_config(cls, config: Union[None, dict, "ReprLimits"]) -> "ReprLimits":
+        """Limits from the repr_limits option of hook()"""
+        if config is None:
+            return cls()
+        if isinstance(config, ReprLimits):
+            return config
+        assert dict == type(config)
+        return cls(**config)
+
+    def for_type(self, type_: type) -> "ReprLimits":
+        """Limits of type_ with the overrides of its closest configured base"""
+        if not self.types:
+            return self
+
+        if type_ not in self._resolved:
+            overrides = {}
+            for base in reversed(type_.__mro__):
+                overrides.update(self.types.get(base, {}))
+            if overrides:
+                options = vars(self).copy()
+                del options["_resolved"]
+                options.update(overrides)
+                self._resolved[type_] = ReprLimits(**options)
+            else:
+                self._resolved[type_] = self
+        return self._resolved[type_]
+
+
+def human_count(count: int) -> str:
+    """Short count for truncation markers, e.g. 2.3M"""
+    for divisor, suffix in ((10 ** 9, "G"), (10 ** 6, "M"), (10 ** 3, "K")):
+        if count >= divisor:
+            return f"{count / divisor:.1f}{suffix}"
+    return str(count)
+
+
+def human_bytes(size: int) -> str:
+    """Size in bytes with a binary unit, e.g. 1.5MiB"""
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024:
+            return f"{size:g}{unit}"
+        size = round(size / 1024, 1)
+    return f"{size:g}TiB"
+
+
+def truncation_marker(count: int, unit: str) -> str:
+    """Marker for cut off content, count is the full size of the value"""
+    return f"{MARKER}(truncated, {human_count(count)} {unit})"
+
+
+def timeout_marker(count: int, unit: str) -> str:
+    """Marker for content left out because the time budget was used up"""
+    return f"{MARKER}(out of time, {human_count(count)} {unit})"
+
+
+def bounded_repr(value: Any, limits: Optional[ReprLimits] = None) -> str:
+    """Repr of value within the given limits"""
+    limits = limits or ReprLimits()
+    deadline = Deadline(limits.time_ms)
+    return _bounded_repr(value, limits, deadline, 0)
+
+
+def _bounded_repr(value: Any, limits: ReprLimits, deadline: Deadline, depth: int):
+    type_ = type(value)
+    own_limits = limits.for_type(type_)
+
+    if type_ in (str, bytes):
+        if len(value) <= own_limits.max_chars:
+            return repr(value)
+        unit = "chars" if type_ is str else "bytes"
+        return repr(value[: own_limits.max_chars]) + truncation_marker(
+            len(value), unit
+        )
+
+    if type_ is int:
+        # Converting a huge int to decimal is quadratic and may even raise
+        digits = int(value.bit_length() * 0.30103) + 1
+        if digits > own_limits.max_chars:
+            return f"<int with ~{human_count(digits)} digits>"
+        return repr(value)
+
+    if type_ in _BRACKETS:
+        text = _container_repr(value, limits, own_limits, deadline, depth)
+    else:
+        text = _object_repr(value, deadline)
+
+    if len(text) > own_limits.max_chars:
+        return text[: own_limits.max_chars] + truncation_marker(len(text), "chars")
+    return text
+
+
+def _container_repr(
+    value, limits: ReprLimits, own_limits: ReprLimits, deadline: Deadline, depth: int
+) -> str:
+    """Repr of builtin containers with at most max_elements items"""
+    opening, closing = _BRACKETS[type(value)]
+    if not value:
+        return {set: "set()", frozenset: "frozenset()"}.get(type(value), repr(value))
+
+    if depth >= own_limits.max_depth:
+        return f"{opening}{MARKER}{closing}"
+
+    items = value.items() if isinstance(value, dict) else value
+    parts = []
+    timed_out = False
+    for item in islice(items, own_limits.max_elements):
+        if deadline.expired():
+            timed_out = True
+            break
+        if isinstance(value, dict):
+            key = _bounded_repr(item[0], limits, deadline, depth + 1)
+            parts.append(f"{key}: {_bounded_repr(item[1], limits, deadline, depth + 1)}")
+        else:
+            parts.append(_bounded_repr(item, limits, deadline, depth + 1))
+
+    if timed_out:
+        parts.append(timeout_marker(len(value), "items"))
+    elif len(parts) < len(value):
+        parts.append(truncation_marker(len(value), "items"))
+    elif isinstance(value, tuple) and len(value) == 1:
+        return f"({parts[0]},)"
+
+    return f"{opening}{', '.join(parts)}{closing}"
+
+
+def _object_repr(value, deadline: Deadline) -> str:
+    """cheap_repr of value. A repr which is Python code is skipped once the time
+    budget is used up"""
+    if isinstance(
+        getattr(type(value), "__repr__", None), FunctionType
+    ) and deadline.expired():
+        return f"<{type(value).__qualname__} object (out of time)>"
+    return cheap_repr(value)
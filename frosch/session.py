@@ -0,0 +1,119 @@
+"""
+
+    frosch - Better runtime errors
+
+    Patrick Haller
+    patrickhaller40@googlemail.com
+
+    License MIT
+
+    A render session holds everything of a configuration which is expensive to
+    set up, but the same for every report: the formatter with its color table
+    and the lexers. It is created once per configuration and shared by the
+    excepthook, print_exception and the background reporter. pygments is only
+    imported on first use, concurrent reports set it up only once.
+
+"""
+
+import os
+import threading
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .config_manager import ConfigManager
+    from .deadline import Deadline
+    from .writer import ConsoleWriter
+
+# Shared objects of a configuration and its session are created once, also by
+# concurrent reports. Module level, so a configuration holding them stays picklable
+_init_lock = threading.RLock()
+
+
+class RenderSession:
+    """Formatter, lexers and hook loader shared by all reports of a configuration"""
+
+    def __init__(self, configs: "ConfigManager"):
+        self.configs = configs
+        self._formatter = None
+        self._python_lexer = None
+        self._python_traceback_lexer = None
+
+    @classmethod
+    def for_theme(cls, theme) -> "RenderSession":
+        """Session of a default configuration with theme"""
+        from .config_manager import ConfigManager  # pylint: disable=C0415
+
+        configs = ConfigManager()
+        configs.theme = theme
+        return cls(configs)
+
+    def use_color(self, stream) -> bool:
+        """Whether output to stream is colored. Without an explicit hook(color=...),
+        only terminals get colors and NO_COLOR or TERM=dumb turn them off"""
+        if self.configs.color is not None:
+            return bool(self.configs.color)
+        if os.environ.get("NO_COLOR") or os.environ.get("TERM") == "dumb":
+            return False
+        try:
+            return stream.isatty()
+        except (AttributeError, ValueError):
+            return False
+
+    @property
+    def formatter(self):
+        """Terminal formatter of the configured theme, true color if configured"""
+        # pylint: disable=C0415
+        if self._formatter is not None:
+            return self._formatter
+
+        with _init_lock:
+            if self._formatter is None:
+                if self.configs.truecolor:
+                    from pygments.formatters.terminal256 import (
+                        TerminalTrueColorFormatter as Formatter,
+                    )
+                else:
+                    from pygments.formatters.terminal256 import (
+                        Terminal256Formatter as Formatter,
+                    )
+                self._formatter = Formatter(style=self.configs.theme)
+        return self._formatter
+
+    @property
+    def python_lexer(self):
+        """Lexer for statements and values"""
+        if self._python_lexer is None:
+            from pygments.lexers.python import Python3Lexer  # pylint: disable=C0415
+
+            with _init_lock:
+                if self._python_lexer is None:
+                    self._python_lexer = Python3Lexer()
+        return self._python_lexer
+
+    @property
+    def python_traceback_lexer(self):
+        """Lexer for tracebacks"""
+        if self._python_traceback_lexer is None:
+            # pylint: disable=C0415
+            from pygments.lexers.python import Python3TracebackLexer
+
+            with _init_lock:
+                if self._python_traceback_lexer is None:
+                    self._python_traceback_lexer = Python3TracebackLexer()
+        return self._python_traceback_lexer
+
+    def writer(self, stream, deadline: Optional["Deadline"] = None) -> "ConsoleWriter":
+        """Writer for a single report to stream"""
+        from .writer import ConsoleWriter  # pylint: disable=C0415
+
+        # The theme is taken from the session, only when colors are used
+        console_writer = ConsoleWriter(
+            None,
+            stream,
+            self.configs.initialize_datatype_hook_loader(),
+            deadline,
+            session=self,
+        )
+        console_writer.raw_write = self.configs.raw_write
+        console_writer.color = self.use_color(stream)
+        return console_writer
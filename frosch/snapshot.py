@@ -0,0 +1,488 @@
+"""
+
+    frosch - Better runtime errors
+
+    Patrick Haller
+    patrickhaller40@googlemail.com
+
+    License MIT
+
+    Snapshots hold everything needed to render an exception later, without
+    references to frames or values. Values are rendered while capturing.
+    Snapshots are picklable, the traceback is pickled as formatted text.
+
+    Deferred snapshots are cheaper to capture, for reporter threads. Only the
+    names of the statements are looked up and the bounded reprs of their
+    values are taken, formatting and datatype hooks are left to the reporter.
+
+"""
+
+import builtins
+from collections import ChainMap
+import traceback
+from types import TracebackType
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from asttokens.util import Token
+
+from .deadline import FRAMES_BUDGET_MS, Deadline
+from .frames import FrameRef, walk_traceback
+from .parser import (
+    FrameReport,
+    MissingStacktraceError,
+    ParsedException,
+    Variable,
+    exception_message,
+    extract_statement_tokens,
+    format_statement,
+    parse_error_line,
+    statement_names,
+    tree_line,
+    type_name,
+)
+from .reprs import bounded_repr
+from .type_hooks import HookLoader
+
+# Attribute of exceptions which carry their own snapshot, e.g. from a worker process
+SNAPSHOT_ATTRIBUTE = "__frosch_snapshot__"
+
+
+def _hook_output(hook: Optional[Callable], value: Any) -> Optional[str]:
+    """Output of hook for value, None without a hook or if it fails"""
+    if hook is None:
+        return None
+    try:
+        return hook(value)
+    except Exception:  # pylint: disable=W0703
+        # A broken hook must not break the report, the bounded repr is used instead
+        return None
+
+
+def frame_positions(frames) -> List[Tuple[str, int, str]]:
+    """Filename, line number and name of frames, e.g. FrameRefs or FrameSummaries"""
+    return [(frame.filename, frame.lineno, frame.name) for frame in frames]
+
+
+def reraised_traceback(
+    exception: BaseException,
+) -> Optional[traceback.TracebackException]:
+    """Traceback of the frames which re-raised an exception carrying a snapshot,
+    e.g. future.result(). None if it was not raised in this process"""
+    if exception.__traceback__ is None:
+        return None
+    return traceback.TracebackException(
+        type(exception), exception, exception.__traceback__, lookup_lines=False
+    )
+
+
+class VariableSnapshot:
+    """Name, position and rendered text of a variable in the debug tree. The type
+    name and bounded repr are kept for structured records, rendered is the hook
+    output if hooked"""
+
+    __slots__ = ("name", "col_offset", "rendered", "type_name", "repr", "hooked")
+
+    def __init__(
+        self,
+        name: str,
+        col_offset: int,
+        rendered: str,
+        type_name_: str = "NoneType",
+        value_repr: str = "None",
+        hooked: bool = False,
+    ):
+        self.name = name
+        self.col_offset = col_offset
+        self.rendered = rendered
+        self.type_name = type_name_
+        self.repr = value_repr
+        self.hooked = hooked
+
+    def __repr__(self):
+        return f"VariableSnapshot({self.name!r}, {self.col_offset}, {self.rendered!r})"
+
+    @classmethod
+    def from_variable(cls, variable: Variable, hook_loader: HookLoader):
+        """Render variable with datatype hooks"""
+        value_repr = bounded_repr(variable.value, hook_loader.repr_limits)
+        rendered = _hook_output(hook_loader.resolve_hook(variable.type), variable.value)
+        hooked = rendered is not None
+        if not hooked:
+            rendered = tree_line(variable.name, variable.type, value_repr)
+        return cls(
+            variable.name,
+            variable.col_offset,
+            rendered,
+            type_name(variable.type),
+            value_repr,
+            hooked,
+        )
+
+    @classmethod
+    def from_captured(
+        cls, variable: Variable, captured: "CapturedValue", hook_loader: HookLoader
+    ):
+        """Render a value captured by a DeferredSnapshot"""
+        rendered = captured.hook_output(hook_loader)
+        hooked = rendered is not None
+        if not hooked:
+            rendered = tree_line(variable.name, captured.type, captured.repr)
+        return cls(
+            variable.name,
+            variable.col_offset,
+            rendered,
+            type_name(captured.type),
+            captured.repr,
+            hooked,
+        )
+
+
+class ExceptionSnapshot:
+    """Detached data of a ParsedException. Only rendered text, line numbers and the
+    type are kept, no frames, tracebacks or values"""
+
+    __slots__ = (
+        "error_type",
+        "message",
+        "traceback_exception",
+        "traceback_text",
+        "stack",
+        "lineno",
+        "line",
+        "variables",
+        "outer_frames",
+        "skipped_frames",
+    )
+
+    def __init__(
+        self,
+        error_type: type,
+        traceback_exception: Optional[traceback.TracebackException],
+        lineno: Optional[int],
+        line: Optional[str],
+        variables: List[VariableSnapshot],
+        outer_frames: Optional[List[FrameReport]] = None,
+        skipped_frames: int = 0,
+        message: str = "",
+        stack: Optional[List[Tuple[str, int, str]]] = None,
+    ):
+        self.error_type = error_type
+        self.message = message
+        self.traceback_exception = traceback_exception
+        # Formatted traceback, replaces traceback_exception when pickled
+        self.traceback_text: Optional[str] = None
+        # Filename, line number and name of every frame, outermost first
+        self.stack = stack or []
+        self.lineno = lineno
+        self.line = line
+        self.variables = variables
+        self.outer_frames = outer_frames or []
+        self.skipped_frames = skipped_frames
+
+    @classmethod
+    def capture(
+        cls,
+        exception: BaseException,
+        hook_loader: HookLoader,
+        release: bool = False,
+        **options,
+    ) -> "ExceptionSnapshot":
+        """Parse the exception and render its variables, source lines of the
+        traceback are only looked up when it is formatted. options are passed
+        to ParsedException. Exceptions carrying a snapshot return it instead.
+        With release, the frames of the exception are cleared afterwards"""
+        snapshot = attached_snapshot(exception)
+        if snapshot is None:
+            parsed_exception = ParsedException(
+                exception.__traceback__, type(exception), exception, **options
+            )
+            snapshot = cls.from_parsed(parsed_exception, hook_loader)
+
+        if release:
+            release_frames(exception)
+        return snapshot
+
+    @classmethod
+    def from_parsed(
+        cls, parsed_exception: ParsedException, hook_loader: HookLoader
+    ) -> "ExceptionSnapshot":
+        """Render the variables of parsed_exception, after which it can be dropped"""
+        traceback_exception = traceback.TracebackException(
+            parsed_exception.error_type,
+            parsed_exception.error_message,
+            parsed_exception.traceback,
+            lookup_lines=False,
+        )
+
+        def render(variables: List[Variable]) -> List[VariableSnapshot]:
+            return [
+                VariableSnapshot.from_variable(variable, hook_loader)
+                for variable in variables
+            ]
+
+        outer_frames = [
+            FrameReport(
+                frame.filename, frame.lineno, frame.name, frame.line, render(frame.variables)
+            )
+            for frame in parsed_exception.outer_frames
+        ]
+        return cls(
+            parsed_exception.error_type,
+            traceback_exception,
+            parsed_exception.last_stack.lineno,
+            parsed_exception.line,
+            render(parsed_exception.variables),
+            outer_frames,
+            parsed_exception.skipped_frames,
+            exception_message(parsed_exception.error_message),
+            frame_positions(parsed_exception.stack),
+        )
+
+    def format_traceback(self) -> str:
+        """Traceback as formatted by traceback.format_exception"""
+        if self.traceback_exception is None:
+            return self.traceback_text or ""
+        return "".join(self.traceback_exception.format())
+
+    def __getstate__(self):
+        # Source lines are looked up here, the unpickling process may not have them
+        state = {name: getattr(self, name) for name in self.__slots__}
+        state["traceback_text"] = self.format_traceback()
+        state["traceback_exception"] = None
+        return state
+
+    def __setstate__(self, state: dict):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+
+class CapturedValue:
+    """Type and bounded repr of a value, the value itself is only kept if a
+    datatype hook renders it"""
+
+    __slots__ = ("type", "repr", "value", "hooked")
+
+    def __init__(self, value: Any, hook_loader: HookLoader):
+        self.type = type(value)
+        self.repr = bounded_repr(value, hook_loader.repr_limits)
+        self.hooked = hook_loader.resolve_hook(self.type) is not None
+        self.value = value if self.hooked else None
+
+    def __repr__(self):
+        return f"CapturedValue({self.type.__qualname__}, {self.repr!r})"
+
+    def hook_output(self, hook_loader: HookLoader) -> Optional[str]:
+        """Output of the datatype hook, None without one or if it fails"""
+        if not self.hooked:
+            return None
+        return _hook_output(hook_loader.resolve_hook(self.type), self.value)
+
+
+class DeferredFrame:
+    """Statement tokens of a frame and the values of the names they use. Tokens
+    are None if the statement could not be extracted"""
+
+    __slots__ = ("filename", "lineno", "name", "tokens", "values")
+
+    def __init__(
+        self,
+        filename: str,
+        lineno: int,
+        name: str,
+        tokens: Optional[List[List[Token]]],
+        values: Dict[str, CapturedValue],
+    ):
+        self.filename = filename
+        self.lineno = lineno
+        self.name = name
+        self.tokens = tokens
+        self.values = values
+
+    def __repr__(self):
+        return f"DeferredFrame({self.filename!r}, {self.lineno}, {self.name!r})"
+
+    @classmethod
+    def capture(
+        cls, frame: FrameRef, hook_loader: HookLoader, windowed: Optional[bool] = None
+    ) -> "DeferredFrame":
+        """Extract the statement of frame and look up the names it uses"""
+        try:
+            tokens = extract_statement_tokens(frame, windowed)
+        except Exception:  # pylint: disable=W0703
+            return cls(frame.filename, frame.lineno, frame.name, None, {})
+
+        values = {}
+        namespace = ChainMap(frame.locals, frame.globals, vars(builtins))
+        for name in statement_names(tokens):
+            try:
+                values[name] = CapturedValue(namespace[name], hook_loader)
+            except KeyError:
+                pass
+        return cls(frame.filename, frame.lineno, frame.name, tokens, values)
+
+    def parse(
+        self, pretty: bool = False, deadline: Optional[Deadline] = None
+    ) -> Tuple[str, List[Variable]]:
+        """Formatted statement and its names, as found by ParsedException"""
+        line = format_statement(self.tokens, pretty, deadline)
+        return line, parse_error_line(line)
+
+
+class DeferredSnapshot:
+    """Capture of an exception, which is resolved to an ExceptionSnapshot or a
+    JSON record later. The innermost frame comes first in frames"""
+
+    __slots__ = (
+        "error_type",
+        "message",
+        "traceback_exception",
+        "frames",
+        "skipped_frames",
+        "pretty",
+    )
+
+    def __init__(
+        self,
+        error_type: type,
+        message: str,
+        traceback_exception: traceback.TracebackException,
+        frames: List[DeferredFrame],
+        skipped_frames: int = 0,
+        pretty: bool = False,
+    ):
+        self.error_type = error_type
+        self.message = message
+        self.traceback_exception = traceback_exception
+        self.frames = frames
+        self.skipped_frames = skipped_frames
+        self.pretty = pretty
+
+    @classmethod
+    def capture(
+        cls,
+        exception: BaseException,
+        hook_loader: HookLoader,
+        pretty: bool = False,
+        windowed: Optional[bool] = None,
+        frames: int = 1,
+        frames_budget_ms: Optional[float] = FRAMES_BUDGET_MS,
+    ) -> "DeferredSnapshot":
+        """Look up the values of the crashing statement and of up to frames - 1
+        calling statements, options are the ones of ParsedException"""
+        stack = walk_traceback(exception.__traceback__)
+        if not stack:
+            raise MissingStacktraceError("No stacktrace can be extracted")
+
+        deferred_frames = [DeferredFrame.capture(stack[-1], hook_loader, windowed)]
+        skipped_frames = 0
+        if frames > 1 and deferred_frames[0].tokens is not None:
+            outer = stack[-frames:-1]
+            cost_cap = Deadline(frames_budget_ms)
+            for position, frame in enumerate(reversed(outer)):
+                if cost_cap.expired():
+                    skipped_frames = len(outer) - position
+                    break
+                deferred_frames.append(
+                    DeferredFrame.capture(frame, hook_loader, windowed)
+                )
+
+        traceback_exception = traceback.TracebackException(
+            type(exception), exception, exception.__traceback__, lookup_lines=False
+        )
+        return cls(
+            type(exception),
+            exception_message(exception),
+            traceback_exception,
+            deferred_frames,
+            skipped_frames,
+            pretty,
+        )
+
+    def resolve(self, hook_loader: HookLoader) -> ExceptionSnapshot:
+        """Format the statements and run the datatype hooks"""
+
+        def render(frame: DeferredFrame, names: List[Variable]):
+            return [
+                VariableSnapshot.from_captured(
+                    variable, frame.values[variable.name], hook_loader
+                )
+                if variable.name in frame.values
+                else VariableSnapshot(
+                    variable.name, variable.col_offset, variable.tree_str()
+                )
+                for variable in names
+            ]
+
+        innermost = self.frames[0]
+        line, variables = None, []
+        if innermost.tokens is not None:
+            line, names = innermost.parse(self.pretty)
+            variables = render(innermost, names)
+
+        outer_frames = []
+        for frame in self.frames[1:]:
+            try:
+                frame_line, names = frame.parse(self.pretty)
+                frame_variables = render(frame, names)
+            except Exception:  # pylint: disable=W0703
+                # Outer frames are extra information, they must never break the report
+                frame_line, frame_variables = "", []
+            outer_frames.append(
+                FrameReport(
+                    frame.filename, frame.lineno, frame.name, frame_line, frame_variables
+                )
+            )
+
+        return ExceptionSnapshot(
+            self.error_type,
+            self.traceback_exception,
+            innermost.lineno,
+            line,
+            variables,
+            outer_frames,
+            self.skipped_frames,
+            self.message,
+            frame_positions(self.traceback_exception.stack),
+        )
+
+    def format_traceback(self) -> str:
+        """Traceback as formatted by traceback.format_exception"""
+        return "".join(self.traceback_exception.format())
+
+
+def _clear_frames(traceback_: Optional[TracebackType]):
+    """Clear the locals of all finished frames of traceback_"""
+    while traceback_ is not None:
+        frame = traceback_.tb_frame
+        try:
+            frame.clear()
+        except RuntimeError:
+            # Still executing, e.g. the frame of the except block
+            pass
+        else:
+            # Before python 3.13, a frame keeps a dict of its locals once f_locals was
+            # read, e.g. while parsing. Reading it again drops the cleared values
+            frame.f_locals  # pylint: disable=W0104
+        traceback_ = traceback_.tb_next
+
+
+def release_frames(exception: BaseException):
+    """Clear the locals of all finished frames in the tracebacks of exception and
+    of its causes and contexts, like traceback.clear_frames"""
+    seen = set()
+    pending = [exception]
+    while pending:
+        exception = pending.pop()
+        if exception is None or id(exception) in seen:
+            continue
+        seen.add(id(exception))
+        _clear_frames(exception.__traceback__)
+        pending.extend((exception.__cause__, exception.__context__))
+
+
+def attached_snapshot(exception: BaseException) -> Optional[ExceptionSnapshot]:
+    """Snapshot carried by exception, None if it has none"""
+    snapshot = getattr(exception, SNAPSHOT_ATTRIBUTE, None)
+    if isinstance(snapshot, ExceptionSnapshot):
+        return snapshot
+    return None
@@ -0,0 +1,276 @@
+"""
+
+    frosch - Better runtime errors
+
+    Patrick Haller
+    patrickhaller40@googlemail.com
+
+    License MIT
+
+    Caching of parsed source files, so repeated exceptions in the same module
+    don't tokenize and parse the whole file again, and windowed tokenization
+    of single statements for files too large to parse as a whole
+
+"""
+
+from bisect import bisect_right
+from collections import OrderedDict, namedtuple
+import linecache
+import os
+import re
+import threading
+import tokenize
+from typing import List, Optional, Tuple
+
+from stack_data import Source
+
+CacheStats = namedtuple("CacheStats", ["hits", "misses", "evictions", "entries", "size"])
+
+# Files with at least this many lines are tokenized around the crashing line only,
+# unless cached
+WINDOW_MIN_LINES = 2000
+
+# How many lines above the crashing line a statement start is searched for
+WINDOW_LOOKBEHIND = 400
+
+# How many statement starts are tried, before the whole file is parsed
+WINDOW_MAX_ATTEMPTS = 8
+
+# Lines which can only be the start of a statement, indented keywords or
+# top level assignments
+_STATEMENT_START = re.compile(
+    r"\s*(@|(async|def|class|import|from|if|elif|else|for|while|with|try|except|"
+    r"finally|return|raise|assert|del|global|nonlocal|yield|pass|break|continue)\b)"
+    r"|[A-Za-z_][\w.]*\s*(=[^=]|[-+*/%&|^@]=|:)"
+)
+
+
+class StatementIndex:
+    """Maps line numbers to the lines of their statement by bisecting over
+    the (sorted) piece boundaries of a source"""
+
+    def __init__(self, pieces: List[range]):
+        self._pieces = pieces
+        self._starts = [piece.start for piece in pieces]
+
+    @classmethod
+    def from_source(cls, source: Source) -> "StatementIndex":
+        """Build index from the pieces of a stack_data source"""
+        return cls(list(source.pieces))
+
+    def lookup(self, lineno: int) -> Optional[range]:
+        """Line range of the statement containing lineno"""
+        position = bisect_right(self._starts, lineno) - 1
+        if position >= 0 and lineno in self._pieces[position]:
+            return self._pieces[position]
+        return None
+
+
+class CachedSource:
+    """A parsed source together with the file stamp it was created from"""
+
+    def __init__(self, stamp: Optional[Tuple[float, int]], source: Source):
+        self.stamp = stamp
+        self.source = source
+        self.size = len(source.text)
+        self._index = None
+
+    @property
+    def index(self) -> StatementIndex:
+        """Statement index of source, built on first use"""
+        if self._index is None:
+            self._index = StatementIndex.from_source(self.source)
+        return self._index
+
+
+class SourceCache:
+    """Bounded LRU cache of stack_data Source objects keyed by (filename, mtime, size).
+    Size is measured in characters of source text. Sources are parsed outside of
+    the lock, so threads only wait for each other on the bookkeeping"""
+
+    def __init__(self, max_entries: int = 32, max_size: int = 8 * 1024 * 1024):
+        self._lock = threading.Lock()
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _stamp(filename: str) -> Optional[Tuple[float, int]]:
+        """mtime and size of file, None if the source does not live on disk"""
+        try:
+            stat = os.stat(filename)
+        except (OSError, ValueError):
+            return None
+        return stat.st_mtime, stat.st_size
+
+    @staticmethod
+    def _load(filename: str) -> Source:
+        """Parse the source of filename"""
+        return Source(filename, linecache.getlines(filename))
+
+    def get(self, filename: str) -> Source:
+        """Return the parsed source of filename, from cache if the file did not change"""
+        return self.get_entry(filename).source
+
+    def get_entry(self, filename: str) -> CachedSource:
+        """Return the parsed source of filename with its statement index"""
+        stamp = self._stamp(filename)
+
+        with self._lock:
+            entry = self._entries.get(filename)
+            if stamp is not None and entry is not None and entry.stamp == stamp:
+                self.hits += 1
+                self._entries.move_to_end(filename)
+                return entry
+
+            self.misses += 1
+
+            # File changed since it was cached
+            if entry is not None:
+                self._remove(filename)
+
+        # Sources without a file (e.g. <stdin>) can't be validated, never cache them
+        if stamp is None:
+            return CachedSource(None, self._load(filename))
+
+        # Also refresh linecache, the file may have changed
+        if entry is not None:
+            linecache.checkcache(filename)
+
+        entry = CachedSource(stamp, self._load(filename))
+        with self._lock:
+            self._add(filename, entry)
+        return entry
+
+    def is_cached(self, filename: str) -> bool:
+        """True if an up to date source of filename is cached"""
+        with self._lock:
+            entry = self._entries.get(filename)
+        return entry is not None and entry.stamp == self._stamp(filename)
+
+    def _add(self, filename: str, entry: CachedSource):
+        """Add entry and evict least recently used entries until limits are met"""
+        if entry.size > self.max_size or self.max_entries < 1:
+            return
+
+        # Another thread parsed the same file meanwhile
+        if filename in self._entries:
+            self._remove(filename)
+
+        self._entries[filename] = entry
+        self._size += entry.size
+
+        while len(self._entries) > self.max_entries or self._size > self.max_size:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, filename: str):
+        """Drop cached source of filename"""
+        entry = self._entries.pop(filename)
+        self._size -= entry.size
+
+    def clear(self):
+        """Drop all cached sources and reset statistics"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> CacheStats:
+        """Hit/miss statistics and current occupation of the cache"""
+        with self._lock:
+            return CacheStats(
+                self.hits, self.misses, self.evictions, len(self._entries), self._size
+            )
+
+
+# Shared by the excepthook and print_exception
+source_cache = SourceCache()
+
+
+def window_statement_tokens(
+    lines: List[str],
+    lineno: int,
+    lookbehind: int = WINDOW_LOOKBEHIND,
+    max_attempts: int = WINDOW_MAX_ATTEMPTS,
+) -> Optional[List[List[tokenize.TokenInfo]]]:
+    """Tokenize only the statement containing lineno, grouped by line.
+
+    Starting from the closest line above lineno which looks like the start of a
+    statement, the lines are tokenized until the logical line containing lineno
+    ends. Returns None if no consistent statement could be found, e.g. because
+    all candidates are within brackets or strings."""
+    if not 0 < lineno <= len(lines):
+        return None
+
+    attempts = 0
+    for start in range(lineno, max(lineno - lookbehind, 0), -1):
+        if not _STATEMENT_START.match(lines[start - 1]):
+            continue
+
+        statement = _tokenize_statement(lines, start, lineno)
+        if statement is not None:
+            return statement
+
+        attempts += 1
+        if attempts >= max_attempts:
+            break
+
+    return None
+
+
+def _tokenize_statement(
+    lines: List[str], start: int, lineno: int
+) -> Optional[List[List[tokenize.TokenInfo]]]:
+    """Tokenize lines from start until the logical line containing lineno ends"""
+    readline = iter(lines[start - 1 :]).__next__
+    offset = start - 1
+    depth = 0
+    logical_line: List[tokenize.TokenInfo] = []
+
+    try:
+        for token in tokenize.generate_tokens(readline):
+            if token.type == tokenize.OP:
+                if token.string in "([{":
+                    depth += 1
+                elif token.string in ")]}":
+                    depth -= 1
+                    # Started within brackets
+                    if depth < 0:
+                        return None
+
+            if token.type in (tokenize.INDENT, tokenize.DEDENT) or (
+                not logical_line and token.type in (tokenize.NL, tokenize.COMMENT)
+            ):
+                continue
+
+            logical_line.append(token)
+            if token.type != tokenize.NEWLINE:
+                continue
+
+            first_row = logical_line[0].start[0] + offset
+            if first_row > lineno:
+                return None
+            if token.end[0] + offset >= lineno:
+                return _group_by_row(logical_line)
+            logical_line = []
+
+    except (tokenize.TokenError, SyntaxError):
+        return None
+
+    return None
+
+
+def _group_by_row(tokens: List[tokenize.TokenInfo]) -> List[List[tokenize.TokenInfo]]:
+    """Group tokens by the line they start in"""
+    rows: "OrderedDict[int, List[tokenize.TokenInfo]]" = OrderedDict()
+    for token in tokens:
+        rows.setdefault(token.start[0], []).append(token)
+    return list(rows.values())
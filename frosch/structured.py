@@ -0,0 +1,260 @@
+"""
+
+    frosch - Better runtime errors
+
+    Patrick Haller
+    patrickhaller40@googlemail.com
+
+    License MIT
+
+    Structured output of reports as single JSON lines for log pipelines. A
+    record holds the same information as the debug tree, but nothing is
+    highlighted and values are only rendered with bounded reprs and hooks.
+
+"""
+
+import json
+import traceback
+from typing import Optional
+
+from .deadline import HOOKS, Deadline
+from .parser import (
+    FrameReport,
+    ParsedException,
+    Variable,
+    exception_message,
+    type_name,
+)
+from .reprs import bounded_repr
+from .snapshot import (
+    DeferredFrame,
+    DeferredSnapshot,
+    ExceptionSnapshot,
+    VariableSnapshot,
+    attached_snapshot,
+    frame_positions,
+    reraised_traceback,
+)
+from .type_hooks import HookLoader
+from .writer import write_report
+
+JSON = "json"
+TEXT = "text"
+
+
+def _hook_output(
+    type_: type, value, hook_loader: HookLoader, deadline: Deadline
+) -> Optional[str]:
+    """Output of the hook of type_, None without one or if it fails"""
+    if not deadline.check(HOOKS):
+        return None
+    try:
+        hook = hook_loader.resolve_hook(type_)
+        if hook is not None:
+            return hook(value)
+    except Exception:  # pylint: disable=W0703
+        pass
+    return None
+
+
+def variable_record(
+    variable: Variable, hook_loader: HookLoader, deadline: Deadline
+) -> dict:
+    """Name, position, type, bounded repr and hook output of variable"""
+    return {
+        "name": variable.name,
+        "col_offset": variable.col_offset,
+        "type": type_name(variable.type),
+        "repr": bounded_repr(variable.value, hook_loader.repr_limits),
+        "hook": _hook_output(variable.type, variable.value, hook_loader, deadline),
+    }
+
+
+def _captured_record(
+    variable: Variable,
+    frame: DeferredFrame,
+    hook_loader: HookLoader,
+    deadline: Deadline,
+) -> dict:
+    """Like variable_record, from the value captured in frame"""
+    captured = frame.values.get(variable.name)
+    if captured is None:
+        return variable_record(variable, hook_loader, deadline)
+
+    hook_output = None
+    if captured.hooked:
+        hook_output = _hook_output(captured.type, captured.value, hook_loader, deadline)
+    return {
+        "name": variable.name,
+        "col_offset": variable.col_offset,
+        "type": type_name(captured.type),
+        "repr": captured.repr,
+        "hook": hook_output,
+    }
+
+
+def _frame_record(frame: FrameReport, hook_loader: HookLoader, deadline: Deadline):
+    """Record of a calling frame with its debug tree"""
+    return {
+        "filename": frame.filename,
+        "lineno": frame.lineno,
+        "name": frame.name,
+        "line": frame.line,
+        "variables": [
+            variable_record(variable, hook_loader, deadline)
+            for variable in frame.variables
+        ],
+    }
+
+
+def exception_record(
+    parsed_exception: ParsedException,
+    hook_loader: HookLoader,
+    deadline: Optional[Deadline] = None,
+) -> dict:
+    """Everything of the report as JSON serializable dict. Exceptions carrying a
+    snapshot, e.g. from a worker process, are recorded from the snapshot"""
+    snapshot = attached_snapshot(parsed_exception.error_message)
+    if snapshot is not None:
+        return snapshot_record(
+            snapshot, deadline, reraised_traceback(parsed_exception.error_message)
+        )
+
+    deadline = deadline or Deadline()
+    variables = [
+        variable_record(variable, hook_loader, deadline)
+        for variable in parsed_exception.variables
+    ]
+    outer_frames = [
+        _frame_record(frame, hook_loader, deadline)
+        for frame in parsed_exception.outer_frames
+    ]
+    return {
+        "type": type_name(parsed_exception.error_type),
+        "message": exception_message(parsed_exception.error_message),
+        "frames": [
+            {"filename": frame.filename, "lineno": frame.lineno, "name": frame.name}
+            for frame in parsed_exception.stack
+        ],
+        "lineno": parsed_exception.last_stack.lineno,
+        "line": parsed_exception.line,
+        "variables": variables,
+        "outer_frames": outer_frames,
+        "skipped_frames": parsed_exception.skipped_frames,
+        "skipped_stages": deadline.skipped,
+    }
+
+
+def _snapshot_variable_record(variable: VariableSnapshot) -> dict:
+    """Like variable_record, from a variable rendered while capturing"""
+    return {
+        "name": variable.name,
+        "col_offset": variable.col_offset,
+        "type": variable.type_name,
+        "repr": variable.repr,
+        "hook": variable.rendered if variable.hooked else None,
+    }
+
+
+def snapshot_record(
+    snapshot: ExceptionSnapshot,
+    deadline: Optional[Deadline] = None,
+    reraised: Optional[traceback.TracebackException] = None,
+) -> dict:
+    """Record of a snapshot, the same fields as exception_record. The frames which
+    re-raised the exception, e.g. of future.result(), come first in frames"""
+    deadline = deadline or Deadline()
+    stack = snapshot.stack
+    if reraised is not None:
+        stack = frame_positions(reraised.stack) + stack
+
+    return {
+        "type": type_name(snapshot.error_type),
+        "message": snapshot.message,
+        "frames": [
+            {"filename": filename, "lineno": lineno, "name": name}
+            for filename, lineno, name in stack
+        ],
+        "lineno": snapshot.lineno,
+        "line": snapshot.line,
+        "variables": [
+            _snapshot_variable_record(variable) for variable in snapshot.variables
+        ],
+        "outer_frames": [
+            {
+                "filename": frame.filename,
+                "lineno": frame.lineno,
+                "name": frame.name,
+                "line": frame.line,
+                "variables": [
+                    _snapshot_variable_record(variable) for variable in frame.variables
+                ],
+            }
+            for frame in snapshot.outer_frames
+        ],
+        "skipped_frames": snapshot.skipped_frames,
+        "skipped_stages": deadline.skipped,
+    }
+
+
+def deferred_record(
+    deferred: DeferredSnapshot,
+    hook_loader: HookLoader,
+    deadline: Optional[Deadline] = None,
+) -> dict:
+    """Record of a deferred snapshot, the same fields as exception_record"""
+    deadline = deadline or Deadline()
+
+    def frame_fields(frame: DeferredFrame):
+        line, names = frame.parse(deferred.pretty, deadline)
+        variables = [
+            _captured_record(variable, frame, hook_loader, deadline)
+            for variable in names
+        ]
+        return line, variables
+
+    innermost = deferred.frames[0]
+    line, variables = None, []
+    if innermost.tokens is not None:
+        line, variables = frame_fields(innermost)
+
+    outer_frames = []
+    for frame in deferred.frames[1:]:
+        try:
+            frame_line, frame_variables = frame_fields(frame)
+        except Exception:  # pylint: disable=W0703
+            frame_line, frame_variables = "", []
+        outer_frames.append(
+            {
+                "filename": frame.filename,
+                "lineno": frame.lineno,
+                "name": frame.name,
+                "line": frame_line,
+                "variables": frame_variables,
+            }
+        )
+
+    return {
+        "type": type_name(deferred.error_type),
+        "message": deferred.message,
+        "frames": [
+            {"filename": frame.filename, "lineno": frame.lineno, "name": frame.name}
+            for frame in deferred.traceback_exception.stack
+        ],
+        "lineno": innermost.lineno,
+        "line": line,
+        "variables": variables,
+        "outer_frames": outer_frames,
+        "skipped_frames": deferred.skipped_frames,
+        "skipped_stages": deadline.skipped,
+    }
+
+
+def dumps(record: dict) -> str:
+    """Compact JSON line of record"""
+    return json.dumps(record, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def write_json(record: dict, stream, raw: bool = False):
+    """Write record as a single JSON line"""
+    write_report(stream, f"{dumps(record)}\n", raw)
@@ -16,61 +16,258 @@
 
 from collections.abc import Callable
 import importlib
-from typing import Any, Dict, Optional
+import sys
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
-# from .dt_hooks import hooks
-from .parser import Variable
+if TYPE_CHECKING:  # pragma: no cover
+    from .parser import Variable
+    from .reprs import ReprLimits
 
 T = Any
 
-# This will probably break/not work if there a types of the same name
-type_to_module = {"ndarray": "numpy", "Tensor": "torch"}
+# Fully qualified names of hooked types and the library their hook module is named
+# after. Both current and older module paths of pandas are listed.
+type_to_module = {
+    "numpy.ndarray": "numpy",
+    "torch.Tensor": "torch",
+    "torch.nn.parameter.Parameter": "torch",
+    "torch.nn.modules.module.Module": "torch",
+    "pandas.DataFrame": "pandas",
+    "pandas.Series": "pandas",
+    "pandas.Index": "pandas",
+    "pandas.core.frame.DataFrame": "pandas",
+    "pandas.core.series.Series": "pandas",
+    "pandas.core.indexes.base.Index": "pandas",
+    "polars.dataframe.frame.DataFrame": "polars",
+    "polars.lazyframe.frame.LazyFrame": "polars",
+    "pyarrow.lib.Table": "pyarrow",
+    "pyarrow.lib.RecordBatch": "pyarrow",
+}
 
 
-class HookLoader:
-    """HookLoader manages all datatype hooks for display relevant variables in output"""
+# Modules of the standard library, before python 3.10 only the ones with types
+# which commonly end up in reports
+_STDLIB_MODULES = getattr(
+    sys,
+    "stdlib_module_names",
+    {
+        "_collections",
+        "_datetime",
+        "_decimal",
+        "_io",
+        "_socket",
+        "_thread",
+        "abc",
+        "array",
+        "asyncio",
+        "collections",
+        "concurrent",
+        "contextlib",
+        "datetime",
+        "decimal",
+        "enum",
+        "fractions",
+        "functools",
+        "io",
+        "ipaddress",
+        "logging",
+        "multiprocessing",
+        "ntpath",
+        "os",
+        "pathlib",
+        "posixpath",
+        "queue",
+        "re",
+        "socket",
+        "sqlite3",
+        "subprocess",
+        "threading",
+        "types",
+        "typing",
+        "urllib",
+        "uuid",
+        "weakref",
+        "zipfile",
+    },
+)
+
+# Modules of types which never have plugins, their types don't trigger discovery
+_NO_PLUGINS = {"builtins", "__main__", "frosch"} | set(_STDLIB_MODULES)
+
+
+def qualified_name(type_: type) -> str:
+    """Module and qualname of type_, e.g. numpy.ndarray"""
+    return f"{type_.__module__}.{type_.__qualname__}"
+
+
+def _entry_points(group: str) -> list:
+    """Installed entry points of group, empty without importlib.metadata"""
+    try:
+        from importlib import metadata  # pylint: disable=C0415
+    except ImportError:  # Python < 3.8
+        try:
+            import importlib_metadata as metadata  # pylint: disable=C0415
+        except ImportError:
+            return []
+
+    entry_points = metadata.entry_points()
+    if hasattr(entry_points, "select"):
+        return list(entry_points.select(group=group))
+    return list(entry_points.get(group, []))
+
+
+class HookRegistry:
+    """Process wide hooks of frosch's dt_hooks modules and of plugins. A hook
+    module is imported at most once and only if its library is already imported,
+    so reporting never imports numpy, torch, ... by itself.
+
+    Plugins are packages with an entry point in the PLUGIN_GROUP group, named
+    after the library they have hooks for and pointing to a module with a hooks
+    dict or to the dict itself.
+
+    Cached hooks are read without locking, loading and resolving new types is
+    serialized, so hook modules are imported once also with concurrent reports."""
+
+    PLUGIN_GROUP = "frosch.dt_hooks"
 
     def __init__(self):
-        self._hooks = {}
+        self._lock = threading.RLock()
+        self._hooks: Dict[type, Callable] = {}
+        # Hook modules and plugins which were already tried to import
+        self._loaded_modules = set()
+        # Resolved hook of every type seen so far, None if it has none
+        self._resolved: Dict[type, Optional[Callable]] = {}
+        self._plugins = None
 
-    @classmethod
-    def with_hooks(cls, hooks: dict):
-        """Init HookLoader with predefined hooks"""
-        loader = cls()
-        loader._hooks = hooks  # pylint: disable=W0212
-        return loader
+    def register(self, hooks: Dict[type, Callable]):
+        """Add hooks, they take precedence over loaded ones of the same type"""
+        with self._lock:
+            self._hooks.update(hooks)
+            self._resolved.clear()
+
+    def plugins(self) -> Dict[str, list]:
+        """Entry points of plugins by library name, discovered once"""
+        with self._lock:
+            if self._plugins is None:
+                plugins: Dict[str, list] = {}
+                for entry_point in _entry_points(self.PLUGIN_GROUP):
+                    plugins.setdefault(entry_point.name, []).append(entry_point)
+                self._plugins = plugins
+        return self._plugins
 
-    def _lazy_load_hooks(self, module) -> Optional[Dict[type, Callable]]:
+    def _lazy_load_hooks(self, module):
         """Because we don't know what variables are actually used and to avoid import
         errors, we load modules which contains the imported libraries e.g numpy lazy
         and than get the hook functions"""
+        self._loaded_modules.add(module)
         try:
             module = importlib.import_module(f".dt_hooks.{module}", package="frosch")
         except ImportError:
             return
         self._hooks.update(module.hooks)
 
-    def lazy_load_hooks_from_variable(self, variable: Variable):
-        """Get the type of variable and look up if there is a module which contains this type"""
+    def _load_plugins(self, library: str):
+        """Load the hooks of all plugins for library"""
+        self._loaded_modules.add(f"plugin_{library}")
+        for entry_point in self.plugins().get(library, []):
+            try:
+                hooks = entry_point.load()
+            except Exception:  # pylint: disable=W0703
+                continue
+            hooks = getattr(hooks, "hooks", hooks)
+            if isinstance(hooks, dict):
+                self._hooks.update(hooks)
 
-        if variable.value is None:
+    def _load_hooks_for(self, base: type):
+        """Import the hook module and plugins which may have a hook for base"""
+        library = type_to_module.get(qualified_name(base))
+        if library in sys.modules and f"hook_{library}" not in self._loaded_modules:
+            self._lazy_load_hooks(f"hook_{library}")
+
+        library = base.__module__.split(".")[0]
+        if library in _NO_PLUGINS or library not in sys.modules:
             return
+        if f"plugin_{library}" not in self._loaded_modules:
+            if library in self.plugins():
+                self._load_plugins(library)
 
+    def resolve_hook(self, type_: type) -> Optional[Callable]:
+        """Hook of the closest base class of type_ in its MRO, which has one.
+        Results, also missing hooks, are cached per type"""
         try:
-            module_name = type_to_module[variable.type.__name__]
+            return self._resolved[type_]
         except KeyError:
-            return
+            pass
+
+        with self._lock:
+            # Hooks of all bases are loaded first, a hook module loaded for a base
+            # class may have a closer hook, e.g. for a subclass
+            for base in type_.__mro__:
+                if base not in self._hooks:
+                    self._load_hooks_for(base)
+
+            hook = next(
+                (self._hooks[base] for base in type_.__mro__ if base in self._hooks),
+                None,
+            )
+
+            self._resolved[type_] = hook
+        return hook
+
+
+# Shared by all HookLoaders, so hooks are loaded once per process
+registry = HookRegistry()
+
+
+class HookLoader:
+    """HookLoader manages all datatype hooks for display relevant variables in output.
+    Custom hooks come first, then the hooks of the registry"""
 
-        module_name = f"hook_{module_name}"
-        self._lazy_load_hooks(module_name)
+    def __init__(self, registry_: Optional[HookRegistry] = None):
+        self._hooks = {}
+        self._registry = registry_ or registry
+        # Resolved custom hook of every type seen so far, None if it has none.
+        # Resolving is idempotent, concurrent reports may only resolve twice
+        self._resolved: Dict[type, Optional[Callable]] = {}
+        # Limits for the repr of variables without a hook
+        self.repr_limits: Optional["ReprLimits"] = None
+
+    @classmethod
+    def with_hooks(cls, hooks: dict, registry_: Optional[HookRegistry] = None):
+        """Init HookLoader with predefined hooks"""
+        loader = cls(registry_)
+        loader._hooks = hooks  # pylint: disable=W0212
+        return loader
+
+    def resolve_hook(self, type_: type) -> Optional[Callable]:
+        """Custom hook of the closest base class of type_, else the registry's hook"""
+        try:
+            return self._resolved[type_]
+        except KeyError:
+            pass
 
-    def run_hook(self, variable: Variable) -> str:
-        """Check if hook is already imported, else try import"""
+        hook = None
+        if self._hooks:
+            hook = next(
+                (self._hooks[base] for base in type_.__mro__ if base in self._hooks),
+                None,
+            )
+        if hook is None:
+            hook = self._registry.resolve_hook(type_)
 
-        if not variable.type in self._hooks:
-            self.lazy_load_hooks_from_variable(variable)
+        self._resolved[type_] = hook
+        return hook
 
-        if variable.type in self._hooks:
-            return self._hooks[variable.type](variable.value)
+    def run_hook(self, variable: "Variable") -> str:
+        """Run the hook of the variable's type, without one or if it fails the
+        bounded repr is used"""
+        hook = self.resolve_hook(variable.type)
+        if hook is not None:
+            try:
+                return hook(variable.value)
+            except Exception:  # pylint: disable=W0703
+                # A broken hook must not break the report
+                pass
 
-        return variable.tree_str()
+        return variable.tree_str(self.repr_limits)
@@ -0,0 +1,97 @@
+"""
+
+    frosch - Better runtime errors
+
+    Patrick Haller
+    patrickhaller40@googlemail.com
+
+    License MIT
+
+    Exceptions of worker processes, e.g. of a ProcessPoolExecutor or a
+    multiprocessing.Pool, reach the parent without frames, only a string of the
+    remote traceback is left. Workers attach a snapshot to the exception, which
+    is pickled with it, so the parent renders the debug tree of the worker.
+
+"""
+
+from typing import Callable, Optional
+
+from .config_manager import ConfigManager
+
+# Configuration of snapshots taken in this worker process, set by initializer
+_worker_configs: Optional[ConfigManager] = None
+
+
+def attach_snapshot(
+    exception: BaseException, configs: Optional[ConfigManager] = None
+) -> bool:
+    """Attach a snapshot to exception, so it travels with the exception when pickled.
+    Frames of the traceback are cleared afterwards, the snapshot holds everything
+    needed. Returns False if the exception could not be captured"""
+    # pylint: disable=C0415
+    from .logging import capture_snapshot
+    from .snapshot import SNAPSHOT_ATTRIBUTE, release_frames
+
+    snapshot = capture_snapshot(exception, configs or _worker_configs)
+    if snapshot is None:
+        return False
+
+    try:
+        setattr(exception, SNAPSHOT_ATTRIBUTE, snapshot)
+    except AttributeError:
+        # Exceptions with __slots__ can't carry it
+        return False
+
+    release_frames(exception)
+    return True
+
+
+class SnapshotTask:
+    """Picklable wrapper of a task function, exceptions raised by it carry a
+    snapshot, e.g. executor.submit(SnapshotTask(work), item)"""
+
+    def __init__(self, function: Callable, configs: Optional[ConfigManager] = None):
+        self.function = function
+        self.configs = configs
+
+    def __call__(self, *args, **kwargs):
+        try:
+            return self.function(*args, **kwargs)
+        except Exception as error:
+            attach_snapshot(error, self.configs)
+            raise
+
+
+def _capture_before(module, name: str):
+    """Replace the class which carries the exception of a task to the parent with
+    one which attaches a snapshot first. The classes are private, if they are
+    missing nothing is replaced"""
+    base = getattr(module, name, None)
+    if not isinstance(base, type) or getattr(base, "_frosch_snapshot", False):
+        return
+
+    class ExceptionWithSnapshot(base):  # pylint: disable=R0903
+        """Attaches a snapshot before the traceback is formatted to text"""
+
+        _frosch_snapshot = True
+
+        def __init__(self, exc, *args, **kwargs):
+            attach_snapshot(exc)
+            super().__init__(exc, *args, **kwargs)
+
+    setattr(module, name, ExceptionWithSnapshot)
+
+
+def initializer(configs: Optional[ConfigManager] = None):
+    """Initializer of worker processes, after which exceptions of all tasks carry a
+    snapshot, e.g. ProcessPoolExecutor(initializer=initializer) or
+    multiprocessing.Pool(initializer=initializer)"""
+    # pylint: disable=C0415
+    from concurrent.futures import process
+    from multiprocessing import pool
+
+    global _worker_configs  # pylint: disable=W0603
+    _worker_configs = configs
+
+    _capture_before(process, "_ExceptionWithTraceback")
+    _capture_before(pool, "ExceptionWithTraceback")
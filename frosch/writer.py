@@ -12,51 +12,207 @@
 """
 
 from contextlib import contextmanager
+import io
+import os
+import sys
+import threading
 import traceback
-from typing import List
+from typing import List, Optional
+
+import colorama
+from colorama import Fore, Style
+
+from .deadline import COLOR, HOOKS, Deadline
+from .parser import FrameReport, ParsedException, Variable
+from .session import RenderSession
+from .snapshot import (
+    ExceptionSnapshot,
+    VariableSnapshot,
+    attached_snapshot,
+    reraised_traceback,
+)
+from .type_hooks import HookLoader
 
-from colorama import Fore, Style, init, deinit
-from pygments import highlight
-from pygments.formatters.terminal256 import Terminal256Formatter
-from pygments.lexers.python import Python3Lexer, Python3TracebackLexer
+_WINDOWS_COLORS = False
 
-from .parser import ParsedException, Variable
-from .type_hooks import HookLoader
+# Joins the traceback of a snapshot and of the frames which re-raised it
+_CAUSE_MESSAGE = "The above exception was the direct cause of the following exception:"
 
+# Reports of all threads go through write_report, so they never interleave
+_report_lock = threading.RLock()
 
 
-@contextmanager
 def support_windows_colors():
-    """Only for windows terminal"""
-    init()
-    yield
-    deinit()
+    """Enable escape sequences in the windows terminal, only once and only on
+    windows, so the std streams are not wrapped for every report"""
+    global _WINDOWS_COLORS  # pylint: disable=W0603
+    if _WINDOWS_COLORS or sys.platform != "win32":
+        return
+    _WINDOWS_COLORS = True
+
+    # colorama >= 0.4.6 patches the console without wrapping the streams
+    just_fix_windows_console = getattr(colorama, "just_fix_windows_console", None)
+    if just_fix_windows_console is not None:
+        just_fix_windows_console()
+    else:
+        colorama.init()
+
+
+def write_report(stream, report: str, raw: bool = False):
+    """Write a whole report with a single write and flush. With raw, the report is
+    written to the file descriptor of stream, bypassing its buffer. Reports of
+    concurrent threads are written one after another"""
+    with _report_lock:
+        _write_report(stream, report, raw)
+
+
+def _write_report(stream, report: str, raw: bool):
+    """Write report, the caller holds the report lock"""
+    if raw:
+        try:
+            fileno = stream.fileno()
+        except (AttributeError, OSError, ValueError):
+            fileno = None
+
+        if fileno is not None:
+            stream.flush()
+            data = report.encode(getattr(stream, "encoding", None) or "utf-8", "replace")
+            while data:
+                data = data[os.write(fileno, data) :]
+            return
+
+    stream.write(report)
+    stream.flush()
 
 
 class ConsoleWriter:
-    """Handles formatting, highlighting and writing to output of error message"""
-
-    def __init__(self, theme, stream, hook_loader: HookLoader):
+    """Handles formatting, highlighting and writing to output of error message.
+    Without color nothing of pygments is imported or set up"""
+
+    def __init__(
+        self,
+        theme,
+        stream,
+        hook_loader: HookLoader,
+        deadline: Optional[Deadline] = None,
+        session: Optional[RenderSession] = None,
+    ):
         self.stream = stream
-        self.terminal_formater = Terminal256Formatter(style=theme)
-        self.python_lexer = Python3Lexer()
-        self.python_traceback_lexer = Python3TracebackLexer()
+        self.session = session or RenderSession.for_theme(theme)
+        # Highlight and color the output, plain text otherwise
+        self.color = True
         self.left_offset = 0
         self.hook_loader = hook_loader
+        self.deadline = deadline or Deadline()
+        # Write reports to the file descriptor of the stream
+        self.raw_write = False
+        self._buffering = False
+
+    @property
+    def terminal_formater(self):
+        """Formatter of the session"""
+        return self.session.formatter
+
+    @property
+    def python_lexer(self):
+        """Lexer of the session for statements and values, None without color"""
+        return self.session.python_lexer if self.color else None
+
+    @property
+    def python_traceback_lexer(self):
+        """Lexer of the session for tracebacks, None without color"""
+        return self.session.python_traceback_lexer if self.color else None
+
+    @contextmanager
+    def buffered(self):
+        """Collect everything written and write it out at once at the end"""
+        stream, self.stream = self.stream, io.StringIO()
+        self._buffering = True
+        try:
+            yield
+        finally:
+            report = self.stream.getvalue()
+            self.stream = stream
+            self._buffering = False
+            write_report(stream, report, self.raw_write)
 
     def write_exception(self, parsed_exception: ParsedException):
-        """Handles all write methods"""
+        """Handles all write methods. Exceptions carrying a snapshot, e.g. from a
+        worker process, are written from the snapshot"""
+        snapshot = attached_snapshot(parsed_exception.error_message)
+        if snapshot is not None:
+            self.write_snapshot(
+                snapshot, reraised_traceback(parsed_exception.error_message)
+            )
+            return
+
+        support_windows_colors()
         # Write down
-        with support_windows_colors():
+        with self.buffered():
             self.write_traceback(
                 parsed_exception.error_type,
                 parsed_exception.error_message,
                 parsed_exception.traceback,
             )
-            self.write_last_line(
-                parsed_exception.last_stack.lineno, parsed_exception.line
+            if parsed_exception.line is not None:
+                self.write_last_line(
+                    parsed_exception.last_stack.lineno, parsed_exception.line
+                )
+                self.write_debug_tree(parsed_exception.variables)
+                self.write_newline()
+                self.write_outer_frames(
+                    parsed_exception.outer_frames, parsed_exception.skipped_frames
+                )
+            self.write_skipped_stages()
+
+    def write_snapshot(
+        self,
+        snapshot: ExceptionSnapshot,
+        reraised: Optional[traceback.TracebackException] = None,
+    ):
+        """Write a captured exception, same output as write_exception. The frames
+        which re-raised it, e.g. future.result(), follow as the exception it caused,
+        like multiprocessing chains the remote traceback"""
+        support_windows_colors()
+        with self.buffered():
+            self.write_traceback_text(snapshot.format_traceback())
+            if snapshot.line is not None:
+                self.write_last_line(snapshot.lineno, snapshot.line)
+                self.write_debug_tree(snapshot.variables)
+                self.write_newline()
+                self.write_outer_frames(snapshot.outer_frames, snapshot.skipped_frames)
+            if reraised is not None:
+                self._write_out(f"\n{_CAUSE_MESSAGE}\n\n")
+                self.write_traceback_text("".join(reraised.format(chain=False)))
+            self.write_skipped_stages()
+
+    def write_outer_frames(self, frames: List[FrameReport], skipped_frames: int):
+        """Write statement and debug tree of the frames calling the crashing one"""
+        for frame in frames:
+            self._write_out(
+                f'  File "{frame.filename}", line {frame.lineno}, in {frame.name}\n'
             )
-            self.write_debug_tree(parsed_exception.variables)
+            if frame.line:
+                self.write_last_line(frame.lineno, frame.line)
+                self.write_debug_tree(frame.variables)
+            self.write_newline()
+
+        if skipped_frames:
+            self._write_out(f"  ... {skipped_frames} more frames not inspected\n")
+
+    def highlight(self, code: str, lexer) -> str:
+        """Highlight code, as long as there is time left for it"""
+        if not self.color or not self.deadline.check(COLOR):
+            return code
+        from pygments import highlight  # pylint: disable=C0415
+
+        return highlight(code, lexer, self.terminal_formater)
+
+    def write_skipped_stages(self):
+        """Tell which stages were skipped, because the time budget was used up"""
+        summary = self.deadline.summary()
+        if summary:
+            self._write_out(summary)
             self.write_newline()
 
     def write_traceback(self, error_type, error_message, traceback_):
@@ -64,11 +220,11 @@ class ConsoleWriter:
         formatted_exception = "".join(
             traceback.format_exception(error_type, error_message, traceback_)
         )
-        self._write_out(
-            highlight(
-                formatted_exception, self.python_traceback_lexer, self.terminal_formater
-            )
-        )
+        self.write_traceback_text(formatted_exception)
+
+    def write_traceback_text(self, formatted_exception: str):
+        """Highlight an already formatted traceback and write out"""
+        self._write_out(self.highlight(formatted_exception, self.python_traceback_lexer))
 
     @staticmethod
     def offset_vert_lines(offsets: List[int]) -> str:
@@ -86,20 +242,21 @@ class ConsoleWriter:
 
         return line
 
-    @staticmethod
-    def left_bar() -> str:
+    def left_bar(self) -> str:
         """Bar used on left side of debug tree"""
+        if not self.color:
+            return "||"
         return Fore.BLUE + "||" + Style.RESET_ALL
 
     def _write_out(self, message: str):
-        """Write to stream"""
+        """Write to stream, flushed unless the whole report is buffered"""
         self.stream.write(message)
-        self.stream.flush()
+        if not self._buffering:
+            self.stream.flush()
 
     def write_newline(self):
         """Write newline to stderr"""
-        self.stream.write("\n")
-        self.stream.flush()
+        self._write_out("\n")
 
     def write_debug_tree(self, names: List[Variable]):
         """Sort offsets and values for construction of debug tree"""
@@ -115,9 +272,7 @@ class ConsoleWriter:
 
         self.construct_debug_tree(lines, sorted_values)
 
-        for line in lines:
-            self._write_out(line)
-            self.write_newline()
+        self._write_out("".join(f"{line}\n" for line in lines))
 
     def construct_debug_tree(self, lines: List[str], sorted_values: List[Variable]):
         """Construction of debug tree"""
@@ -139,12 +294,9 @@ class ConsoleWriter:
                 if j != (unprocessed_values - 1):
                     lines[i] += "│"
                 else:
-                    # Check for datatype hooks and use instead
-                    value = self.hook_loader.run_hook(value)
+                    value = self.render_variable(value)
 
-                    highlighted_value = highlight(
-                        value, self.python_lexer, self.terminal_formater
-                    ).rstrip()
+                    highlighted_value = self.highlight(value, self.python_lexer).rstrip()
 
                     lines[i] += f"└── {highlighted_value}"
 
@@ -161,11 +313,19 @@ class ConsoleWriter:
 
         return lines
 
+    def render_variable(self, variable) -> str:
+        """Text of a variable in the debug tree, snapshots are already rendered"""
+        if isinstance(variable, VariableSnapshot):
+            return variable.rendered
+
+        # Check for datatype hooks and use instead
+        if self.deadline.check(HOOKS):
+            return self.hook_loader.run_hook(variable)
+        return variable.tree_str(self.hook_loader.repr_limits)
+
     def write_last_line(self, lineno: int, line: str):
         """Write out the line which throws runtime error with highlighting"""
         self.write_newline()
         self.left_offset = len(str(lineno))
-        highlighted_line = highlight(
-            line, self.python_lexer, self.terminal_formater
-        ).rstrip()
+        highlighted_line = self.highlight(line, self.python_lexer).rstrip()
         self._write_out(f" {lineno} {self.left_bar()} {highlighted_line}\n")
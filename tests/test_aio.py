@@ -0,0 +1,120 @@
+import asyncio
+import io
+import os
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+import frosch
+from frosch import aio
+from frosch.config_manager import ConfigManager
+
+from .helpers import TerminalStream, escape_ansi
+
+
+def fail(value):
+    return value + "String"
+
+
+class TestAio(TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_aprint_exception(self):
+        stream = io.StringIO()
+        try:
+            fail(3)
+        except TypeError as error:
+            exception = error
+
+        self.loop.run_until_complete(aio.aprint_exception(exception, stream))
+
+        output = escape_ansi(stream.getvalue())
+        self.assertIn("TypeError", output)
+        self.assertIn('return value + "String"', output)
+        self.assertIn("value: int = 3", output)
+
+    def test_colors_are_decided_by_stream(self):
+        try:
+            fail(3)
+        except TypeError as error:
+            exception = error
+
+        configs = ConfigManager.default()
+        terminal, buffer = TerminalStream(), io.StringIO()
+        with patch.dict(os.environ, {"NO_COLOR": "", "TERM": "xterm"}):
+            for stream in (terminal, buffer):
+                self.loop.run_until_complete(
+                    aio.aprint_exception(exception, stream, configs)
+                )
+
+        self.assertIn("\x1b[", terminal.getvalue())
+        self.assertNotIn("\x1b[", buffer.getvalue())
+
+    def test_aprint_exception_is_exported(self):
+        self.assertIs(frosch.aprint_exception, aio.aprint_exception)
+
+    def test_loop_exception_handler_without_exception(self):
+        loop = Mock()
+        context = {"message": "Something happened"}
+        aio.loop_exception_handler(loop, context)
+        loop.default_exception_handler.assert_called_once_with(context)
+
+    def test_loop_exception_handler_reports_task_exception(self):
+        aio.install(self.loop)
+        self.assertIs(self.loop.get_exception_handler(), aio.loop_exception_handler)
+
+        async def failing_task():
+            fail(4)
+
+        async def main():
+            task = self.loop.create_task(failing_task())
+            await asyncio.sleep(0)
+            self.loop.call_exception_handler(
+                {"message": "Task failed", "exception": task.exception(), "task": task}
+            )
+            await asyncio.gather(*aio._pending_reports)
+
+        stderr = io.StringIO()
+        with patch.object(aio.sys, "stderr", stderr):
+            self.loop.run_until_complete(main())
+
+        output = escape_ansi(stderr.getvalue())
+        self.assertTrue(output.startswith("Task failed\n"))
+        self.assertIn("value: int = 4", output)
+
+    def test_message_and_report_are_written_at_once(self):
+        try:
+            fail(5)
+        except TypeError as error:
+            exception = error
+
+        loop = Mock()
+        loop.is_running.return_value = False
+        with patch.object(aio, "_write") as write_mock:
+            aio.loop_exception_handler(
+                loop, {"message": "Task failed", "exception": exception}
+            )
+
+        write_mock.assert_called_once()
+        report = escape_ansi(write_mock.call_args[0][1])
+        self.assertTrue(report.startswith("Task failed\nTraceback"))
+        self.assertIn("value: int = 5", report)
+
+    def test_broken_report_falls_back_to_default_handler(self):
+        try:
+            fail(6)
+        except TypeError as error:
+            context = {"message": "Task failed", "exception": error}
+
+        loop = Mock()
+        loop.is_running.return_value = False
+        with patch.object(aio, "format_exception", side_effect=RuntimeError):
+            with patch.object(aio, "_write") as write_mock:
+                aio.loop_exception_handler(loop, context)
+
+        write_mock.assert_not_called()
+        loop.default_exception_handler.assert_called_once_with(context)
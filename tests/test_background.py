@@ -0,0 +1,167 @@
+import io
+import threading
+from unittest import TestCase
+from unittest.mock import patch
+
+import pytest
+
+from frosch import background, frosch
+from frosch.background import BackgroundReporter
+from frosch.config_manager import ConfigManager
+
+from .helpers import escape_ansi
+
+
+def make_exception(value):
+    try:
+        value + "String"
+    except TypeError as error:
+        return error
+
+
+class TestBackgroundReporter(TestCase):
+
+    def setUp(self):
+        self.stream = io.StringIO()
+
+    def test_submit_renders_in_background(self):
+        reporter = BackgroundReporter(self.stream)
+        reporter.submit(make_exception(3))
+        reporter.close()
+
+        output = escape_ansi(self.stream.getvalue())
+        self.assertIn("TypeError", output)
+        self.assertIn('value + "String"', output)
+        self.assertIn("value: int = 3", output)
+
+    def test_snapshot_is_taken_on_submit(self):
+        reporter = BackgroundReporter(self.stream)
+        value = [1]
+        try:
+            value + "String"
+        except TypeError as error:
+            reporter.submit(error)
+        value.append(2)
+        reporter.close()
+
+        self.assertIn("value: list = [1]", escape_ansi(self.stream.getvalue()))
+
+    def test_hooks_and_formatting_run_in_reporter(self):
+        reporter = BackgroundReporter(self.stream)
+        caller = threading.current_thread()
+        threads = []
+
+        def hook(_value):
+            threads.append(threading.current_thread())
+            return "hooked"
+
+        with patch.object(reporter._hook_loader, "resolve_hook", return_value=hook):
+            with patch(
+                "frosch.snapshot.format_statement",
+                side_effect=lambda tokens, *args: threads.append(
+                    threading.current_thread()
+                )
+                or 'value + "String"',
+            ):
+                reporter.submit(make_exception(3))
+                reporter.close()
+
+        self.assertTrue(threads)
+        self.assertNotIn(caller, threads)
+        self.assertIn("hooked", escape_ansi(self.stream.getvalue()))
+
+    def test_broken_report_falls_back_to_traceback(self):
+        reporter = BackgroundReporter(self.stream)
+        with patch(
+            "frosch.snapshot.DeferredSnapshot.resolve", side_effect=RuntimeError
+        ):
+            reporter.submit(make_exception(3))
+            reporter.close()
+
+        output = self.stream.getvalue()
+        self.assertIn("Traceback (most recent call last)", output)
+        self.assertIn("TypeError", output)
+
+    def test_exception_without_traceback_is_written_plain(self):
+        reporter = BackgroundReporter(self.stream)
+        reporter.submit(ValueError("never raised"))
+        reporter.close()
+
+        self.assertEqual(self.stream.getvalue(), "ValueError: never raised\n")
+
+    def blocked_reporter(self, overflow):
+        """Reporter with a full queue, rendering is blocked until released"""
+        writing = threading.Event()
+        release = threading.Event()
+        reporter = BackgroundReporter(self.stream, maxsize=1, overflow=overflow)
+        original_write = reporter.stream.write
+
+        def blocking_write(text):
+            writing.set()
+            release.wait()
+            return original_write(text)
+
+        self.stream.write = blocking_write
+        reporter.submit(make_exception(1))
+        # First one is taken by the thread, second one fills the queue
+        self.assertTrue(writing.wait(5))
+        reporter.submit(make_exception(2))
+        return reporter, release
+
+    def test_overflow_drop(self):
+        reporter, release = self.blocked_reporter(background.DROP)
+        reporter.submit(make_exception(3))
+        self.assertEqual(reporter.dropped, 1)
+        release.set()
+        reporter.close()
+
+        output = escape_ansi(self.stream.getvalue())
+        self.assertIn("value: int = 2", output)
+        self.assertNotIn("value: int = 3", output)
+
+    def test_concurrent_drops_are_counted(self):
+        reporter, release = self.blocked_reporter(background.DROP)
+        error = make_exception(3)
+
+        def submit_all():
+            for _ in range(100):
+                reporter.submit(error)
+
+        threads = [threading.Thread(target=submit_all) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(reporter.dropped, 800)
+        release.set()
+        reporter.close()
+
+    def test_overflow_plain(self):
+        reporter, release = self.blocked_reporter(background.PLAIN)
+        with patch.object(reporter, "_write_plain") as plain_mock:
+            reporter.submit(make_exception(3))
+            self.assertTrue(plain_mock.called)
+        release.set()
+        reporter.close()
+        self.assertEqual(reporter.dropped, 0)
+
+    def test_close_summarizes_remaining_repetitions(self):
+        configs = ConfigManager.default().from_kwargs(dedup_window=60)
+        reporter = BackgroundReporter(self.stream, configs)
+        error = make_exception(3)
+        for _ in range(4):
+            reporter.submit(error)
+        reporter.close()
+
+        summaries = [line for line in self.stream.getvalue().splitlines() if "×" in line]
+        self.assertListEqual([line.split()[0] for line in summaries], ["×1", "×2", "×3"])
+
+    def test_unknown_overflow_policy(self):
+        with pytest.raises(ValueError):
+            BackgroundReporter(self.stream, overflow="explode")
+
+    def test_print_exception_background(self):
+        with patch.object(background, "default_reporter") as reporter_mock:
+            error = make_exception(1)
+            frosch.print_exception(error, background=True)
+            reporter_mock.return_value.submit.assert_called_once_with(error)
@@ -38,6 +38,10 @@ class TestConfigManager(TestCase):
         with pytest.raises(ThemeNotExistsError):
             ConfigManager._get_theme_from_string("not existing")
 
+    def test_unknown_theme_fails_on_set(self):
+        with pytest.raises(ThemeNotExistsError):
+            ConfigManager().theme = "doesnotexist"
+
     def test__get_theme_from_string(self):
         themes = [
             "abap",
@@ -105,3 +109,10 @@ class TestConfigManager(TestCase):
         config_manager.dt_hooks = hooks
         hook_loader = config_manager.initialize_datatype_hook_loader()
         self.assertDictEqual(hook_loader._hooks, hooks)
+
+    def test_hook_loader_is_kept(self):
+        config_manager = ConfigManager()
+        self.assertIs(
+            config_manager.initialize_datatype_hook_loader(),
+            config_manager.initialize_datatype_hook_loader(),
+        )
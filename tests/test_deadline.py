@@ -0,0 +1,38 @@
+import time
+from unittest import TestCase
+
+from frosch import deadline
+from frosch.deadline import Deadline
+
+
+class TestDeadline(TestCase):
+
+    def test_no_budget_never_expires(self):
+        no_deadline = Deadline()
+        self.assertFalse(no_deadline.expired())
+        self.assertIsNone(no_deadline.remaining())
+        self.assertEqual(no_deadline.remaining(3), 3)
+        self.assertTrue(no_deadline.check(deadline.HOOKS))
+        self.assertIsNone(no_deadline.summary())
+
+    def test_budget_expires(self):
+        short_deadline = Deadline(budget_ms=1)
+        time.sleep(0.002)
+        self.assertTrue(short_deadline.expired())
+        self.assertEqual(short_deadline.remaining(), 0.0)
+
+    def test_check_records_skipped_stages(self):
+        expired_deadline = Deadline(budget_ms=0)
+        self.assertFalse(expired_deadline.check(deadline.HOOKS))
+        self.assertFalse(expired_deadline.check(deadline.COLOR))
+        self.assertFalse(expired_deadline.check(deadline.HOOKS))
+        self.assertListEqual(expired_deadline.skipped, ["hooks", "color"])
+        self.assertEqual(
+            expired_deadline.summary(),
+            "frosch: budget of 0ms exhausted, skipped hooks, color",
+        )
+
+    def test_check_before_expiring(self):
+        long_deadline = Deadline(budget_ms=10000)
+        self.assertTrue(long_deadline.check(deadline.FORMATTING))
+        self.assertListEqual(long_deadline.skipped, [])
@@ -0,0 +1,164 @@
+from concurrent.futures import ThreadPoolExecutor
+import io
+from unittest import TestCase
+
+from frosch import frosch
+from frosch.config_manager import ConfigManager
+from frosch.dedup import StormDeduplicator, crash_signature
+
+
+def fail(index):
+    items = []
+    return items[index]
+
+
+def make_exception(index=0):
+    try:
+        fail(index)
+    except IndexError as error:
+        return error
+
+
+def make_other_exception():
+    try:
+        {}["key"]
+    except KeyError as error:
+        return error
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCrashSignature(TestCase):
+
+    def test_same_crash_site(self):
+        self.assertEqual(crash_signature(make_exception()), crash_signature(make_exception()))
+
+    def test_signature_fields(self):
+        module, qualname, filename, lineno, message = crash_signature(make_exception())
+        self.assertEqual((module, qualname), ("builtins", "IndexError"))
+        self.assertEqual(filename, __file__)
+        self.assertEqual(lineno, fail.__code__.co_firstlineno + 2)
+        self.assertEqual(message, "list index out of range")
+
+    def test_numbers_are_templated(self):
+        first = ValueError("id 12 at 0x7f3a")
+        second = ValueError("id 345 at 0x1b2c")
+        self.assertEqual(crash_signature(first), crash_signature(second))
+        self.assertEqual(crash_signature(first)[-1], "id # at #")
+
+    def test_different_crash_sites(self):
+        self.assertNotEqual(
+            crash_signature(make_exception()), crash_signature(make_other_exception())
+        )
+
+
+class TestStormDeduplicator(TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.deduplicator = StormDeduplicator(window=60, max_entries=2, clock=self.clock)
+
+    def test_first_occurrence_is_rendered(self):
+        self.assertEqual(self.deduplicator.check(make_exception()), (True, []))
+
+    def test_repetitions_are_summarized(self):
+        self.deduplicator.check(make_exception())
+        summaries = []
+        for _ in range(8):
+            render, new_summaries = self.deduplicator.check(make_exception())
+            self.assertFalse(render)
+            summaries += new_summaries
+
+        self.assertTrue(summaries[0].startswith("×1 more IndexError since "))
+        self.assertTrue(summaries[0].endswith(f"at {__file__}:{fail.__code__.co_firstlineno + 2}"))
+        self.assertListEqual(
+            [summary.split()[0] for summary in summaries], ["×1", "×2", "×4", "×8"]
+        )
+
+    def test_new_window_renders_again(self):
+        self.deduplicator.check(make_exception())
+        self.deduplicator.check(make_exception())
+        self.deduplicator.check(make_exception())
+
+        self.deduplicator.check(make_exception())
+
+        self.clock.now = 61
+        render, summaries = self.deduplicator.check(make_exception())
+        self.assertTrue(render)
+        self.assertEqual(len(summaries), 1)
+        self.assertTrue(summaries[0].startswith("×3 more"))
+
+        self.assertEqual(self.deduplicator.check(make_exception())[0], False)
+
+    def test_tail_is_summarized_when_the_storm_stops(self):
+        for _ in range(6):
+            self.deduplicator.check(make_exception())
+
+        self.clock.now = 61
+        render, summaries = self.deduplicator.check(make_other_exception())
+        self.assertTrue(render)
+        self.assertListEqual([summary.split()[0] for summary in summaries], ["×5"])
+        self.assertEqual(len(self.deduplicator), 1)
+
+    def test_reported_count_is_not_repeated(self):
+        for _ in range(5):
+            self.deduplicator.check(make_exception())
+
+        self.clock.now = 61
+        self.assertEqual(self.deduplicator.check(make_exception()), (True, []))
+
+    def test_lru_eviction(self):
+        self.deduplicator.check(make_exception())
+        for _ in range(4):
+            self.deduplicator.check(make_other_exception())
+        self.deduplicator.check(make_exception())
+        render, summaries = self.deduplicator.check(ValueError("third"))
+
+        self.assertTrue(render)
+        self.assertEqual(len(self.deduplicator), 2)
+        # Least recently seen was the KeyError, its repetition is summarized
+        self.assertEqual(len(summaries), 1)
+        self.assertTrue(summaries[0].startswith("×3 more KeyError"))
+        self.assertEqual(self.deduplicator.check(make_other_exception()), (True, []))
+
+    def test_drain(self):
+        for _ in range(6):
+            self.deduplicator.check(make_exception())
+
+        summaries = self.deduplicator.drain()
+        self.assertListEqual([summary.split()[0] for summary in summaries], ["×5"])
+        self.assertEqual(len(self.deduplicator), 0)
+
+    def test_concurrent_checks_render_once(self):
+        exception = make_exception()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(self.deduplicator.check, [exception] * 400))
+
+        self.assertEqual(sum(render for render, _ in results), 1)
+        summaries = [summary for _, summaries in results for summary in summaries]
+        self.assertEqual(summaries[-1].split()[0], "×256")
+
+
+class TestDeduplicatedWriting(TestCase):
+
+    def test_write_exception_deduplicates(self):
+        configs = ConfigManager.default().from_kwargs(dedup_window=60)
+        stream = io.StringIO()
+
+        frosch.write_exception(make_exception(), stream, configs)
+        first_report = stream.getvalue()
+        self.assertIn("IndexError", first_report)
+
+        frosch.write_exception(make_exception(), stream, configs)
+        summary = stream.getvalue()[len(first_report):]
+        self.assertTrue(summary.startswith("×1 more IndexError since"))
+        self.assertEqual(summary.count("\n"), 1)
+
+    def test_no_deduplicator_by_default(self):
+        self.assertIsNone(ConfigManager.default().initialize_deduplicator())
@@ -0,0 +1,52 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from frosch import frames
+
+
+def outer():
+    value = 1
+    inner(value)
+
+
+def inner(value):
+    raise ValueError(value)
+
+
+def make_traceback():
+    try:
+        outer()
+    except ValueError as error:
+        return error.__traceback__
+
+
+class TestFrames(TestCase):
+
+    def test_walk_traceback(self):
+        stack = frames.walk_traceback(make_traceback())
+        self.assertListEqual(
+            [frame.name for frame in stack], ["make_traceback", "outer", "inner"]
+        )
+        self.assertEqual(stack[-1].filename, __file__)
+        self.assertEqual(stack[-1].lineno, inner.__code__.co_firstlineno + 1)
+        self.assertEqual(stack[1].locals, {"value": 1})
+        self.assertIs(stack[1].globals, globals())
+
+    def test_walk_no_traceback(self):
+        self.assertListEqual(frames.walk_traceback(None), [])
+
+    def test_line_is_resolved_lazily(self):
+        stack = frames.walk_traceback(make_traceback())
+        with patch.object(frames.linecache, "getline", return_value="  x  \n") as getline:
+            self.assertFalse(getline.called)
+            self.assertEqual(stack[-1].line, "x")
+            self.assertEqual(stack[-1].line, "x")
+            self.assertEqual(getline.call_count, 1)
+
+    def test_line(self):
+        stack = frames.walk_traceback(make_traceback())
+        self.assertEqual(stack[-1].line, "raise ValueError(value)")
+
+    def test_innermost_frame(self):
+        frame = frames.innermost_frame(make_traceback())
+        self.assertEqual(frame.f_code.co_name, "inner")
@@ -1,3 +1,8 @@
+import io
+import subprocess
+import threading
+import time
+import types
 import unittest
 from unittest import TestCase
 from unittest.mock import Mock, patch
@@ -6,27 +11,189 @@ import sys
 import pytest
 
 from frosch import frosch
+from frosch.config_manager import ThemeNotExistsError
 
 
 
 
 class TestFrosch(TestCase):
 
+    def setUp(self):
+        # threading.excepthook and sys.unraisablehook exist since python 3.8
+        self._old_hooks = (
+            sys.excepthook,
+            getattr(threading, "excepthook", None),
+            getattr(sys, "unraisablehook", None),
+            getattr(frosch.pytrace_excepthook, "configs", None),
+        )
+
+    def tearDown(self):
+        excepthook, threading_excepthook, unraisablehook, configs = self._old_hooks
+        sys.excepthook = excepthook
+        frosch.pytrace_excepthook.configs = configs
+        if threading_excepthook is not None:
+            threading.excepthook = threading_excepthook
+        if unraisablehook is not None:
+            sys.unraisablehook = unraisablehook
+
     def test_hook_attached(self):
-        _old_excepthook = sys.excepthook
         frosch.hook()
         self.assertEqual(frosch.pytrace_excepthook, sys.excepthook)
         self.assertIsNotNone(sys.excepthook.configs)
-        sys.excepthook = _old_excepthook
 
     def test_hook_attached_with_args(self):
-        _old_excepthook = sys.excepthook
         frosch.hook(theme="vim")
         self.assertEqual(frosch.pytrace_excepthook, sys.excepthook)
         self.assertIsNotNone(sys.excepthook.configs)
         self.assertEqual(type(sys.excepthook.configs.theme).__name__, "StyleMeta")
 
-        sys.excepthook = _old_excepthook
+    @unittest.skipIf(sys.version_info < (3, 8), "Hooks exist since python 3.8")
+    def test_hook_attaches_thread_and_unraisable_hooks(self):
+        frosch.hook()
+        self.assertEqual(frosch.pytrace_threading_excepthook, threading.excepthook)
+        self.assertEqual(frosch.pytrace_unraisablehook, sys.unraisablehook)
+
+    def test_hook_with_unknown_theme(self):
+        with pytest.raises(ThemeNotExistsError):
+            frosch.hook(theme="doesnotexist")
+
+    def test_hook_does_not_import_render_dependencies(self):
+        statement = (
+            "import sys, frosch; frosch.hook(theme='vim'); "
+            "print(','.join(sorted(m for m in sys.modules if m.split('.')[0] in "
+            "('pygments', 'yapf', 'stack_data', 'asttokens', 'cheap_repr', 'colorama'))))"
+        )
+        output = subprocess.check_output([sys.executable, "-c", statement])
+        self.assertEqual(output.strip(), b"")
+
+    def test_hook_does_not_import_deduplication(self):
+        # dedup pulls in re, which is only needed once exceptions are deduplicated
+        statement = (
+            "import sys, frosch; frosch.hook(); print('frosch.dedup' in sys.modules)"
+        )
+        output = subprocess.check_output([sys.executable, "-c", statement])
+        self.assertEqual(output.strip(), b"False")
+
+    def test_style_is_loaded_on_access(self):
+        import frosch as package
+
+        self.assertEqual(package.style.Style.__module__, "pygments.style")
+
+    def test_format_exception(self):
+        try:
+            value = 3
+            value + "String"
+        except TypeError as error:
+            exception = error
+
+        # Outside of the except block, sys.exc_info is empty
+        result = frosch.format_exception(exception)
+        self.assertIn("TypeError", result)
+        self.assertIn("value", result)
+
+    @unittest.skipIf(sys.version_info < (3, 8), "Hooks exist since python 3.8")
+    def test_thread_exception_is_reported(self):
+        frosch.hook(color=False)
+
+        def work():
+            items = [1, 2]
+            items[5]
+
+        stderr = io.StringIO()
+        with patch.object(sys, "stderr", stderr):
+            thread = threading.Thread(target=work, name="worker-1")
+            thread.start()
+            thread.join()
+
+        output = stderr.getvalue()
+        self.assertTrue(output.startswith("Exception in thread worker-1:\n"))
+        self.assertIn("items: list = [1, 2]", output)
+        self.assertEqual(output.count("IndexError"), 1)
+
+    def test_thread_exit_is_silent(self):
+        stderr = io.StringIO()
+        args = types.SimpleNamespace(
+            exc_type=SystemExit, exc_value=SystemExit(), exc_traceback=None, thread=None
+        )
+        with patch.object(sys, "stderr", stderr):
+            frosch.pytrace_threading_excepthook(args)
+        self.assertEqual(stderr.getvalue(), "")
+
+    @unittest.skipIf(sys.version_info < (3, 8), "Hooks exist since python 3.8")
+    def test_unraisable_exception_is_reported(self):
+        frosch.hook(color=False)
+
+        class Resource:
+            def __del__(self):
+                size = 3
+                size / 0
+
+        stderr = io.StringIO()
+        with patch.object(sys, "stderr", stderr):
+            resource = Resource()
+            del resource
+
+        output = stderr.getvalue()
+        self.assertTrue(output.startswith("Exception ignored in: <function"))
+        self.assertIn("size: int = 3", output)
+
+    @unittest.skipIf(sys.version_info < (3, 8), "Hooks exist since python 3.8")
+    def test_unraisable_without_traceback_uses_default_hook(self):
+        unraisable = types.SimpleNamespace(
+            exc_type=ValueError,
+            exc_value=None,
+            exc_traceback=None,
+            err_msg="Exception ignored",
+            object=None,
+        )
+        with patch.object(sys, "__unraisablehook__") as default_hook:
+            frosch.pytrace_unraisablehook(unraisable)
+        default_hook.assert_called_once_with(unraisable)
+
+    def test_concurrent_reports_do_not_interleave(self):
+        configs = frosch.ConfigManager.default().from_kwargs(color=False)
+
+        class SlowStream:
+            """Writes char by char and yields in between, like a slow terminal"""
+
+            def __init__(self):
+                self.chars = []
+
+            def write(self, text):
+                for char in text:
+                    self.chars.append(char)
+                    time.sleep(0)
+
+            def flush(self):
+                pass
+
+        def fail(number):
+            return number / 0
+
+        exceptions = []
+        for number in range(16):
+            try:
+                fail(number)
+            except ZeroDivisionError as error:
+                exceptions.append(error)
+
+        expected = {frosch.format_exception(error, configs) for error in exceptions}
+        stream = SlowStream()
+        threads = [
+            threading.Thread(target=frosch.write_exception, args=(error, stream, configs))
+            for error in exceptions
+            for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        header = "Traceback (most recent call last):"
+        reports = "".join(stream.chars).split(header)[1:]
+        self.assertEqual(len(reports), len(threads))
+        for report in reports:
+            self.assertIn(header + report, expected)
 
     @unittest.skip("How to test this?")
     def test_pytrace_excepthook(self):
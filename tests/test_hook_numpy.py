@@ -0,0 +1,70 @@
+import tempfile
+from unittest import TestCase
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from frosch.dt_hooks import hook_numpy
+from frosch.dt_hooks.hook_numpy import ChunkStats, display_np_array, iter_chunks
+from frosch.parser import Variable
+from frosch.type_hooks import HookLoader
+
+
+class TestNumpyHook(TestCase):
+
+    def test_float_stats(self):
+        array = np.arange(12, dtype=float).reshape(3, 4)
+        array[0, 0] = np.nan
+        array[1, 1] = np.inf
+        self.assertEqual(
+            display_np_array(array),
+            " (3, 4)[f64] !!NaNs:1!! Infs:1 min:1.0 max:11.0 median:6.5",
+        )
+
+    def test_int_bool_and_str_dtypes(self):
+        self.assertEqual(
+            display_np_array(np.arange(10, dtype=np.int64)),
+            " (10,)[i64] NaNs:0 Infs:0 min:0 max:9 median:4.5",
+        )
+        self.assertEqual(display_np_array(np.array([True, False])), " (2,)[bool] True:1")
+        self.assertEqual(display_np_array(np.array(["a", "bc"])), " (2,)[str]")
+
+    def test_empty_and_all_nan(self):
+        self.assertEqual(display_np_array(np.zeros(0)), " (0,)[f64] NaNs:0 Infs:0")
+        self.assertEqual(
+            display_np_array(np.full(3, np.nan)), " (3,)[f64] !!NaNs:3!! Infs:0"
+        )
+
+    def test_chunks_are_bounded(self):
+        array = np.zeros((100, 100)).T
+        sizes = [chunk.size for chunk in iter_chunks(array, chunk_bytes=800)]
+        self.assertEqual(max(sizes), 100)
+        self.assertEqual(sum(sizes), array.size)
+
+    def test_chunked_stats_match_full_reduction(self):
+        array = np.random.default_rng(0).normal(size=(50, 70))[:, ::3]
+        stats = ChunkStats.of(array, chunk_bytes=256)
+        self.assertEqual(stats.min, array.min())
+        self.assertEqual(stats.max, array.max())
+
+    def test_large_array_has_sampled_median(self):
+        size = hook_numpy.MEDIAN_EXACT_LIMIT + 1
+        self.assertIn("median~:", display_np_array(np.ones(size)))
+
+    def test_memmap(self):
+        with tempfile.NamedTemporaryFile() as file_:
+            array = np.memmap(file_.name, dtype=np.float32, mode="w+", shape=(1000,))
+            array[:] = 2
+            self.assertEqual(
+                display_np_array(array),
+                " (1000,)[f32] NaNs:0 Infs:0 min:2.0 max:2.0 median:2.0",
+            )
+
+    def test_subclasses_are_dispatched(self):
+        hook_loader = HookLoader()
+        masked = np.ma.MaskedArray([1.0, 2.0, 100.0], mask=[False, False, True])
+        self.assertEqual(
+            hook_loader.run_hook(Variable("masked", 0, masked)),
+            " (3,)[f64] NaNs:0 Infs:0 min:1.0 max:2.0 median:1.5",
+        )
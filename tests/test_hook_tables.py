@@ -0,0 +1,106 @@
+from unittest import TestCase
+
+import pytest
+
+from frosch.dt_hooks.tables import describe_table
+from frosch.parser import Variable
+from frosch.type_hooks import HookLoader
+
+
+class TestDescribeTable(TestCase):
+
+    def test_columns_are_capped(self):
+        columns = ((str(i), "int64", 0) for i in range(20))
+        result = describe_table((1, 20), columns, 20, 2048)
+        self.assertTrue(result.startswith(" (1, 20) memory:2KiB [0:int64, 1:int64"))
+        self.assertTrue(result.endswith(", 7:int64, …(12 more)]"))
+
+    def test_null_counts(self):
+        result = describe_table(None, [("a", "int64", 3), ("b", "str", None)], 2)
+        self.assertEqual(result, " [a:int64(nulls:3), b:str]")
+
+
+class TestPandasHook(TestCase):
+
+    def setUp(self):
+        self.pd = pytest.importorskip("pandas")
+        from frosch.dt_hooks import hook_pandas
+
+        self.hook = hook_pandas
+
+    def test_data_frame(self):
+        frame = self.pd.DataFrame(
+            {"a": self.pd.array([1, None], dtype="Int64"), "b": [None, 2.0]}
+        )
+        # Nulls of numpy backed and masked columns would need a scan of the values
+        self.assertRegex(
+            self.hook.display_data_frame(frame),
+            r"^ \(2, 2\) memory:\d+B \[a:Int64, b:float64\]$",
+        )
+
+    def test_arrow_backed_nulls(self):
+        pytest.importorskip("pyarrow")
+        series = self.pd.Series([1, None, None], dtype="int64[pyarrow]", name="x")
+        self.assertRegex(
+            self.hook.display_series(series),
+            r"^ \(3,\) memory:\d+B \[x:int64\[pyarrow\]\(nulls:2\)\]$",
+        )
+
+    def test_series_and_index(self):
+        series = self.pd.Series([1.0, None], name="x")
+        self.assertRegex(
+            self.hook.display_series(series), r"^ \(2,\) memory:\d+B \[x:float64\]$"
+        )
+        self.assertEqual(
+            self.hook.display_index(series.index), " RangeIndex (2,)[int64]"
+        )
+
+
+class TestPolarsHook(TestCase):
+
+    def setUp(self):
+        self.pl = pytest.importorskip("polars")
+        from frosch.dt_hooks import hook_polars
+
+        self.hook = hook_polars
+
+    def test_data_frame(self):
+        frame = self.pl.DataFrame({"a": [1, None], "b": ["x", "y"]})
+        self.assertRegex(
+            self.hook.display_data_frame(frame),
+            r"^ \(2, 2\) memory:\d+B \[a:Int64\(nulls:1\), b:String\]$",
+        )
+
+    def test_lazy_frame_is_not_collected(self):
+        frame = self.pl.DataFrame({"a": [1]}).lazy()
+        frame = frame.map_batches(
+            lambda _: pytest.fail("collected"), schema={"a": self.pl.Int64}
+        )
+        self.assertEqual(self.hook.display_lazy_frame(frame), " LazyFrame [a:Int64]")
+
+
+class TestPyarrowHook(TestCase):
+
+    def setUp(self):
+        self.pa = pytest.importorskip("pyarrow")
+        from frosch.dt_hooks import hook_pyarrow
+
+        self.hook = hook_pyarrow
+
+    def test_table_and_record_batch(self):
+        table = self.pa.table({"a": [1, None]})
+        expected = f" (2, 1) memory:{table.nbytes}B [a:int64(nulls:1)]"
+        self.assertEqual(self.hook.display_table(table), expected)
+        self.assertEqual(self.hook.display_table(table.to_batches()[0]), expected)
+
+
+class TestTableHookDispatch(TestCase):
+
+    def test_same_name_is_told_apart_by_module(self):
+        pd = pytest.importorskip("pandas")
+        pl = pytest.importorskip("polars")
+        hook_loader = HookLoader()
+        for value in (pd.DataFrame({"a": [1]}), pl.DataFrame({"a": [1]})):
+            self.assertRegex(
+                hook_loader.run_hook(Variable("frame", 0, value)), r"^ \(1, 1\) memory:"
+            )
@@ -0,0 +1,91 @@
+from unittest import TestCase
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from frosch.dt_hooks.hook_torch import (
+    ChunkStats,
+    display_module,
+    display_parameter,
+    display_torch_tensor,
+    iter_chunks,
+)
+from frosch.parser import Variable
+from frosch.type_hooks import HookLoader, HookRegistry
+
+
+class TestTorchHook(TestCase):
+
+    def test_tensor_summary(self):
+        tensor = torch.arange(12.0).reshape(3, 4)
+        tensor[0, 0] = float("nan")
+        self.assertEqual(
+            display_torch_tensor(tensor),
+            " (3, 4)[f32] cpu requires_grad:False stride:(4, 1) contiguous"
+            " !!NaNs:1!! Infs:0 min:1.0 max:11.0",
+        )
+
+    def test_strided_tensor_is_not_copied(self):
+        tensor = torch.zeros(10, 10).T
+        chunks = list(iter_chunks(tensor, chunk_elements=25))
+        self.assertEqual([chunk.shape[0] for chunk in chunks], [2] * 5)
+        self.assertTrue(
+            all(chunk.data_ptr() >= tensor.data_ptr() for chunk in chunks)
+        )
+        self.assertIn("strided", display_torch_tensor(tensor))
+
+    def test_chunks_of_large_strided_rows(self):
+        tensor = torch.randn(40, 4).T
+        chunks = list(iter_chunks(tensor, chunk_elements=10))
+        self.assertTrue(all(chunk.numel() <= 10 for chunk in chunks))
+        self.assertEqual(sum(chunk.numel() for chunk in chunks), tensor.numel())
+
+        stats = ChunkStats.of(tensor, chunk_elements=10)
+        self.assertEqual(stats.min, tensor.min().item())
+        self.assertEqual(stats.max, tensor.max().item())
+
+    def test_chunked_stats_match_full_reduction(self):
+        tensor = torch.randn(40, 30)[:, ::2]
+        stats = ChunkStats.of(tensor, chunk_elements=7)
+        self.assertEqual(stats.min, tensor.min().item())
+        self.assertEqual(stats.max, tensor.max().item())
+
+    def test_tensors_without_readable_values(self):
+        self.assertEqual(
+            display_torch_tensor(torch.ones(3, device="meta")),
+            " (3,)[f32] meta requires_grad:False stride:(1,) contiguous",
+        )
+        self.assertTrue(
+            display_torch_tensor(torch.ones(2, dtype=torch.bool)).endswith("True:2")
+        )
+
+    def test_dtypes_without_reductions(self):
+        result = display_torch_tensor(torch.zeros(3, dtype=torch.uint16))
+        self.assertEqual(
+            result, " (3,)[uint16] cpu requires_grad:False stride:(1,) contiguous"
+        )
+
+    def test_parameter_and_module(self):
+        parameter = torch.nn.Parameter(torch.ones(2))
+        self.assertTrue(display_parameter(parameter).startswith("Parameter (2,)[f32]"))
+        self.assertEqual(
+            display_module(torch.nn.Linear(10, 5)),
+            " Linear params:55 trainable:55 memory:220B train",
+        )
+
+    def test_parameter_resolved_first(self):
+        registry = HookRegistry()
+        self.assertIs(registry.resolve_hook(torch.nn.Parameter), display_parameter)
+        self.assertIs(registry.resolve_hook(torch.Tensor), display_torch_tensor)
+
+    def test_module_subclasses_are_dispatched(self):
+        class Model(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.linear = torch.nn.Linear(2, 1)
+
+        self.assertEqual(
+            HookLoader().run_hook(Variable("model", 0, Model().eval())),
+            " Model params:3 trainable:3 memory:12B eval",
+        )
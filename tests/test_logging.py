@@ -0,0 +1,147 @@
+import io
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueListener
+from unittest import TestCase
+from unittest.mock import patch
+
+from frosch import snapshot
+from frosch.config_manager import ConfigManager
+from frosch.logging import FroschFormatter, FroschQueueHandler
+from frosch.snapshot import DeferredSnapshot
+
+from .helpers import TerminalStream
+
+
+def raise_type_error():
+    value = 3
+    return value + "String"
+
+
+class LoggingTestCase(TestCase):
+
+    def setUp(self):
+        self.configs = ConfigManager.default().from_kwargs(color=False)
+        self.logger = logging.getLogger(f"frosch.test.{self.id()}")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+
+    def tearDown(self):
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+
+    def stream_handler(self):
+        stream = io.StringIO()
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(
+            FroschFormatter("%(levelname)s %(message)s", configs=self.configs)
+        )
+        return stream, handler
+
+
+class TestFroschFormatter(LoggingTestCase):
+
+    def test_colors_are_decided_by_stream(self):
+        outputs = []
+        for stream in (TerminalStream(), io.StringIO()):
+            formatter = FroschFormatter(configs=ConfigManager.default(), stream=stream)
+            try:
+                raise_type_error()
+            except TypeError as error:
+                record = self.logger.makeRecord(
+                    self.logger.name,
+                    logging.ERROR,
+                    __file__,
+                    0,
+                    "failed",
+                    None,
+                    (type(error), error, error.__traceback__),
+                )
+            with patch.dict(os.environ, {"NO_COLOR": "", "TERM": "xterm"}):
+                outputs.append(formatter.format(record))
+
+        self.assertIn("\x1b[", outputs[0])
+        self.assertNotIn("\x1b[", outputs[1])
+
+    def test_exception_is_rendered_with_debug_tree(self):
+        stream, handler = self.stream_handler()
+        self.logger.addHandler(handler)
+        try:
+            raise_type_error()
+        except TypeError:
+            self.logger.exception("failed")
+
+        output = stream.getvalue()
+        self.assertTrue(output.startswith("ERROR failed\nTraceback"))
+        self.assertIn("└── value: int = 3", output)
+
+    def test_report_is_rendered_once_for_all_handlers(self):
+        first_stream, first = self.stream_handler()
+        second_stream, second = self.stream_handler()
+        self.logger.addHandler(first)
+        self.logger.addHandler(second)
+
+        with patch(
+            "frosch.frosch.format_exception", return_value="report\n"
+        ) as format_mock:
+            try:
+                raise_type_error()
+            except TypeError:
+                self.logger.exception("failed")
+
+        format_mock.assert_called_once()
+        self.assertEqual(first_stream.getvalue(), "ERROR failed\nreport\n")
+        self.assertEqual(second_stream.getvalue(), first_stream.getvalue())
+
+    def test_records_without_exception(self):
+        stream, handler = self.stream_handler()
+        self.logger.addHandler(handler)
+        self.logger.info("hello %s", "world")
+        self.assertEqual(stream.getvalue(), "INFO hello world\n")
+
+
+class TestFroschQueueHandler(LoggingTestCase):
+
+    def test_snapshot_is_formatted_by_listener(self):
+        records = queue.Queue()
+        self.logger.addHandler(FroschQueueHandler(records, self.configs))
+        stream, handler = self.stream_handler()
+        listener = QueueListener(records, handler)
+
+        formatting_threads = []
+        original_format = snapshot.format_statement
+
+        def format_statement(*args):
+            formatting_threads.append(threading.current_thread())
+            return original_format(*args)
+
+        with patch.object(snapshot, "format_statement", format_statement):
+            try:
+                raise_type_error()
+            except TypeError:
+                self.logger.exception("failed %d", 1)
+
+            record = records.queue[0]
+            self.assertIsNone(record.exc_info)
+            self.assertIsNone(record.args)
+            self.assertEqual(record.msg, "failed 1")
+            self.assertIsInstance(record.frosch_snapshot, DeferredSnapshot)
+
+            listener.start()
+            listener.stop()
+
+        self.assertTrue(formatting_threads)
+        self.assertNotIn(threading.main_thread(), formatting_threads)
+        output = stream.getvalue()
+        self.assertTrue(output.startswith("ERROR failed 1\nTraceback"))
+        self.assertIn("└── value: int = 3", output)
+
+    def test_records_without_exception(self):
+        records = queue.Queue()
+        self.logger.addHandler(FroschQueueHandler(records, self.configs))
+        self.logger.info("hello %s", "world")
+        record = records.get_nowait()
+        self.assertEqual(record.msg, "hello world")
+        self.assertIsNone(record.frosch_snapshot)
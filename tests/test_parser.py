@@ -1,3 +1,6 @@
+import io
+import time
+import tokenize
 import unittest
 from unittest import TestCase
 from unittest.mock import Mock, patch
@@ -5,6 +8,7 @@ from unittest.mock import Mock, patch
 import pytest
 
 from frosch import parser
+from frosch.deadline import Deadline
 
 
 class TestParser(TestCase):
@@ -128,22 +132,19 @@ class TestParser(TestCase):
 
 
     def test_retrieve_post_mortem_stack_infos(self):
-        with patch("bdb.Bdb.get_stack") as get_stack_mock:
-            stack_mock = Mock()
-            stack_mock.f_locals = {"local":"values"}
-            stack_mock.f_globals = {"global":"values"}
-
-            stack = [[stack_mock]]
-            
-            get_stack_mock.return_value = (stack, 0)
-
-            tb_mock = Mock()
-            result_locals, result_globals = parser.retrieve_post_mortem_stack_infos(tb_mock)
-
-            get_stack_mock.assert_called_with(None, tb_mock)
-            self.assertEqual(stack_mock.f_locals, result_locals)
-            self.assertEqual(stack_mock.f_globals, result_globals)
-    
+        def inner():
+            local = "values"
+            raise ValueError(local)
+
+        try:
+            inner()
+        except ValueError as error:
+            traceback_ = error.__traceback__
+
+        result_locals, result_globals = parser.retrieve_post_mortem_stack_infos(traceback_)
+        self.assertEqual(result_locals, {"local": "values"})
+        self.assertIs(result_globals, globals())
+
     def test_format_line_whitespaces(self):
         line = "x  = { 'key' : 3  }"
         result = parser.format_line(line)
@@ -158,11 +159,83 @@ class TestParser(TestCase):
         with pytest.raises(parser.ParseError):
             parser.format_line("x asd ")
 
+    def test_format_line_normalizes_spacing(self):
+        lines = {
+            "f(a = 1, *b, ** c)[1 : 2]": "f(a=1, *b, **c)[1:2]",
+            "y = -x + a[ -1] * - 2": "y = -x + a[-1] * -2",
+            "if (x == 3):": "if (x == 3):",
+            "a . b ( ) ( ) [0]": "a.b()()[0]",
+            "lambda x : x": "lambda x: x",
+            "d = { ** a , 'b' : not c }": "d = {**a, 'b': not c}",
+            "x = f'{a}  b'": "x = f'{a}  b'",
+            "f(a= [1, 2][0])": "f(a=[1, 2][0])",
+            "[lambda a = 1:a]": "[lambda a=1: a]",
+            "x[lambda : 1]": "x[lambda: 1]",
+            "f(key = lambda a , b = (1, 2) : a)": "f(key=lambda a, b=(1, 2): a)",
+            "t[1:2,::3]": "t[1:2, ::3]",
+            "t[:: -1]": "t[::-1]",
+            "from . import x": "from . import x",
+            "from .mod import y": "from .mod import y",
+            "from .. import z": "from .. import z",
+            "from ...pkg.mod import w": "from ...pkg.mod import w",
+            "x = ... if a else b": "x = ... if a else b",
+            "def f(a: int=3, b=2):": "def f(a: int = 3, b=2):",
+            "def f(a, *, b: Dict[str, int]={}):": "def f(a, *, b: Dict[str, int] = {}):",
+            "f(x={1: 2}, y=3)": "f(x={1: 2}, y=3)",
+        }
+        for line, expected_result in lines.items():
+            self.assertEqual(parser.format_line(line), expected_result)
+
+    def test_normalize_tokens_multiline_statement(self):
+        source = "x = [\n    1,  # one\n    2\n]\n"
+        tokens = tokenize.generate_tokens(io.StringIO(source).readline)
+        self.assertEqual(parser.normalize_tokens(tokens), "x = [1, 2]")
+
+    def test_format_line_pretty(self):
+        with patch.object(parser, "_format_with_yapf", return_value="pretty") as yapf_mock:
+            result = parser.format_line("x  = 1", pretty=True)
+            yapf_mock.assert_called_once_with("x = 1")
+            self.assertEqual(result, "pretty")
+
+    def test_pretty_format_line_too_long(self):
+        with patch.object(parser, "_format_with_yapf") as yapf_mock:
+            result = parser.pretty_format_line("x = 1", max_chars=3)
+            self.assertFalse(yapf_mock.called)
+            self.assertEqual(result, "x = 1")
+
+    def test_pretty_format_line_timeout(self):
+        def slow_format(line):
+            time.sleep(1)
+            return "too late"
+
+        with patch.object(parser, "_format_with_yapf", slow_format):
+            result = parser.pretty_format_line("x = 1", timeout=0.01)
+            self.assertEqual(result, "x = 1")
+
+    def test_pretty_format_line_yapf_fails(self):
+        with patch.object(parser, "_format_with_yapf", return_value=None):
+            self.assertEqual(parser.pretty_format_line("x = 1"), "x = 1")
+
+
+    def test_variable_hash_ignores_value(self):
+        variable = parser.Variable("x", 0, [1, 2])
+        self.assertEqual(hash(variable), hash(parser.Variable("x", 0, {})))
+        self.assertEqual(len({variable, parser.Variable("x", 0, [1, 2])}), 1)
+
+    def test_variable_equality_compares_values(self):
+        self.assertEqual(parser.Variable("x", 0, [1, 2]), parser.Variable("x", 0, [1, 2]))
+        self.assertNotEqual(parser.Variable("x", 0, [1]), parser.Variable("x", 0, [2]))
+        self.assertNotEqual(parser.Variable("x", 0), parser.Variable("x", 1))
+
 
 class TestParsedException(TestCase):
 
+    def test_missing_stacktrace(self):
+        with pytest.raises(parser.MissingStacktraceError):
+            parser.ParsedException(None, ValueError, ValueError())
+
     def test_parsed_exception_init(self):
-        with patch.object(parser.traceback, "extract_tb") as extract_mock:
+        with patch.object(parser, "walk_traceback") as extract_mock:
             with patch.object(parser.ParsedException, "_get_source_line") as source_line_mock:
                 with patch.object(parser.ParsedException, "_get_variables") as get_vars_mock:
                     exception = parser.ParsedException("traceback", "error_type", "error_message" )
@@ -170,31 +243,130 @@ class TestParsedException(TestCase):
                     self.assertEqual(exception.error_type, "error_type")
                     self.assertEqual(exception.error_message, "error_message")
 
-                    self.assertTrue(extract_mock.called)
+                    extract_mock.assert_called_once_with("traceback")
+                    self.assertIs(exception.last_stack, extract_mock.return_value[-1])
                     self.assertTrue(source_line_mock.called)
                     self.assertTrue(get_vars_mock.called)
 
     def test__get_source_line(self):
         # Mhh a lot of mocking
-        with patch.object(parser.traceback, "extract_tb") as extract_mock:
+        with patch.object(parser, "walk_traceback") as extract_mock:
             with patch.object(parser.ParsedException, "_get_variables") as get_vars_mock:
                 with patch.object(parser.ParsedException, "_extract_tokens_from_stack") as extract_mock:
-                    extract_mock.return_value = "tokens"
-                    with patch.object(parser, "extract_source_code") as source_mock:
-                        source_mock.return_value = "Line"
-                        with patch.object(parser, "format_line") as format_mock:
-                            format_mock.return_value = "Formatted Line\n"
+                    extract_mock.return_value = [["tok1"], ["tok2"]]
+                    with patch.object(parser, "normalize_tokens") as normalize_mock:
+                        normalize_mock.return_value = "Formatted Line\n"
+                        with patch.object(parser, "pretty_format_line") as pretty_mock:
                             exception = parser.ParsedException("traceback", "error_type", "error_message" )
                             self.assertEqual(exception.line, "Formatted Line")
                             self.assertTrue(extract_mock.called)
-                            source_mock.assert_called_once_with("tokens")
-                            format_mock.assert_called_once_with("Line")
-                            
+                            self.assertListEqual(
+                                list(normalize_mock.call_args[0][0]), ["tok1", "tok2"]
+                            )
+                            self.assertFalse(pretty_mock.called)
+
+    def test__get_source_line_pretty(self):
+        with patch.object(parser, "walk_traceback"):
+            with patch.object(parser.ParsedException, "_get_variables"):
+                with patch.object(parser.ParsedException, "_extract_tokens_from_stack") as extract_mock:
+                    extract_mock.return_value = []
+                    with patch.object(parser, "normalize_tokens", return_value="Line"):
+                        with patch.object(parser, "pretty_format_line") as pretty_mock:
+                            pretty_mock.return_value = "Pretty Line"
+                            exception = parser.ParsedException(
+                                "traceback", "error_type", "error_message", pretty=True
+                            )
+                            pretty_mock.assert_called_once_with(
+                                "Line", timeout=parser.PRETTY_TIMEOUT
+                            )
+                            self.assertEqual(exception.line, "Pretty Line")
 
     @unittest.skip(reason="Apparently not working on github actions")
     def test_get_variables(self):
-        with patch.object(parser.traceback, "extract_tb") as _:
+        with patch.object(parser, "walk_traceback") as _:
             with patch.object(parser.ParsedException, "_get_vars_from_tb") as get_mock:
                 parsed_exception = parser.ParsedException("traceback", None, None)
                 parsed_exception._get_variables()
-                self.assertTrue(get_mock.called)
\ No newline at end of file
+                self.assertTrue(get_mock.called)
+
+
+def _crash(data):
+    return data["a"] + data["b"]
+
+
+class TestParsedExceptionStatement(TestCase):
+
+    def parse(self, **kwargs):
+        try:
+            _crash({
+                "a": 1,
+                "b": "2",
+            })
+        except TypeError as error:
+            return parser.ParsedException(
+                error.__traceback__, TypeError, error, **kwargs
+            )
+
+    def test_statement_windowed(self):
+        self.assertEqual(self.parse(windowed=True).line, 'return data["a"] + data["b"]')
+
+    def test_statement_full_source(self):
+        self.assertEqual(self.parse(windowed=False).line, 'return data["a"] + data["b"]')
+
+    def test_variables(self):
+        variables = {var.name: var.value for var in self.parse().variables}
+        self.assertDictEqual(variables, {"data": {"a": 1, "b": "2"}})
+
+    def test_expired_budget_skips_extraction(self):
+        parsed_exception = self.parse(deadline=Deadline(budget_ms=0))
+        self.assertIsNone(parsed_exception.line)
+        self.assertListEqual(parsed_exception.variables, [])
+        self.assertListEqual(parsed_exception.deadline.skipped, ["extraction"])
+
+
+def _outer(data):
+    values = [data, None]
+    return _middle(values)
+
+
+def _middle(values):
+    first = values[0]
+    return _crash(first)
+
+
+class TestOuterFrames(TestCase):
+
+    def parse(self, **kwargs):
+        try:
+            _outer({"a": 1, "b": "2"})
+        except TypeError as error:
+            return parser.ParsedException(error.__traceback__, TypeError, error, **kwargs)
+
+    def test_no_outer_frames_by_default(self):
+        parsed_exception = self.parse()
+        self.assertListEqual(parsed_exception.outer_frames, [])
+        self.assertEqual(parsed_exception.skipped_frames, 0)
+
+    def test_outer_frames(self):
+        parsed_exception = self.parse(frames=3)
+        frames = parsed_exception.outer_frames
+        self.assertListEqual(
+            [(frame.name, frame.line) for frame in frames],
+            [("_middle", "return _crash(first)"), ("_outer", "return _middle(values)")],
+        )
+        middle_variables = {var.name: var.value for var in frames[0].variables}
+        self.assertDictEqual(
+            middle_variables, {"_crash": _crash, "first": {"a": 1, "b": "2"}}
+        )
+
+    def test_outer_frames_are_inspected_lazily(self):
+        parsed_exception = self.parse(frames=3)
+        with patch.object(parser.ParsedException, "_inspect_frame") as inspect_mock:
+            parsed_exception.outer_frames
+            parsed_exception.outer_frames
+            self.assertEqual(inspect_mock.call_count, 2)
+
+    def test_outer_frames_cost_cap(self):
+        parsed_exception = self.parse(frames=4, frames_budget_ms=0)
+        self.assertListEqual(parsed_exception.outer_frames, [])
+        self.assertEqual(parsed_exception.skipped_frames, 3)
@@ -0,0 +1,91 @@
+import threading
+import time
+from unittest import TestCase
+
+from frosch.config_manager import ConfigManager
+from frosch.parser import Variable
+from frosch.reprs import ReprLimits, bounded_repr, human_count
+
+
+class SlowRepr:
+    def __repr__(self):
+        time.sleep(0.05)
+        return "SlowRepr()"
+
+
+class TestBoundedRepr(TestCase):
+
+    def test_small_values_unchanged(self):
+        self.assertEqual(bounded_repr("Hello World"), "'Hello World'")
+        self.assertEqual(bounded_repr([1, 2, 3]), "[1, 2, 3]")
+        self.assertEqual(bounded_repr((1,)), "(1,)")
+        self.assertEqual(bounded_repr({"a": 1}), "{'a': 1}")
+        self.assertEqual(bounded_repr(set()), "set()")
+        self.assertEqual(bounded_repr(dict), "<class 'dict'>")
+
+    def test_large_list_is_truncated(self):
+        self.assertEqual(
+            bounded_repr(list(range(2_300_000))),
+            "[0, 1, 2, 3, 4, 5, 6, 7, 8, 9, …(truncated, 2.3M items)]",
+        )
+
+    def test_long_string_is_truncated(self):
+        result = bounded_repr("x" * 500, ReprLimits(max_chars=5))
+        self.assertEqual(result, "'xxxxx'…(truncated, 500 chars)")
+
+    def test_nesting_depth(self):
+        self.assertEqual(bounded_repr({"a": [[1, [2]]]}), "{'a': [[…]]}")
+        self.assertEqual(bounded_repr([[1]], ReprLimits(max_depth=0)), "[…]")
+
+    def test_huge_int(self):
+        self.assertEqual(bounded_repr(10 ** 5000), "<int with ~5.0K digits>")
+
+    def test_per_type_limits_apply_to_subclasses(self):
+        class Items(list):
+            pass
+
+        limits = ReprLimits(types={list: {"max_elements": 3}})
+        self.assertEqual(
+            bounded_repr(list(range(50)), limits), "[0, 1, 2, …(truncated, 50 items)]"
+        )
+        self.assertEqual(limits.for_type(Items).max_elements, 3)
+        self.assertEqual(limits.for_type(tuple).max_elements, 10)
+
+    def test_slow_reprs_stop_at_time_budget(self):
+        start = time.perf_counter()
+        result = bounded_repr([SlowRepr()] * 5, ReprLimits(time_ms=20))
+        self.assertLess(time.perf_counter() - start, 0.2)
+        self.assertEqual(result, "[SlowRepr(), …(out of time, 5 items)]")
+
+    def test_slow_repr_is_skipped_after_time_budget(self):
+        result = bounded_repr({"a": SlowRepr(), "b": SlowRepr()}, ReprLimits(time_ms=20))
+        self.assertEqual(result, "{'a': SlowRepr(), …(out of time, 2 items)}")
+        result = bounded_repr({SlowRepr(): SlowRepr()}, ReprLimits(time_ms=20))
+        self.assertEqual(result, "{SlowRepr(): <SlowRepr object (out of time)>}")
+
+    def test_no_threads_are_left_behind(self):
+        threads = threading.active_count()
+        bounded_repr([SlowRepr()] * 3, ReprLimits(time_ms=20))
+        self.assertEqual(threading.active_count(), threads)
+
+    def test_human_count(self):
+        self.assertEqual(human_count(999), "999")
+        self.assertEqual(human_count(1500), "1.5K")
+        self.assertEqual(human_count(2_300_000), "2.3M")
+
+
+class TestReprLimitsConfig(TestCase):
+
+    def test_from_config(self):
+        self.assertEqual(ReprLimits.from_config(None).max_chars, 200)
+        self.assertEqual(ReprLimits.from_config({"max_chars": 10}).max_chars, 10)
+        limits = ReprLimits()
+        self.assertIs(ReprLimits.from_config(limits), limits)
+
+    def test_hook_loader_uses_configured_limits(self):
+        configs = ConfigManager().from_kwargs(repr_limits={"max_elements": 2})
+        hook_loader = configs.initialize_datatype_hook_loader()
+        variable = Variable("x", 0, [1, 2, 3])
+        self.assertEqual(
+            hook_loader.run_hook(variable), "x: list = [1, 2, …(truncated, 3 items)]"
+        )
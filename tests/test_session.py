@@ -0,0 +1,102 @@
+import io
+import os
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from frosch import frosch
+from frosch.config_manager import ConfigManager
+from pygments.formatters.terminal256 import Terminal256Formatter
+
+
+
+class TestRenderSession(TestCase):
+
+    def test_session_is_kept_per_configuration(self):
+        configs = ConfigManager.default()
+        self.assertIs(configs.session(), configs.session())
+        self.assertIsNot(configs.session(), ConfigManager.default().session())
+
+    def test_theme_change_starts_new_session(self):
+        configs = ConfigManager.default()
+        session = configs.session()
+        configs.theme = "vim"
+        self.assertIsNot(configs.session(), session)
+
+    def test_writers_share_formatter_and_lexers(self):
+        session = ConfigManager.default().session()
+        first = session.writer(io.StringIO())
+        second = session.writer(io.StringIO())
+        self.assertIs(first.terminal_formater, second.terminal_formater)
+        self.assertIs(first.python_lexer, second.python_lexer)
+
+    def test_truecolor(self):
+        configs = ConfigManager.default().from_kwargs(truecolor=True, color=True)
+        writer = configs.session().writer(io.StringIO())
+        highlighted = writer.highlight("x = 1", writer.python_lexer)
+        self.assertIn("\x1b[38;2;", highlighted)
+
+
+class TestActiveSession(TestCase):
+
+    def test_default_configuration_is_reused(self):
+        with patch.object(frosch.pytrace_excepthook, "configs", None, create=True):
+            self.assertIs(frosch._active_configs(), frosch._active_configs())
+
+    def test_hooked_configuration_is_used(self):
+        configs = ConfigManager.default()
+        with patch.object(frosch.pytrace_excepthook, "configs", configs, create=True):
+            self.assertIs(frosch._active_configs(), configs)
+
+    def test_format_exception_reuses_session(self):
+        try:
+            1 / 0
+        except ZeroDivisionError as error:
+            exception = error
+
+        configs = ConfigManager.default().from_kwargs(color=True)
+        with patch(
+            "pygments.formatters.terminal256.Terminal256Formatter",
+            wraps=Terminal256Formatter,
+        ) as formatter_mock:
+            frosch.format_exception(exception, configs)
+            frosch.format_exception(exception, configs)
+        formatter_mock.assert_called_once()
+
+
+class TestColorDetection(TestCase):
+
+    def setUp(self):
+        self.session = ConfigManager.default().session()
+        self.tty = Mock()
+        self.tty.isatty.return_value = True
+
+    def test_terminal_gets_color(self):
+        with patch.dict(os.environ, {"TERM": "xterm"}, clear=True):
+            self.assertTrue(self.session.use_color(self.tty))
+            self.assertFalse(self.session.use_color(io.StringIO()))
+
+    def test_environment_turns_color_off(self):
+        for environ in ({"NO_COLOR": "1"}, {"TERM": "dumb"}):
+            with patch.dict(os.environ, environ, clear=True):
+                self.assertFalse(self.session.use_color(self.tty))
+
+    def test_explicit_color(self):
+        configs = ConfigManager.default().from_kwargs(color=True)
+        self.assertTrue(configs.session().use_color(io.StringIO()))
+        configs = ConfigManager.default().from_kwargs(color=False)
+        self.assertFalse(configs.session().use_color(self.tty))
+
+    def test_colorless_report_is_plain(self):
+        try:
+            value = 3
+            value + "String"
+        except TypeError as error:
+            exception = error
+
+        configs = ConfigManager.default().from_kwargs(color=False)
+        with patch("pygments.highlight") as highlight_mock:
+            result = frosch.format_exception(exception, configs)
+        highlight_mock.assert_not_called()
+        self.assertNotIn("\x1b[", result)
+        self.assertIn("└── value: int = 3", result)
+        self.assertIsNone(configs.session()._formatter)
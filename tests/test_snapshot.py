@@ -0,0 +1,147 @@
+import gc
+import pickle
+from unittest import TestCase
+import weakref
+
+from frosch.snapshot import (
+    DeferredSnapshot,
+    ExceptionSnapshot,
+    VariableSnapshot,
+    release_frames,
+)
+from frosch.type_hooks import HookLoader
+
+
+class Payload:
+    def __init__(self, values):
+        self.values = values
+
+    def __repr__(self):
+        return f"Payload({len(self.values)})"
+
+
+def crash(payload):
+    values = payload.values
+    return values + None
+
+
+def make_exception(payload):
+    try:
+        crash(payload)
+    except TypeError as error:
+        return error
+
+
+class TestExceptionSnapshot(TestCase):
+
+    def test_records_have_no_dict(self):
+        snapshot = ExceptionSnapshot.capture(make_exception(Payload([1])), HookLoader())
+        self.assertFalse(hasattr(snapshot, "__dict__"))
+        self.assertFalse(hasattr(snapshot.variables[0], "__dict__"))
+
+    def test_snapshot_does_not_keep_values(self):
+        payload = Payload([1, 2, 3])
+        reference = weakref.ref(payload)
+        exception = make_exception(payload)
+
+        snapshot = ExceptionSnapshot.capture(exception, HookLoader())
+        del payload, exception
+        gc.collect()
+
+        self.assertIsNone(reference())
+        self.assertEqual(snapshot.line, "return values + None")
+        self.assertListEqual(
+            [variable.rendered for variable in snapshot.variables],
+            ["values: list = [1, 2, 3]"],
+        )
+
+    def test_release_frames(self):
+        payload = Payload([1])
+        reference = weakref.ref(payload)
+        try:
+            try:
+                crash(payload)
+            except TypeError as error:
+                raise ValueError("wrapped") from error
+        except ValueError as error:
+            exception = error
+
+        del payload
+        snapshot = ExceptionSnapshot.capture(exception.__cause__, HookLoader(), release=True)
+        gc.collect()
+
+        self.assertIsNone(reference())
+        self.assertIn("values", snapshot.variables[0].rendered)
+        self.assertIn("return values + None", snapshot.format_traceback())
+
+    def test_release_frames_of_exception_without_traceback(self):
+        release_frames(ValueError())
+
+    def test_pickle(self):
+        snapshot = ExceptionSnapshot.capture(make_exception(Payload([1])), HookLoader())
+        restored = pickle.loads(pickle.dumps(snapshot))
+
+        self.assertIsNone(restored.traceback_exception)
+        self.assertEqual(restored.format_traceback(), snapshot.format_traceback())
+        self.assertEqual(restored.lineno, snapshot.lineno)
+        self.assertEqual(repr(restored.variables), repr(snapshot.variables))
+        self.assertIsInstance(restored.variables[0], VariableSnapshot)
+
+
+class TestDeferredSnapshot(TestCase):
+
+    def setUp(self):
+        self.hook_loader = HookLoader()
+
+    def test_resolves_like_a_snapshot(self):
+        exception = make_exception(Payload([1]))
+        snapshot = ExceptionSnapshot.capture(exception, self.hook_loader, frames=2)
+        deferred = DeferredSnapshot.capture(exception, self.hook_loader, frames=2)
+        resolved = deferred.resolve(self.hook_loader)
+
+        self.assertEqual(resolved.line, snapshot.line)
+        self.assertEqual(resolved.lineno, snapshot.lineno)
+        self.assertEqual(repr(resolved.variables), repr(snapshot.variables))
+        self.assertEqual(
+            [frame.line for frame in resolved.outer_frames],
+            [frame.line for frame in snapshot.outer_frames],
+        )
+
+    def test_only_used_names_are_captured(self):
+        deferred = DeferredSnapshot.capture(
+            make_exception(Payload([1])), self.hook_loader
+        )
+        self.assertEqual(list(deferred.frames[0].values), ["values"])
+        # Not formatted yet
+        self.assertIsNotNone(deferred.frames[0].tokens)
+
+    def test_values_are_not_kept(self):
+        payload = Payload([1])
+        deferred = DeferredSnapshot.capture(make_exception(payload), self.hook_loader)
+        payload.values.append(2)
+
+        captured = deferred.frames[0].values["values"]
+        self.assertIsNone(captured.value)
+        self.assertEqual(captured.repr, "[1]")
+
+
+class TestBrokenHooks(TestCase):
+
+    def setUp(self):
+        self.hook_loader = HookLoader.with_hooks({list: lambda value: 1 / 0})
+
+    def test_snapshot_falls_back_to_repr(self):
+        snapshot = ExceptionSnapshot.capture(
+            make_exception(Payload([1])), self.hook_loader
+        )
+        variable = snapshot.variables[0]
+        self.assertEqual(variable.rendered, "values: list = [1]")
+        self.assertFalse(variable.hooked)
+
+    def test_deferred_snapshot_falls_back_to_repr(self):
+        deferred = DeferredSnapshot.capture(
+            make_exception(Payload([1])), self.hook_loader
+        )
+        variable = deferred.resolve(self.hook_loader).variables[0]
+        self.assertEqual(variable.rendered, "values: list = [1]")
+        self.assertFalse(variable.hooked)
@@ -0,0 +1,158 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import tempfile
+from unittest import TestCase
+
+from frosch.sources import SourceCache, StatementIndex, window_statement_tokens
+
+
+class TestSourceCache(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = SourceCache()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_module(self, name, content, mtime=None):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w") as module:
+            module.write(content)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def test_get_caches_source(self):
+        path = self.write_module("a.py", "x = 1\n")
+        source = self.cache.get(path)
+        self.assertIs(self.cache.get(path), source)
+        self.assertEqual(self.cache.stats().hits, 1)
+        self.assertEqual(self.cache.stats().misses, 1)
+        self.assertEqual(self.cache.stats().entries, 1)
+        self.assertEqual(self.cache.stats().size, len("x = 1\n"))
+
+    def test_get_reloads_changed_file(self):
+        path = self.write_module("a.py", "x = 1\n", mtime=1000)
+        source = self.cache.get(path)
+        self.write_module("a.py", "x = 22\n", mtime=2000)
+
+        new_source = self.cache.get(path)
+        self.assertIsNot(new_source, source)
+        self.assertEqual(new_source.text, "x = 22\n")
+        self.assertEqual(self.cache.stats().misses, 2)
+        self.assertEqual(self.cache.stats().entries, 1)
+
+    def test_evicts_least_recently_used(self):
+        cache = SourceCache(max_entries=2)
+        first = self.write_module("a.py", "a = 1\n")
+        second = self.write_module("b.py", "b = 1\n")
+        third = self.write_module("c.py", "c = 1\n")
+
+        cache.get(first)
+        cache.get(second)
+        cache.get(first)
+        cache.get(third)
+
+        self.assertEqual(cache.stats().evictions, 1)
+        cache.get(first)
+        self.assertEqual(cache.stats().hits, 2)
+        cache.get(second)
+        self.assertEqual(cache.stats().misses, 4)
+
+    def test_size_limit(self):
+        cache = SourceCache(max_size=10)
+        small = self.write_module("a.py", "a = 1\n")
+        large = self.write_module("b.py", "b = 1000000\n")
+
+        cache.get(small)
+        cache.get(large)
+        self.assertEqual(cache.stats().entries, 1)
+        self.assertEqual(cache.stats().size, 6)
+
+    def test_concurrent_access(self):
+        cache = SourceCache(max_entries=3)
+        paths = [self.write_module(f"m{index}.py", f"x = {index}\n") for index in range(5)]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            sources = list(executor.map(cache.get, paths * 40))
+
+        self.assertListEqual(
+            [source.text for source in sources],
+            [f"x = {index}\n" for index in range(5)] * 40,
+        )
+        stats = cache.stats()
+        self.assertEqual(stats.hits + stats.misses, 200)
+        self.assertEqual(stats.entries, 3)
+        self.assertEqual(stats.size, 18)
+
+    def test_sources_without_file_are_not_cached(self):
+        self.cache.get("<stdin>")
+        self.cache.get("<stdin>")
+        self.assertEqual(self.cache.stats().misses, 2)
+        self.assertEqual(self.cache.stats().entries, 0)
+
+    def test_clear(self):
+        self.cache.get(self.write_module("a.py", "x = 1\n"))
+        self.cache.clear()
+        self.assertEqual(tuple(self.cache.stats()), (0, 0, 0, 0, 0))
+
+
+class TestStatementIndex(TestCase):
+
+    def test_lookup(self):
+        index = StatementIndex([range(1, 4), range(4, 5), range(7, 9)])
+        self.assertEqual(index.lookup(1), range(1, 4))
+        self.assertEqual(index.lookup(3), range(1, 4))
+        self.assertEqual(index.lookup(4), range(4, 5))
+        self.assertEqual(index.lookup(8), range(7, 9))
+
+    def test_lookup_outside_of_pieces(self):
+        index = StatementIndex([range(2, 4), range(7, 9)])
+        self.assertIsNone(index.lookup(1))
+        self.assertIsNone(index.lookup(5))
+        self.assertIsNone(index.lookup(9))
+
+
+def window_line(lines, lineno):
+    tokens = window_statement_tokens(lines, lineno)
+    if tokens is None:
+        return None
+    return " ".join(
+        token.string for row in tokens for token in row if token.string.strip()
+    )
+
+
+class TestWindowStatementTokens(TestCase):
+
+    lines = [
+        "X = [\n",
+        "a,\n",
+        "b + 1,\n",
+        "]\n",
+        "def f(a, b):\n",
+        "    c = a + b\n",
+        "    return g(c,\n",
+        "             a)\n",
+        "s = '''\n",
+        "x = 1\n",
+        "'''\n",
+        "y = s\n",
+    ]
+
+    def test_statement_within_brackets(self):
+        self.assertEqual(window_line(self.lines, 3), "X = [ a , b + 1 , ]")
+
+    def test_statement_in_function(self):
+        self.assertEqual(window_line(self.lines, 6), "c = a + b")
+        self.assertEqual(window_line(self.lines, 8), "return g ( c , a )")
+
+    def test_statement_after_multiline_string(self):
+        self.assertEqual(window_line(self.lines, 12), "y = s")
+
+    def test_no_statement_start_in_lookbehind(self):
+        self.assertIsNone(window_statement_tokens(self.lines, 3, lookbehind=2))
+
+    def test_lineno_out_of_range(self):
+        self.assertIsNone(window_statement_tokens(self.lines, 0))
+        self.assertIsNone(window_statement_tokens(self.lines, 13))
@@ -0,0 +1,104 @@
+import io
+import json
+from unittest import TestCase
+from unittest.mock import patch
+
+from frosch import frosch
+from frosch.background import BackgroundReporter
+from frosch.config_manager import ConfigManager
+from frosch.deadline import Deadline
+from frosch.parser import ParsedException, Variable
+from frosch.structured import dumps, exception_record, variable_record
+from frosch.type_hooks import HookLoader
+
+
+def raise_type_error():
+    value = 3
+    return value + "String"
+
+
+def catch(function):
+    try:
+        function()
+    except Exception as error:  # pylint: disable=W0703
+        return error
+    raise AssertionError("no exception")
+
+
+class TestExceptionRecord(TestCase):
+
+    def setUp(self):
+        self.exception = catch(raise_type_error)
+        self.parsed_exception = ParsedException(
+            self.exception.__traceback__, type(self.exception), self.exception
+        )
+
+    def test_record(self):
+        record = exception_record(self.parsed_exception, HookLoader())
+        self.assertEqual(record["type"], "TypeError")
+        self.assertIn("unsupported operand", record["message"])
+        self.assertEqual(record["frames"][-1]["name"], "raise_type_error")
+        self.assertEqual(record["line"], 'return value + "String"')
+        self.assertEqual(
+            record["variables"],
+            [
+                {
+                    "name": "value",
+                    "col_offset": 7,
+                    "type": "int",
+                    "repr": "3",
+                    "hook": None,
+                }
+            ],
+        )
+        self.assertEqual(record["skipped_stages"], [])
+
+    def test_hook_output(self):
+        hook_loader = HookLoader.with_hooks({int: lambda value: f"int {value}"})
+        record = variable_record(Variable("x", 0, 1), hook_loader, Deadline())
+        self.assertEqual(record["hook"], "int 1")
+        self.assertEqual(record["repr"], "1")
+
+    def test_broken_hook_is_ignored(self):
+        hook_loader = HookLoader.with_hooks({int: lambda value: 1 / 0})
+        record = variable_record(Variable("x", 0, 1), hook_loader, Deadline())
+        self.assertIsNone(record["hook"])
+
+    def test_dumps_is_a_single_compact_line(self):
+        line = dumps(exception_record(self.parsed_exception, HookLoader()))
+        self.assertNotIn("\n", line)
+        self.assertNotIn(", ", line.split('"message"')[0])
+        self.assertEqual(json.loads(line)["type"], "TypeError")
+
+
+class TestJsonFormat(TestCase):
+
+    def test_format_exception_json(self):
+        exception = catch(raise_type_error)
+        with patch("pygments.highlight") as highlight_mock:
+            result = frosch.format_exception(exception, ConfigManager.default(), "json")
+        highlight_mock.assert_not_called()
+        self.assertTrue(result.endswith("}\n"))
+        self.assertEqual(result.count("\n"), 1)
+        self.assertEqual(json.loads(result)["variables"][0]["name"], "value")
+
+    def test_hook_format(self):
+        configs = ConfigManager.default().from_kwargs(format="json")
+        result = frosch.format_exception(catch(raise_type_error), configs)
+        self.assertEqual(json.loads(result)["type"], "TypeError")
+
+    def test_summaries_are_json(self):
+        configs = ConfigManager.default().from_kwargs(format="json", dedup_window=60)
+        lines = "".join(
+            frosch.format_exception(catch(raise_type_error), configs) for _ in range(2)
+        ).splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn("summary", json.loads(lines[1]))
+
+    def test_background_json(self):
+        stream = io.StringIO()
+        configs = ConfigManager.default().from_kwargs(format="json")
+        reporter = BackgroundReporter(stream, configs)
+        reporter.submit(catch(raise_type_error))
+        reporter.close()
+        self.assertEqual(json.loads(stream.getvalue())["type"], "TypeError")
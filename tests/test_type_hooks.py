@@ -1,9 +1,10 @@
 import contextlib
+from concurrent.futures import ThreadPoolExecutor
 import unittest
 from unittest.mock import Mock, patch
 import sys
 
-from frosch.type_hooks import HookLoader
+from frosch.type_hooks import HookLoader, HookRegistry
 from frosch.parser import Variable
 
 
@@ -12,44 +13,168 @@ def mock_module(module_name):
     """Inject a numpy mock to avoid import errors"""
     numpy_mock = Mock()
     numpy_mock.name = module_name
+    previous = sys.modules.get(module_name)
     sys.modules[module_name] = numpy_mock
     yield numpy_mock
-    del sys.modules[module_name]
+    if previous is None:
+        del sys.modules[module_name]
+    else:
+        sys.modules[module_name] = previous
 
 
 class TestLoader(unittest.TestCase):
     def test_lazy_load_hooks_numpy(self):
         with mock_module("numpy"):
-            hook_loader = HookLoader()
-            hook_loader._lazy_load_hooks("hook_numpy")
-            self.assertEqual(len(hook_loader._hooks), 2)
+            registry = HookRegistry()
+            registry._lazy_load_hooks("hook_numpy")
+            self.assertEqual(len(registry._hooks), 2)
 
     def test_lazy_load_hooks_pytorch(self):
         with mock_module("torch"):
-            hook_loader = HookLoader()
-            hook_loader._lazy_load_hooks("hook_torch")
-            self.assertEqual(len(hook_loader._hooks), 1)
+            registry = HookRegistry()
+            registry._lazy_load_hooks("hook_torch")
+            self.assertEqual(len(registry._hooks), 3)
 
-    def test_lazy_load_numpy_hooks_from_variable(self):
-        class ndarray:
-            pass
-
-        nd_array = ndarray()
-        var = Variable("nd_array", 2, nd_array)
+    def test_types_are_matched_by_qualified_name(self):
+        ndarray = type("ndarray", (), {"__module__": "numpy"})
+        var = Variable("nd_array", 2, ndarray())
 
-        with patch("frosch.type_hooks.HookLoader._lazy_load_hooks") as lazy_hook_mock:
-            hook_loader = HookLoader()
-            hook_loader.lazy_load_hooks_from_variable(var)
+        with mock_module("numpy"), patch.object(
+            HookRegistry, "_lazy_load_hooks"
+        ) as lazy_hook_mock:
+            HookLoader(HookRegistry()).resolve_hook(var.type)
             lazy_hook_mock.assert_called_once_with("hook_numpy")
 
-    def test_lazy_load_torch_hooks_from_variable(self):
+    def test_library_which_is_not_imported_is_not_loaded(self):
+        ndarray = type("ndarray", (), {"__module__": "numpy"})
+
+        with patch.dict(sys.modules, {"numpy": None}), patch.object(
+            HookRegistry, "_lazy_load_hooks"
+        ) as lazy_hook_mock:
+            sys.modules.pop("numpy")
+            HookLoader(HookRegistry()).resolve_hook(ndarray)
+            lazy_hook_mock.assert_not_called()
+
+    def test_unrelated_type_of_same_name_is_not_loaded(self):
         class Tensor:
             pass
 
-        _tensor = Tensor()
-        var = Variable("tens", 2, _tensor)
+        with patch.object(HookRegistry, "_lazy_load_hooks") as lazy_hook_mock:
+            self.assertIsNone(HookLoader(HookRegistry()).resolve_hook(Tensor))
+            lazy_hook_mock.assert_not_called()
+
+    def test_subclasses_use_hook_of_base(self):
+        class Base:
+            pass
+
+        class Child(Base):
+            pass
+
+        hook_loader = HookLoader.with_hooks({Base: lambda value: "base hook"})
+        self.assertEqual(hook_loader.run_hook(Variable("child", 0, Child())), "base hook")
+
+    def test_custom_hooks_come_before_registry(self):
+        class Value:
+            pass
+
+        registry = HookRegistry()
+        registry.register({Value: lambda value: "registry hook"})
+        self.assertEqual(
+            HookLoader(registry).run_hook(Variable("value", 0, Value())),
+            "registry hook",
+        )
+        hook_loader = HookLoader.with_hooks({Value: lambda value: "custom hook"}, registry)
+        self.assertEqual(
+            hook_loader.run_hook(Variable("value", 0, Value())), "custom hook"
+        )
+
+    def test_resolution_is_cached(self):
+        class Plain:
+            pass
+
+        registry = HookRegistry()
+        self.assertIsNone(registry.resolve_hook(Plain))
+        with patch("frosch.type_hooks.qualified_name") as qualified_name_mock:
+            self.assertIsNone(registry.resolve_hook(Plain))
+            qualified_name_mock.assert_not_called()
+
+    def test_module_is_only_tried_once(self):
+        ndarray = type("ndarray", (), {"__module__": "numpy"})
+        memmap = type("memmap", (ndarray,), {"__module__": "numpy"})
+
+        with mock_module("numpy"), patch.object(
+            HookRegistry, "_lazy_load_hooks"
+        ) as lazy_hook_mock:
+            registry = HookRegistry()
+            registry._loaded_modules.add("hook_numpy")
+            self.assertIsNone(registry.resolve_hook(memmap))
+            lazy_hook_mock.assert_not_called()
+
+
+    def test_concurrent_resolution_loads_once(self):
+        ndarray = type("ndarray", (), {"__module__": "numpy"})
+        memmap = type("memmap", (ndarray,), {"__module__": "numpy"})
+
+        def lazy_load_hooks(registry, module):
+            registry._loaded_modules.add(module)
+            registry._hooks[ndarray] = str
+
+        with mock_module("numpy"), patch.object(
+            HookRegistry, "_lazy_load_hooks", autospec=True, side_effect=lazy_load_hooks
+        ) as lazy_hook_mock:
+            registry = HookRegistry()
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                hooks = list(executor.map(registry.resolve_hook, [memmap, ndarray] * 50))
+
+        self.assertListEqual(hooks, [str] * 100)
+        lazy_hook_mock.assert_called_once()
+
+
+class TestPlugins(unittest.TestCase):
+    def plugin(self, name, hooks):
+        entry_point = Mock()
+        entry_point.name = name
+        entry_point.load.return_value = hooks
+        return entry_point
+
+    def test_plugin_of_imported_library_is_loaded(self):
+        plugin_type = type("Frame", (), {"__module__": "plugged"})
+        entry_point = self.plugin("plugged", {plugin_type: lambda value: "plugged"})
+
+        with mock_module("plugged"), patch(
+            "frosch.type_hooks._entry_points", return_value=[entry_point]
+        ) as entry_points_mock:
+            registry = HookRegistry()
+            self.assertEqual(registry.resolve_hook(plugin_type)(None), "plugged")
+            registry.resolve_hook(type("Other", (), {"__module__": "plugged"}))
+            entry_points_mock.assert_called_once_with(HookRegistry.PLUGIN_GROUP)
+            entry_point.load.assert_called_once_with()
+
+    def test_stdlib_types_do_not_discover_plugins(self):
+        import collections
+        import datetime
+        import pathlib
+
+        with patch("frosch.type_hooks._entry_points") as entry_points_mock:
+            registry = HookRegistry()
+            for type_ in (pathlib.PosixPath, collections.OrderedDict, datetime.date):
+                self.assertIsNone(registry.resolve_hook(type_))
+            entry_points_mock.assert_not_called()
+
+    def test_plugin_of_missing_library_is_not_loaded(self):
+        entry_point = self.plugin("unplugged", {})
+        plugin_type = type("Frame", (), {"__module__": "unplugged"})
+
+        with patch("frosch.type_hooks._entry_points", return_value=[entry_point]):
+            self.assertIsNone(HookRegistry().resolve_hook(plugin_type))
+            entry_point.load.assert_not_called()
+
+    def test_broken_plugin_is_ignored(self):
+        entry_point = self.plugin("plugged", {})
+        entry_point.load.side_effect = ImportError
+        plugin_type = type("Frame", (), {"__module__": "plugged"})
 
-        with patch("frosch.type_hooks.HookLoader._lazy_load_hooks") as lazy_hook_mock:
-            hook_loader = HookLoader()
-            hook_loader.lazy_load_hooks_from_variable(var)
-            lazy_hook_mock.assert_called_once_with("hook_torch")
+        with mock_module("plugged"), patch(
+            "frosch.type_hooks._entry_points", return_value=[entry_point]
+        ):
+            self.assertIsNone(HookRegistry().resolve_hook(plugin_type))
@@ -0,0 +1,146 @@
+from concurrent.futures import ProcessPoolExecutor
+import json
+import multiprocessing
+import pickle
+from unittest import TestCase
+
+from frosch import frosch
+from frosch.config_manager import ConfigManager
+from frosch.snapshot import attached_snapshot
+from frosch.workers import SnapshotTask, attach_snapshot, initializer
+
+
+def work(index):
+    items = [1, 2]
+    return items[index]
+
+
+def make_exception():
+    try:
+        work(5)
+    except IndexError as error:
+        return error
+
+
+class TestAttachSnapshot(TestCase):
+
+    def setUp(self):
+        self.configs = ConfigManager.default().from_kwargs(color=False)
+
+    def test_snapshot_survives_pickling(self):
+        exception = make_exception()
+        self.assertTrue(attach_snapshot(exception, self.configs))
+
+        remote = pickle.loads(pickle.dumps(exception))
+        snapshot = attached_snapshot(remote)
+        self.assertIsNone(snapshot.traceback_exception)
+        self.assertIn("return items[index]", snapshot.format_traceback())
+        self.assertEqual(snapshot.line, "return items[index]")
+
+    def test_frames_are_cleared(self):
+        exception = make_exception()
+        attach_snapshot(exception, self.configs)
+
+        traceback_ = exception.__traceback__
+        while traceback_.tb_next is not None:
+            traceback_ = traceback_.tb_next
+        self.assertEqual(traceback_.tb_frame.f_locals, {})
+
+    def test_exception_without_traceback(self):
+        self.assertFalse(attach_snapshot(IndexError("no traceback"), self.configs))
+
+    def test_configs_are_picklable(self):
+        self.configs.session()
+        self.configs.initialize_datatype_hook_loader()
+
+        configs = pickle.loads(pickle.dumps(self.configs))
+        self.assertIsNone(configs._session)
+        self.assertFalse(configs.color)
+
+
+class TestWorkers(TestCase):
+
+    def setUp(self):
+        self.configs = ConfigManager.default().from_kwargs(color=False)
+
+    def assertRemoteReport(self, exception):
+        self.assertIsNotNone(attached_snapshot(exception))
+        report = frosch.format_exception(exception, self.configs)
+        self.assertIn("return items[index]", report)
+        self.assertIn("items: list = [1, 2]", report)
+        self.assertIn("index: int = 5", report)
+
+    def assertRemoteRecord(self, exception):
+        record = json.loads(
+            frosch.format_exception(exception, self.configs, format="json")
+        )
+        self.assertEqual(record["type"], "IndexError")
+        self.assertEqual(record["message"], "list index out of range")
+        self.assertEqual(record["line"], "return items[index]")
+        self.assertEqual(record["frames"][-1]["name"], "work")
+        self.assertEqual(
+            [
+                (variable["name"], variable["type"], variable["repr"])
+                for variable in record["variables"]
+            ],
+            [("items", "list", "[1, 2]"), ("index", "int", "5")],
+        )
+        self.assertEqual(record["skipped_stages"], [])
+        return record
+
+    def test_json_of_future_exception(self):
+        with ProcessPoolExecutor(
+            max_workers=1, initializer=initializer, initargs=(self.configs,)
+        ) as executor:
+            future = executor.submit(work, 5)
+            self.assertRemoteRecord(future.exception())
+
+    def test_json_of_reraised_exception(self):
+        with ProcessPoolExecutor(
+            max_workers=1, initializer=initializer, initargs=(self.configs,)
+        ) as executor:
+            future = executor.submit(work, 5)
+            try:
+                future.result()
+            except IndexError as error:
+                exception = error
+        self.assertIsNotNone(exception.__traceback__)
+        record = self.assertRemoteRecord(exception)
+        # Frames of the parent which re-raised the exception come first
+        self.assertEqual(record["frames"][0]["name"], "test_json_of_reraised_exception")
+
+    def test_reraised_exception_shows_parent_frames(self):
+        with ProcessPoolExecutor(
+            max_workers=1, initializer=initializer, initargs=(self.configs,)
+        ) as executor:
+            future = executor.submit(work, 5)
+            try:
+                future.result()
+            except IndexError as error:
+                exception = error
+
+        self.assertRemoteReport(exception)
+        report = frosch.format_exception(exception, self.configs)
+        worker, parent = report.split("direct cause of the following exception:")
+        self.assertIn("return items[index]", worker)
+        self.assertIn("future.result()", parent)
+        self.assertNotIn("items: list", parent)
+
+    def test_snapshot_task(self):
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(SnapshotTask(work, self.configs), 5)
+            self.assertRemoteReport(future.exception())
+
+    def test_executor_initializer(self):
+        with ProcessPoolExecutor(
+            max_workers=1, initializer=initializer, initargs=(self.configs,)
+        ) as executor:
+            future = executor.submit(work, 5)
+            self.assertRemoteReport(future.exception())
+
+    def test_pool_initializer(self):
+        with multiprocessing.Pool(1, initializer=initializer) as pool:
+            result = pool.apply_async(work, (5,))
+            with self.assertRaises(IndexError) as context:
+                result.get(timeout=30)
+        self.assertRemoteReport(context.exception)
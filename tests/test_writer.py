@@ -1,5 +1,4 @@
 import sys
-import re
 from io import StringIO
 
 from contextlib import contextmanager
@@ -10,8 +9,11 @@ from unittest.mock import Mock, patch
 import pytest
 
 from frosch import writer
+from frosch.deadline import Deadline
 from frosch.type_hooks import HookLoader
 
+from .helpers import escape_ansi
+
 class TestVariable(TestCase):
 
 
@@ -54,14 +56,22 @@ class TestVariable(TestCase):
 
 class TestWindowsColorSupport(TestCase):
 
-    def test_support_windows_colors_context_manager(self):
-        with patch.object(writer, "init") as init_mock:
-            with patch.object(writer, "deinit") as deinit_mock:
-                with writer.support_windows_colors():
-                    self.assertTrue(init_mock.called)
-                    self.assertFalse(deinit_mock.called)
-                
-                self.assertTrue(deinit_mock.called)
+    def test_support_windows_colors_only_on_windows(self):
+        with patch.object(writer, "colorama") as colorama_mock:
+            with patch.object(writer, "_WINDOWS_COLORS", False):
+                with patch.object(writer.sys, "platform", "linux"):
+                    writer.support_windows_colors()
+        self.assertFalse(colorama_mock.just_fix_windows_console.called)
+        self.assertFalse(colorama_mock.init.called)
+
+    def test_support_windows_colors_once(self):
+        with patch.object(writer, "colorama") as colorama_mock:
+            with patch.object(writer, "_WINDOWS_COLORS", False):
+                with patch.object(writer.sys, "platform", "win32"):
+                    writer.support_windows_colors()
+                    writer.support_windows_colors()
+        colorama_mock.just_fix_windows_console.assert_called_once_with()
+        self.assertFalse(colorama_mock.init.called)
 
 class TestConsoleWriter(TestCase):
 
@@ -114,6 +124,8 @@ class TestConsoleWriter(TestCase):
         parsed_exception.last_stack.lineno = 42
         parsed_exception.line = "line"
         parsed_exception.variables = "variables"
+        parsed_exception.outer_frames = []
+        parsed_exception.skipped_frames = 0
 
         with patch("frosch.writer.support_windows_colors") as color_mock:
             self.cw.write_exception(parsed_exception)
@@ -125,13 +137,6 @@ class TestConsoleWriter(TestCase):
             self.assertTrue(self.cw.write_newline.called)
 
 
-
-
-# https://stackoverflow.com/questions/14693701/how-can-i-remove-the-ansi-escape-sequences-from-a-string-in-python
-def escape_ansi(line):
-    ansi_escape = re.compile(r'(?:\x1B[@-_]|[\x80-\x9F])[0-?]*[ -/]*[@-~]')
-    return ansi_escape.sub('', line)
-
 # Using capsys fixture
 def test_write_out(capsys):
     cw = writer.ConsoleWriter("monokai", sys.stderr, HookLoader())
@@ -216,3 +221,84 @@ def test_write_debug_tree_offset_2(capsys):
     || └── y: str = 'Something'
     || \n"""
     assert result == expected_result
+
+def test_expired_budget_writes_plain_output(capsys):
+    console_writer = writer.ConsoleWriter(
+        "monokai", sys.stderr, HookLoader(), Deadline(budget_ms=0)
+    )
+    parsed_exception = Mock()
+    parsed_exception.line = None
+    with patch.object(
+        writer.traceback, "format_exception", return_value=["Traceback\n"]
+    ):
+        console_writer.write_exception(parsed_exception)
+
+    captured = capsys.readouterr()
+    assert captured.err == (
+        "Traceback\nfrosch: budget of 0ms exhausted, skipped color\n"
+    )
+
+def test_expired_budget_skips_hooks(capsys):
+    hook_loader = HookLoader.with_hooks({str: lambda value: "hooked"})
+    console_writer = writer.ConsoleWriter(
+        "monokai", sys.stderr, hook_loader, Deadline(budget_ms=0)
+    )
+    variable = writer.Variable("x", 0, "value")
+    result = console_writer.construct_debug_tree(["", "", ""], [variable])
+    assert result == ["│", "└── x: str = 'value'", ""]
+    assert console_writer.deadline.skipped == ["hooks", "color"]
+
+def test_broken_hook_falls_back_to_repr(capsys):
+    hook_loader = HookLoader.with_hooks({str: lambda value: 1 / 0})
+    console_writer = writer.ConsoleWriter("monokai", sys.stderr, hook_loader)
+    console_writer.color = False
+    variable = writer.Variable("x", 0, "value")
+    assert console_writer.render_variable(variable) == "x: str = 'value'"
+
+def test_write_outer_frames(capsys):
+    console_writer = writer.ConsoleWriter("monokai", sys.stderr, HookLoader())
+    variable = writer.Variable("x", 7, 1)
+    frame = writer.FrameReport("app.py", 12, "main", "return x", [variable])
+    console_writer.write_outer_frames([frame], 2)
+
+    result = escape_ansi(capsys.readouterr().err)
+    assert result == """  File "app.py", line 12, in main
+
+ 12 || return x
+    ||        │
+    ||        └── x: int = 1
+    || 
+
+  ... 2 more frames not inspected
+"""
+
+def test_write_exception_is_a_single_write():
+    stream = Mock()
+    console_writer = writer.ConsoleWriter("monokai", stream, HookLoader())
+    parsed_exception = Mock()
+    parsed_exception.line = "x = y"
+    parsed_exception.last_stack.lineno = 3
+    parsed_exception.variables = [writer.Variable("y", 4, 1)]
+    parsed_exception.outer_frames = []
+    parsed_exception.skipped_frames = 0
+    with patch.object(
+        writer.traceback, "format_exception", return_value=["Traceback\n"]
+    ):
+        console_writer.write_exception(parsed_exception)
+
+    stream.write.assert_called_once()
+    stream.flush.assert_called_once_with()
+    report = escape_ansi(stream.write.call_args[0][0])
+    assert report.startswith("Traceback\n\n 3 || x = y\n")
+    assert console_writer.stream is stream
+
+def test_write_report_raw(tmp_path):
+    with open(tmp_path / "report", "w", encoding="utf-8") as stream:
+        stream.write("buffered ")
+        writer.write_report(stream, "report ü\n", raw=True)
+    assert (tmp_path / "report").read_text(encoding="utf-8") == "buffered report ü\n"
+
+def test_write_report_raw_falls_back_without_file_descriptor():
+    stream = StringIO()
+    writer.write_report(stream, "report\n", raw=True)
+    assert stream.getvalue() == "report\n"